@@ -0,0 +1,185 @@
+# batch_generation.py
+"""
+Batch-generering av artikler fra arkivet (artikler funnet av skraperen).
+
+Hver artikkel går gjennom tre trinn:
+
+    hent      hent_artikkeltekst(url)
+    generer   generer_artikkel(...)
+    lagre     lagre_som_docx(...) og – med mappe-ID – last_opp_til_google_docs(...)
+
+Trinnene overlapper: mens én artikkel genereres, hentes neste og en tredje
+lastes opp. Hvert trinn har sin egen grense for samtidige kall
+(GENERERING_MAKS_*), så vi verken hamrer kildene, OpenAI eller Drive.
+
+Status per artikkel lagres i tabellen `genereringer` (storage.py) etter
+hvert trinn. Kjøres batchen på nytt, hoppes ferdige trinn over – en avbrutt
+eller delvis feilet kjøring fortsetter der den slapp.
+
+    python batch_generation.py                       # alt funnet i dag
+    python batch_generation.py --funnet-dato 2025-06-15 --mappe-id <Drive-mappe>
+    python batch_generation.py --bulk            # via OpenAI Batch API (bulk_generation.py)
+"""
+import argparse
+import logging
+import os
+import queue
+import re
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+import storage
+from generate_articles import generer_artikkel, hent_artikkeltekst, lagre_som_docx
+
+DOCX_MAPPE = Path(__file__).parent / "genererte"
+
+MAKS_HENT      = int(os.getenv("GENERERING_MAKS_HENT", "6"))
+MAKS_GENERER   = int(os.getenv("GENERERING_MAKS_GENERER", "4"))
+MAKS_OPPLASTING = int(os.getenv("GENERERING_MAKS_OPPLASTING", "2"))
+GOOGLE_MAPPE_ID = os.getenv("GOOGLE_MAPPE_ID")
+
+STANDARD_KATEGORI = "Legemidler"
+STANDARD_LENGDE   = "Middels (~700 tegn)"
+
+
+def _filnavn(artikkel: dict) -> Path:
+    slug = re.sub(r"[^a-z0-9æøå]+", "-", (artikkel.get("tittel") or "artikkel").lower()).strip("-")[:60]
+    return DOCX_MAPPE / (artikkel.get("funnet_dato") or "ukjent") / f"{artikkel['id']}-{slug}.docx"
+
+
+class _Pipeline:
+    def __init__(self, kategori: str, lengde: str, mappe_id: str | None, regenerer: bool = False):
+        self.kategori = kategori
+        self.lengde = lengde
+        self.mappe_id = mappe_id
+        self.regenerer = regenerer
+        self.trinn = {
+            "hent": threading.BoundedSemaphore(MAKS_HENT),
+            "generer": threading.BoundedSemaphore(MAKS_GENERER),
+            "lagre": threading.BoundedSemaphore(MAKS_OPPLASTING),
+        }
+        # Statusendringer skrives av hovedtråden (SQLite-tilkoblingen er ikke delt)
+        self.meldinger: queue.Queue[tuple[int, dict]] = queue.Queue()
+
+    def meld(self, artikkel_id: int, **felter):
+        self.meldinger.put((artikkel_id, felter))
+
+    def kjør_artikkel(self, artikkel: dict, status: dict):
+        a_id = artikkel["id"]
+        råtekst = status.get("raatekst")
+        tekst = status.get("artikkel")
+        try:
+            if tekst is None and råtekst is None:
+                with self.trinn["hent"]:
+                    råtekst = hent_artikkeltekst(artikkel["url"]) or ""
+                self.meld(a_id, status="hentet", raatekst=råtekst)
+
+            if tekst is None:
+                with self.trinn["generer"]:
+                    # Tom råtekst → generer_artikkel lager fallback-prompt fra HTML
+                    tekst = generer_artikkel(råtekst, artikkel["url"], self.kategori, self.lengde,
+                                             regenerer=self.regenerer)
+                self.meld(a_id, status="generert", artikkel=tekst)
+
+            with self.trinn["lagre"]:
+                docx_fil = status.get("docx_fil")
+                if not docx_fil or not Path(docx_fil).exists():
+                    fil = _filnavn(artikkel)
+                    fil.parent.mkdir(parents=True, exist_ok=True)
+                    lagre_som_docx(tekst, fil)
+                    docx_fil = str(fil)
+                lenke = status.get("lenke")
+                if self.mappe_id and not lenke:
+                    from google_docs import last_opp_til_google_docs
+                    lenke = last_opp_til_google_docs(
+                        artikkel.get("tittel") or "AI-generert artikkel",
+                        tekst,
+                        mappe_id=self.mappe_id,
+                        dato=date.fromisoformat(artikkel.get("funnet_dato") or date.today().isoformat()),
+                    )
+            self.meld(a_id, status="ferdig", docx_fil=docx_fil, lenke=lenke, feil=None)
+        except Exception as e:
+            logging.error(f"Generering feilet for {artikkel['url']}: {e}")
+            self.meld(a_id, status="feilet", feil=str(e))
+
+
+def generer_batch(
+    conn,
+    artikler: list[dict],
+    kategori: str = STANDARD_KATEGORI,
+    lengde: str = STANDARD_LENGDE,
+    mappe_id: str | None = GOOGLE_MAPPE_ID,
+    på_nytt: bool = False,
+    ved_status: Callable[[dict, str], None] | None = None,
+) -> dict[str, int]:
+    """
+    Kjører pipelinen for `artikler` (rader fra storage). Ferdige artikler
+    hoppes over med mindre `på_nytt` er satt – da går også
+    genereringen utenom svar-cachen. `ved_status(artikkel, status)`
+    kalles i tråden som kalte generer_batch hver gang en artikkel går videre.
+    Returnerer antall artikler per sluttstatus.
+    """
+    statuser = {} if på_nytt else storage.hent_genereringer(conn, [a["id"] for a in artikler])
+    if på_nytt:
+        with conn:
+            conn.executemany("DELETE FROM genereringer WHERE artikkel_id = ?", [(a["id"],) for a in artikler])
+
+    gjenstår = [a for a in artikler if statuser.get(a["id"], {}).get("status") != "ferdig"]
+    telling = {"ferdig": len(artikler) - len(gjenstår), "feilet": 0}
+    logging.info(f"Genererer {len(gjenstår)} artikler ({telling['ferdig']} allerede ferdige).")
+    if not gjenstår:
+        return telling
+
+    pipeline = _Pipeline(kategori, lengde, mappe_id, regenerer=på_nytt)
+    etter_id = {a["id"]: a for a in gjenstår}
+    with conn:
+        for a in gjenstår:
+            if a["id"] not in statuser:
+                storage.oppdater_generering(conn, a["id"], status="venter")
+
+    def skriv(artikkel_id: int, felter: dict):
+        with conn:
+            storage.oppdater_generering(conn, artikkel_id, **felter)
+        if felter["status"] in telling:
+            telling[felter["status"]] += 1
+        if ved_status:
+            ved_status(etter_id[artikkel_id], felter["status"])
+
+    arbeidere = MAKS_HENT + MAKS_GENERER + MAKS_OPPLASTING
+    with ThreadPoolExecutor(max_workers=arbeidere) as pool:
+        futures = [pool.submit(pipeline.kjør_artikkel, a, statuser.get(a["id"], {})) for a in gjenstår]
+        while not all(f.done() for f in futures) or not pipeline.meldinger.empty():
+            try:
+                skriv(*pipeline.meldinger.get(timeout=0.2))
+            except queue.Empty:
+                pass
+    logging.info(f"Batch ferdig: {telling['ferdig']} ferdige, {telling['feilet']} feilet.")
+    return telling
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Generer artikler for alt skraperen fant på gitte dager.")
+    parser.add_argument("--funnet-dato", action="append",
+                        help="YYYY-MM-DD, kan gis flere ganger (standard: i dag)")
+    parser.add_argument("--mappe-id", default=GOOGLE_MAPPE_ID,
+                        help="Drive-mappe for opplasting (standard: $GOOGLE_MAPPE_ID; uten: bare .docx)")
+    parser.add_argument("--kategori", default=STANDARD_KATEGORI)
+    parser.add_argument("--lengde", default=STANDARD_LENGDE)
+    parser.add_argument("--på-nytt", action="store_true", help="generer også artikler som er ferdige")
+    parser.add_argument("--bulk", action="store_true",
+                        help="generer via OpenAI Batch API (billigere, svar innen 24 t)")
+    parser.add_argument("--ikke-vent", action="store_true",
+                        help="med --bulk: send jobbene og avslutt; neste kjøring henter svarene")
+    args = parser.parse_args()
+
+    conn = storage.koble_til()
+    artikler = storage.hent_artikler_funnet(conn, args.funnet_dato or [date.today().isoformat()])
+    if args.bulk:
+        from bulk_generation import generer_bulk
+        generer_bulk(conn, artikler, args.kategori, args.lengde, args.mappe_id, vent=not args.ikke_vent)
+    else:
+        generer_batch(conn, artikler, args.kategori, args.lengde, args.mappe_id, args.på_nytt)
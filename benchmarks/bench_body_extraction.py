@@ -0,0 +1,82 @@
+# benchmarks/bench_body_extraction.py
+"""
+Mikro-benchmark: brødtekst fra syntetiske artikkelsider
+(benchmarks/syntetisk/artikler/) med den gamle EMA-selektoren i
+BeautifulSoup/html.parser (slik hent_artikkeltekst gjorde før) mot
+body_extraction.uthent.
+
+Sidene er konstruert etter markupen til hvert domene, ikke lagret fra
+nettstedene. Treffraten sier derfor at reglene og tetthetsmetoden
+håndterer denne markupen – ikke at de treffer dagens ekte sider. Legg til
+lagrede sider i samme mappe (og i artikler.json) for å måle det.
+
+Et treff er tekst der både første og siste avsnitt er med og ingenting av
+støyen (cookie-banner, meny, relaterte saker, bunntekst) er kommet med.
+
+    python benchmarks/bench_body_extraction.py [--gjentak 50]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bs4 import BeautifulSoup
+
+from body_extraction import uthent
+
+ARTIKLER = Path(__file__).parent / "syntetisk" / "artikler"
+
+
+def gammel(html: str, url: str) -> tuple[str | None, str | None]:
+    soup = BeautifulSoup(html, "html.parser")
+    content_div = soup.select("div.ema-node-content-wrapper div.item")
+    tekst = "\n\n".join(div.get_text(strip=True) for div in content_div)
+    return (tekst, "ema-selektor") if tekst.strip() else (None, None)
+
+
+def er_treff(tekst: str | None, side: dict) -> bool:
+    if not tekst:
+        return False
+    flat = " ".join(tekst.split())
+    return (side["første"] in flat and side["siste"] in flat
+            and not any(støy in flat for støy in side["ikke"]))
+
+
+def mål(navn: str, funksjon, sider: list[tuple[dict, str]], gjentak: int) -> dict:
+    start = time.perf_counter()
+    for _ in range(gjentak):
+        for side, html in sider:
+            funksjon(html, side["url"])
+    tid = (time.perf_counter() - start) / (gjentak * len(sider))
+
+    resultater = [(side["fil"], *funksjon(html, side["url"])) for side, html in sider]
+    treff = sum(er_treff(tekst, side) for (side, _), (_, tekst, _) in zip(sider, resultater))
+    print(f"\n{navn}: {tid * 1000:.2f} ms/side, treff {treff}/{len(sider)}")
+    for (side, _), (fil, tekst, metode) in zip(sider, resultater):
+        status = "ok " if er_treff(tekst, side) else "BOM"
+        print(f"  {status} {fil:<24} {metode or '-':<12} {len(tekst or ''):>6} tegn")
+    return {"ms_per_side": tid * 1000, "treff": treff}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--gjentak", type=int, default=50)
+    args = parser.parse_args()
+
+    manifest = json.loads((ARTIKLER / "artikler.json").read_text(encoding="utf-8"))
+    sider = [(s, (ARTIKLER / s["fil"]).read_text(encoding="utf-8")) for s in manifest["sider"]]
+    print(f"{len(sider)} {'syntetiske ' if manifest.get('syntetisk') else ''}sider, "
+          f"{sum(len(h) for _, h in sider) // 1024} kB HTML, {args.gjentak} gjentak")
+
+    før = mål("EMA-selektor (BeautifulSoup, html.parser)", gammel, sider, args.gjentak)
+    etter = mål("body_extraction.uthent (lxml)", uthent, sider, args.gjentak)
+    print(f"\nSpeedup: {før['ms_per_side'] / etter['ms_per_side']:.1f}x, "
+          f"treff {før['treff']} → {etter['treff']} av {len(sider)}")
+
+
+if __name__ == "__main__":
+    main()
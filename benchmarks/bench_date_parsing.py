@@ -0,0 +1,68 @@
+# benchmarks/bench_date_parsing.py
+"""
+Mikro-benchmark: dateparser.parse direkte (slik er_nylig_artikkel gjorde før)
+mot date_parsing.tolk_dato på en realistisk batch fra én skrapekjøring.
+
+    python benchmarks/bench_date_parsing.py
+"""
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from date_parsing import _tolk_cachet, tolk_dato
+
+
+def lag_batch(n: int = 2000, seed: int = 42) -> list[str]:
+    """~90 % ISO, resten vanlige engelske/norske formater og noen rare."""
+    rng = random.Random(seed)
+    i_dag = date.today()
+    måneder_en = ["January", "February", "March", "April", "May", "June", "July",
+                  "August", "September", "October", "November", "December"]
+    måneder_nb = ["januar", "februar", "mars", "april", "mai", "juni", "juli",
+                  "august", "september", "oktober", "november", "desember"]
+    batch = []
+    for _ in range(n):
+        d = i_dag - timedelta(days=rng.randrange(0, 30))
+        r = rng.random()
+        if r < 0.90:
+            batch.append(d.isoformat())
+        elif r < 0.95:
+            batch.append(f"{måneder_en[d.month - 1]} {d.day}, {d.year}")
+        elif r < 0.98:
+            batch.append(f"{d.day}. {måneder_nb[d.month - 1]} {d.year}")
+        else:
+            batch.append(rng.choice(["2 days ago", "yesterday", "i går", "Mon, 16 Jun 2025 09:00:00 GMT"]))
+    return batch
+
+
+def mål(navn: str, funksjon, batch: list[str]) -> float:
+    start = time.perf_counter()
+    for s in batch:
+        funksjon(s)
+    tid = time.perf_counter() - start
+    print(f"{navn:<32} {tid * 1000:9.1f} ms  ({tid / len(batch) * 1e6:8.1f} µs/dato)")
+    return tid
+
+
+def main():
+    batch = lag_batch()
+    print(f"Batch: {len(batch)} datoer, {len(set(batch))} unike\n")
+
+    start = time.perf_counter()
+    import dateparser
+    print(f"{'import dateparser':<32} {(time.perf_counter() - start) * 1000:9.1f} ms\n")
+
+    gammel = mål("dateparser.parse", lambda s: dateparser.parse(s, languages=["nb", "en"]), batch)
+    _tolk_cachet.cache_clear()
+    kald = mål("tolk_dato (kald cache)", tolk_dato, batch)
+    varm = mål("tolk_dato (varm cache)", tolk_dato, batch)
+
+    print(f"\nSpeedup: {gammel / kald:.0f}x kald, {gammel / varm:.0f}x varm")
+
+
+if __name__ == "__main__":
+    main()
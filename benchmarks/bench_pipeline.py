@@ -0,0 +1,326 @@
+# benchmarks/bench_pipeline.py
+"""
+Ende-til-ende-benchmark uten nett: skraping (run_daily_scrape.main),
+artikkelgenerering (generer_artikkel) og opplasting
+(last_opp_til_google_docs) mot stand-ins fra benchmarks/standins.py.
+
+Forsinkelsene er satt til omtrent det de ekte tjenestene bruker og skaleres
+med --tidsskala; backoff, frister og rate-grenser i resilience.py skaleres
+likt, så forholdet mellom dem er som i drift. Rapporterer gjennomstrømning,
+p50/p95 per element og toppminne (tracemalloc).
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --scenario skraping --antall 1000 --feilrate 0.05
+    python benchmarks/bench_pipeline.py --latens firecrawl=12 --json resultater.json
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import partial
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.dirname(__file__))
+
+from standins import (SYNTETISK, FalskFirecrawl, FalskGoogle, FalskOpenAI, FalskWeb,
+                      Forsinkelse)
+
+# Typiske svartider i sekunder før skalering
+STANDARD_LATENS = {
+    "firecrawl": 8.0,       # extract-jobb inkl. polling
+    "openai": 6.0,          # gpt-4o, ~400 tokens ut
+    "google": 0.3,          # én Drive/Docs-rundtur
+    "web": 0.4,             # GET av en listeside
+}
+SCENARIOER = ("skraping", "generering", "strømming", "bulk", "opplasting")
+
+
+def konfigurer_resiliens(skala: float):
+    """Må kjøres før resilience importeres – verdiene leses ved import."""
+    for navn, verdi in {
+        "RESILIENS_BASIS_VENT": 1.0 * skala,
+        "RESILIENS_MAKS_VENT": 30 * skala,
+        "RESILIENS_PAUSE": 300 * skala,
+        "RESILIENS_FRIST_FIRECRAWL": 180 * skala,
+        "RESILIENS_FRIST_HTTP": 45 * skala,
+        "RESILIENS_FIRECRAWL_PER_MIN": 20 / skala,
+        "RESILIENS_DOMENE_PER_SEK": 1 / skala,
+    }.items():
+        os.environ.setdefault(navn, str(verdi))
+    os.environ.setdefault("FIRECRAWL_API_KEY", "benchmark")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+
+def _nullstill_resiliens():
+    import resilience
+    resilience._brytere.clear()
+    resilience._bøtter.clear()
+
+
+_originaler: dict = {}
+
+def _original(modul, navn: str):
+    """Funksjonen slik den var før første scenario byttet den ut."""
+    return _originaler.setdefault((modul.__name__, navn), getattr(modul, navn))
+
+
+def persentil(verdier: list[float], p: int) -> float:
+    if not verdier:
+        return float("nan")
+    if len(verdier) == 1:
+        return verdier[0]
+    return statistics.quantiles(verdier, n=100, method="inclusive")[p - 1]
+
+
+# ---------- scenarioer ---------- #
+def skraping(antall: int, forsinkelser: dict[str, Forsinkelse], mappe: Path, **_) -> dict:
+    import jobs
+    import resilience
+    import run_daily_scrape as r
+    import source_fingerprints
+    import storage
+    from metrics import Kjøringsmetrikker
+    from seen_index import SettIndeks
+
+    # Alle filer skrives til en midlertidig mappe, ikke prosjektroten
+    jobs.JOBB_MAPPE, jobs.LÅS_FILE = mappe / "jobber", mappe / "skraping.lock"
+    source_fingerprints.FINGERPRINT_FILE = mappe / "kilde_fingerprints.json"
+    storage.importer_json = lambda conn, *a, **k: (0, 0)
+    storage.koble_til = partial(_original(storage, "koble_til"), mappe / "artikler.db")
+    r.INDEX_FILE = mappe / "seen_urls.idx"
+    r.SettIndeks = partial(SettIndeks, r.INDEX_FILE)
+    r.Kjøringsmetrikker = partial(Kjøringsmetrikker, mappe=mappe / "rapporter")
+    r.FIRECRAWL_API_KEY = "benchmark"
+
+    domener = max(1, antall // 4)
+    kilder = [f"https://kilde{i % domener}.bench.invalid/nyheter/{i}" for i in range(antall)]
+    r.last_inn_kilder = lambda: kilder
+    r.fc = FalskFirecrawl(forsinkelser["firecrawl"])
+    resilience._sesjon = FalskWeb(forsinkelser["web"])   # robust_get bruker sesjon().get
+
+    startet, ferdig, feilet = {}, {}, set()
+    original = r.hendelse
+
+    def lytt(type_: str, **data):
+        if type_ == "kilde_startet":
+            startet[data["kilde"]] = time.perf_counter()
+        elif type_ == "kilde_hentet":
+            ferdig[data["kilde"]] = time.perf_counter()
+            feilet.discard(data["kilde"])
+        elif type_ == "kilde_feilet":
+            ferdig[data["kilde"]] = time.perf_counter()
+            feilet.add(data["kilde"])
+        original(type_, **data)
+
+    r.hendelse = lytt
+    try:
+        r.main("benchmark")
+    finally:
+        r.hendelse = original
+    return {
+        "latenser": [ferdig[k] - startet[k] for k in ferdig if k in startet],
+        "feil": len(feilet),
+    }
+
+
+def _kjør_parallelt(oppgave, antall: int, parallelle: int) -> dict:
+    latenser, feil = [], 0
+
+    def målt(i: int):
+        start = time.perf_counter()
+        try:
+            oppgave(i)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, e
+
+    with ThreadPoolExecutor(max_workers=parallelle) as pool:
+        for tid, e in pool.map(målt, range(antall)):
+            latenser.append(tid)
+            feil += e is not None
+    return {"latenser": latenser, "feil": feil}
+
+
+def generering(antall: int, forsinkelser: dict[str, Forsinkelse], parallelle: int, mappe: Path, **_) -> dict:
+    import generate_articles
+    import llm_cache
+
+    import metrics
+
+    generate_articles.client = FalskOpenAI(forsinkelser["openai"])
+    llm_cache._cache = llm_cache.LLMCache(mappe / "llm_cache.db")
+    metrics.RAPPORT_MAPPE = mappe / "rapporter"
+    tekst = (SYNTETISK / "artikkeltekst.txt").read_text(encoding="utf-8")
+    return _kjør_parallelt(
+        lambda i: generate_articles.generer_artikkel(
+            tekst, f"https://www.ema.europa.eu/en/news/{i}", "Legemidler", "Middels (~700 tegn)"
+        ),
+        antall, parallelle,
+    )
+
+
+def strømming(antall: int, forsinkelser: dict[str, Forsinkelse], parallelle: int, mappe: Path, **_) -> dict:
+    """Som generering, men via generer_artikkel_strøm; måler også tid til første bit."""
+    import generate_articles
+    import llm_cache
+    import metrics
+
+    generate_articles.client = FalskOpenAI(forsinkelser["openai"])
+    llm_cache._cache = llm_cache.LLMCache(mappe / "llm_cache.db")
+    metrics.RAPPORT_MAPPE = mappe / "rapporter"
+    tekst = (SYNTETISK / "artikkeltekst.txt").read_text(encoding="utf-8")
+    ttft = []
+
+    def strøm(i: int):
+        start = time.perf_counter()
+        for n, _ in enumerate(generate_articles.generer_artikkel_strøm(
+            tekst, f"https://www.ema.europa.eu/en/news/{i}", "Legemidler", "Middels (~700 tegn)"
+        )):
+            if n == 0:
+                ttft.append(time.perf_counter() - start)
+
+    resultat = _kjør_parallelt(strøm, antall, parallelle)
+    resultat["ttft"] = ttft
+    return resultat
+
+
+def bulk(antall: int, forsinkelser: dict[str, Forsinkelse], mappe: Path, skala: float, **_) -> dict:
+    """Batch API-modusen (bulk_generation) fra ferdig hentet råtekst til .docx."""
+    import batch_generation
+    import bulk_generation
+    import llm_cache
+    import storage
+
+    llm_cache._cache = llm_cache.LLMCache(mappe / "llm_cache.db")
+    batch_generation.DOCX_MAPPE = mappe / "genererte"
+    bulk_generation.JSONL_MAPPE = mappe / "genererte" / "bulk"
+    storage.importer_json = lambda conn, *a, **k: (0, 0)
+    conn = _original(storage, "koble_til")(mappe / "artikler.db")
+    tekst = (SYNTETISK / "artikkeltekst.txt").read_text(encoding="utf-8")
+    i_dag = date.today().isoformat()
+    with conn:
+        storage.legg_til_artikler(conn, [{"url": f"https://www.ema.europa.eu/en/news/{i}", "tittel": f"Sak {i}",
+                                          "dato": i_dag, "funnet_dato": i_dag} for i in range(antall)])
+    artikler = storage.hent_artikler_funnet(conn, [i_dag])
+    with conn:
+        for a in artikler:
+            storage.oppdater_generering(conn, a["id"], status="hentet", raatekst=tekst)
+
+    start, ferdig = time.perf_counter(), []
+    telling = bulk_generation.generer_bulk(
+        conn, artikler, client=FalskOpenAI(forsinkelser["openai"]), mappe_id=None,
+        poll_sek=max(0.01, 60 * skala),
+        ved_status=lambda a, status: status == "ferdig" and ferdig.append(time.perf_counter() - start),
+    )
+    return {"latenser": ferdig, "feil": telling.get("feilet", 0)}
+
+
+def opplasting(antall: int, forsinkelser: dict[str, Forsinkelse], mappe: Path, parallelle: int, **_) -> dict:
+    import google_docs
+
+    google = FalskGoogle(forsinkelser["google"])
+    google_docs._get_credentials = lambda: object()
+    google_docs.build = lambda *a, **k: google
+    google_docs._klienter = google_docs.GoogleKlienter()
+    google_docs._mapper = google_docs.MappeCache(mappe / "drive_mapper.json")
+    innhold = json.loads((SYNTETISK / "openai_chat.json").read_text(encoding="utf-8"))["choices"][0]["message"]["content"]
+    resultat = _kjør_parallelt(
+        lambda i: google_docs.last_opp_til_google_docs(
+            f"Benchmark {i}", innhold, mappe_id="benchmark-mappe", dato=date.today(), nøkkelord="astma, EMA"
+        ),
+        antall, parallelle,
+    )
+    resultat["rundturer"] = sum(google.rundturer.values())
+    return resultat
+
+
+# ---------- kjøring ---------- #
+def kjør(scenario: str, antall: int, latens: dict[str, float], feilrate: float,
+         skala: float, parallelle: int, seed: int) -> dict:
+    _nullstill_resiliens()
+    forsinkelser = {navn: Forsinkelse(navn, sek * skala, feilrate, seed=seed) for navn, sek in latens.items()}
+    with tempfile.TemporaryDirectory(prefix="healthtalk-bench-") as tmp:
+        tracemalloc.start()
+        start = time.perf_counter()
+        resultat = globals()[scenario](antall, forsinkelser, mappe=Path(tmp), parallelle=parallelle, skala=skala)
+        tid = time.perf_counter() - start
+        _, topp = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    latenser = resultat["latenser"]
+    return {
+        "scenario": scenario,
+        "antall": antall,
+        "sekunder": round(tid, 3),
+        "per_sekund": round(antall / tid, 2) if tid else None,
+        "p50_ms": round(persentil(latenser, 50) * 1000, 1),
+        "p95_ms": round(persentil(latenser, 95) * 1000, 1),
+        "feil": resultat["feil"],
+        "toppminne_mb": round(topp / 2**20, 1),
+        "api_kall": {navn: f.kall for navn, f in forsinkelser.items() if f.kall},
+        **({"rundturer_per_element": round(resultat["rundturer"] / antall, 2)} if "rundturer" in resultat else {}),
+        **({"ttft_p50_ms": round(persentil(resultat["ttft"], 50) * 1000, 1),
+            "ttft_p95_ms": round(persentil(resultat["ttft"], 95) * 1000, 1)} if "ttft" in resultat else {}),
+    }
+
+
+def skriv_tabell(rader: list[dict]):
+    print(f"\n{'scenario':<12} {'antall':>6} {'tid s':>8} {'per s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'feil':>5} {'minne MB':>9}  kall")
+    for r in rader:
+        kall = ", ".join(f"{k}={v}" for k, v in r["api_kall"].items())
+        if "ttft_p50_ms" in r:
+            kall += f"  (første bit p50 {r['ttft_p50_ms']:.0f} ms, p95 {r['ttft_p95_ms']:.0f} ms)"
+        print(f"{r['scenario']:<12} {r['antall']:>6} {r['sekunder']:>8.2f} {r['per_sekund']:>8.1f} "
+              f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['feil']:>5} {r['toppminne_mb']:>9.1f}  {kall}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=SCENARIOER, action="append",
+                        help="kan gis flere ganger (standard: alle)")
+    parser.add_argument("--antall", type=int, action="append",
+                        help="kilder/artikler per kjøring, kan gis flere ganger (standard: 10, 100, 1000)")
+    parser.add_argument("--latens", action="append", default=[], metavar="TJENESTE=SEK",
+                        help=f"overstyr snittlatens før skalering ({', '.join(STANDARD_LATENS)})")
+    parser.add_argument("--feilrate", type=float, default=0.0, help="andel kall som gir 503 (0–1)")
+    parser.add_argument("--tidsskala", type=float, default=0.02,
+                        help="ganges med alle forsinkelser, backoff og frister (1 = sanntid)")
+    parser.add_argument("--parallelle", type=int, default=4,
+                        help="samtidige kall i generering/opplasting")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="skriv resultatene til fil")
+    args = parser.parse_args()
+
+    latens = dict(STANDARD_LATENS)
+    for overstyring in args.latens:
+        navn, _, verdi = overstyring.partition("=")
+        if navn not in latens:
+            parser.error(f"ukjent tjeneste {navn!r}")
+        latens[navn] = float(verdi)
+
+    konfigurer_resiliens(args.tidsskala)
+    import run_daily_scrape                     # noqa: F401 – setter opp logging
+    logging.getLogger().setLevel(logging.WARNING)
+
+    rader = []
+    for scenario in args.scenario or SCENARIOER:
+        for antall in args.antall or (10, 100, 1000):
+            rader.append(kjør(scenario, antall, latens, args.feilrate,
+                              args.tidsskala, args.parallelle, args.seed))
+            print(f"  {scenario} × {antall}: {rader[-1]['sekunder']:.2f} s", flush=True)
+    skriv_tabell(rader)
+    if args.json:
+        args.json.write_text(json.dumps(rader, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
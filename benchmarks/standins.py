@@ -0,0 +1,332 @@
+# benchmarks/standins.py
+"""
+Lokale stand-ins for Firecrawl, OpenAI (også Batch API), Google Drive/Docs
+og kildesidene.
+
+De spiller av svarene i benchmarks/syntetisk/ – håndskrevne filer i samme
+form som de ekte API-svarene, ikke opptak av ekte kjøringer – med
+konfigurerbar forsinkelse (log-normal rundt et snitt) og feilrate, så hele
+pipelinen kan måles uten API-nøkler eller nett. Alle er trådsikre og teller kallene sine.
+"""
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+SYNTETISK = Path(__file__).parent / "syntetisk"
+
+
+class FalskAPIFeil(Exception):
+    """Simulert 5xx fra en tjeneste – ser ut som de ekte feilene for resilience.py."""
+
+    def __init__(self, tjeneste: str, status_code: int = 503):
+        super().__init__(f"{tjeneste}: {status_code} Service Unavailable (simulert)")
+        self.status_code = status_code
+
+
+class Forsinkelse:
+    """Log-normal ventetid rundt `snitt` sekunder og feil med sannsynlighet `feilrate`."""
+
+    def __init__(self, navn: str, snitt: float, feilrate: float = 0.0, spredning: float = 0.5, seed: int = 0):
+        self.navn = navn
+        self.snitt = snitt
+        self.feilrate = feilrate
+        self.spredning = spredning
+        self._rng = random.Random(f"{seed}-{navn}")
+        self._lås = threading.Lock()
+        self.kall = 0
+        self.feil = 0
+
+    def trekk(self) -> tuple[float, bool]:
+        """(ventetid, om kallet skal feile) for neste kall."""
+        with self._lås:
+            self.kall += 1
+            tid = (self._rng.lognormvariate(math.log(self.snitt) - self.spredning ** 2 / 2, self.spredning)
+                   if self.snitt > 0 else 0.0)
+            feiler = self._rng.random() < self.feilrate
+            if feiler:
+                self.feil += 1
+        return tid, feiler
+
+    def vent(self):
+        tid, feiler = self.trekk()
+        time.sleep(tid)
+        if feiler:
+            raise FalskAPIFeil(self.navn)
+
+
+def _les_json(navn: str) -> dict:
+    return json.loads((SYNTETISK / navn).read_text(encoding="utf-8"))
+
+
+# ---------- Firecrawl ---------- #
+class FalskFirecrawl:
+    """
+    `extract(urls, prompt, schema)` som FirecrawlApp. Artiklene i det syntetiske
+    svaret gis nye URL-er under hver kilde, og datoene flyttes så
+    referansedatoen blir i dag – da blir noen nye og noen gamle, som i en ekte kjøring.
+    """
+
+    def __init__(self, forsinkelse: Forsinkelse):
+        self.forsinkelse = forsinkelse
+        svar = _les_json("firecrawl_extract.json")
+        forskyvning = date.today() - date.fromisoformat(svar["referansedato"])
+        self._maler = [
+            {**art, "published": (date.fromisoformat(art["published"]) + forskyvning).isoformat()}
+            for art in svar["respons"]["data"]["articles"]
+        ]
+
+    def extract(self, urls=None, prompt=None, schema=None, **_):
+        self.forsinkelse.vent()
+        artikler = []
+        for kilde in urls:
+            for art in self._maler:
+                slug = art["url"].rstrip("/").rsplit("/", 1)[-1]
+                artikler.append({**art, "url": f"{kilde.rstrip('/')}/{slug}", "source": kilde})
+        return {"success": True, "data": {"articles": artikler}}
+
+
+# ---------- OpenAI ---------- #
+class FalskOpenAI:
+    """Dekker `chat.completions.create` og `images.generate` slik koden bruker dem."""
+
+    def __init__(self, chat: Forsinkelse, bilde: Forsinkelse | None = None, batch: "FalskBatchServer | None" = None):
+        self._chat_svar = _les_json("openai_chat.json")
+        self._bilde_svar = _les_json("openai_image.json")
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat(chat)))
+        self.images = SimpleNamespace(generate=self._bilde(bilde or chat))
+        self.batch_server = batch or FalskBatchServer(chat)
+        self.files = self.batch_server.files
+        self.batches = self.batch_server.batches
+
+    def _chat(self, forsinkelse: Forsinkelse):
+        def create(model=None, messages=None, stream=False, **_):
+            if stream:
+                return self._strøm(forsinkelse)
+            forsinkelse.vent()
+            valg = self._chat_svar["choices"][0]
+            return SimpleNamespace(
+                id=self._chat_svar["id"],
+                model=model or self._chat_svar["model"],
+                choices=[SimpleNamespace(index=0, finish_reason=valg["finish_reason"],
+                                         message=SimpleNamespace(**valg["message"]))],
+                usage=SimpleNamespace(**self._chat_svar["usage"]),
+            )
+        return create
+
+    def _strøm(self, forsinkelse: Forsinkelse):
+        """
+        create(stream=True) returnerer etter ~15 % av svartiden (tid til
+        første token for gpt-4o); resten fordeles jevnt over ordene i svaret.
+        """
+        tid, feiler = forsinkelse.trekk()
+        time.sleep(tid * 0.15)
+        if feiler:
+            raise FalskAPIFeil(forsinkelse.navn)
+        ord_ = re.findall(r"\S+\s*", self._chat_svar["choices"][0]["message"]["content"])
+        pause = tid * 0.85 / max(len(ord_), 1)
+
+        def biter():
+            for i, o in enumerate(ord_):
+                if i:
+                    time.sleep(pause)
+                yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=o))])
+        return biter()
+
+    def _bilde(self, forsinkelse: Forsinkelse):
+        def generate(prompt=None, n=1, **_):
+            forsinkelse.vent()
+            return SimpleNamespace(data=[SimpleNamespace(**self._bilde_svar["data"][0]) for _ in range(n)])
+        return generate
+
+
+class FalskBatchServer:
+    """
+    Lokal stand-in for /v1/files og /v1/batches. En jobb behandles i en
+    bakgrunnstråd: hver forespørsel trekker svartid og feil fra
+    `forsinkelse`, men de kjøres parallelt som hos OpenAI – jobben er
+    ferdig etter `kø` sekunder pluss den lengste forespørselen.
+    """
+
+    def __init__(self, forsinkelse: Forsinkelse, kø: float = 0.0):
+        self.forsinkelse = forsinkelse
+        self.kø = kø
+        self._chat_svar = _les_json("openai_chat.json")
+        self._filer: dict[str, str] = {}
+        self._jobber: dict[str, SimpleNamespace] = {}
+        self._lås = threading.Lock()
+        self.files = SimpleNamespace(create=self._opprett_fil, content=self._innhold)
+        self.batches = SimpleNamespace(create=self._opprett_jobb, retrieve=self._hent_jobb)
+
+    def _lagre_fil(self, tekst: str) -> str:
+        fil_id = f"file-{uuid.uuid4().hex[:24]}"
+        with self._lås:
+            self._filer[fil_id] = tekst
+        return fil_id
+
+    def _opprett_fil(self, file=None, purpose=None, **_):
+        data = file.read() if hasattr(file, "read") else Path(file).read_bytes()
+        return SimpleNamespace(id=self._lagre_fil(data.decode("utf-8") if isinstance(data, bytes) else data),
+                               purpose=purpose)
+
+    def _innhold(self, fil_id: str):
+        with self._lås:
+            return SimpleNamespace(text=self._filer[fil_id])
+
+    def _opprett_jobb(self, input_file_id=None, endpoint=None, completion_window=None, **_):
+        linjer = [json.loads(l) for l in self._innhold(input_file_id).text.splitlines() if l.strip()]
+        jobb = SimpleNamespace(
+            id=f"batch_{uuid.uuid4().hex[:24]}", status="validating", endpoint=endpoint,
+            input_file_id=input_file_id, output_file_id=None, error_file_id=None,
+            request_counts=SimpleNamespace(total=len(linjer), completed=0, failed=0),
+        )
+        with self._lås:
+            self._jobber[jobb.id] = jobb
+        threading.Thread(target=self._kjør, args=(jobb, linjer), daemon=True).start()
+        return self._hent_jobb(jobb.id)
+
+    def _hent_jobb(self, batch_id: str):
+        with self._lås:
+            jobb = self._jobber[batch_id]
+            return SimpleNamespace(**{**vars(jobb), "request_counts": SimpleNamespace(**vars(jobb.request_counts))})
+
+    def _kjør(self, jobb: SimpleNamespace, linjer: list[dict]):
+        time.sleep(self.kø)
+        with self._lås:
+            jobb.status = "in_progress"
+        ut, feil, lengst = [], [], 0.0
+        for linje in linjer:
+            tid, feiler = self.forsinkelse.trekk()
+            lengst = max(lengst, tid)
+            if feiler:
+                feil.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": linje["custom_id"],
+                             "response": {"status_code": 503, "body": {"error": {
+                                 "message": "Service Unavailable (simulert)", "type": "server_error"}}},
+                             "error": None})
+            else:
+                svar = {**self._chat_svar, "model": linje["body"].get("model", self._chat_svar["model"])}
+                ut.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": linje["custom_id"],
+                           "response": {"status_code": 200, "body": svar}, "error": None})
+        time.sleep(lengst)
+        som_jsonl = lambda rader: "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rader)
+        ut_id = self._lagre_fil(som_jsonl(ut)) if ut else None
+        feil_id = self._lagre_fil(som_jsonl(feil)) if feil else None
+        with self._lås:
+            jobb.output_file_id, jobb.error_file_id = ut_id, feil_id
+            jobb.request_counts.completed, jobb.request_counts.failed = len(ut), len(feil)
+            jobb.status = "completed"
+
+
+# ---------- Google Drive / Docs ---------- #
+class _Forespørsel:
+    def __init__(self, tjeneste: "FalskGoogle", navn: str, kwargs: dict):
+        self._tjeneste, self._navn, self._kwargs = tjeneste, navn, kwargs
+
+    def execute(self, **_):
+        return self._tjeneste._utfør(self._navn, self._kwargs)
+
+
+class _Ressurs:
+    def __init__(self, tjeneste: "FalskGoogle", navn: str):
+        self._tjeneste, self._navn = tjeneste, navn
+
+    def __getattr__(self, metode: str):
+        return lambda **kw: _Forespørsel(self._tjeneste, f"{self._navn}.{metode}", kw)
+
+
+class FalskGoogle:
+    """
+    Én felles stand-in for både Drive v3 og Docs v1 (det som returneres av
+    googleapiclient.discovery.build). Hver execute() er én rundtur og telles
+    i `rundturer`.
+    """
+
+    def __init__(self, forsinkelse: Forsinkelse):
+        self.forsinkelse = forsinkelse
+        self.rundturer: Counter[str] = Counter()
+        self.filer: dict[str, dict] = {}
+        self._lås = threading.Lock()
+
+    def files(self):
+        return _Ressurs(self, "files")
+
+    def documents(self):
+        return _Ressurs(self, "documents")
+
+    def _ny_fil(self, **felter) -> dict:
+        fil = {"id": uuid.uuid4().hex, "parents": ["root"], **felter}
+        self.filer[fil["id"]] = fil
+        return fil
+
+    def _utfør(self, navn: str, kw: dict):
+        self.forsinkelse.vent()
+        with self._lås:
+            self.rundturer[navn] += 1
+            if navn == "files.list":
+                navn_q = re.search(r"name='([^']*)'", kw.get("q", ""))
+                forelder = re.search(r"'([^']*)' in parents", kw.get("q", ""))
+                treff = [f for f in self.filer.values()
+                         if f.get("mimeType") == "application/vnd.google-apps.folder"
+                         and (not navn_q or f.get("name") == navn_q.group(1))
+                         and (not forelder or forelder.group(1) in f["parents"])
+                         and not ("trashed=false" in kw.get("q", "") and f.get("trashed"))]
+                return {"files": [{"id": f["id"], "name": f["name"]} for f in treff]}
+            if navn == "files.create":
+                body = kw.get("body", {})
+                fil = self._ny_fil(**{**body, "parents": body.get("parents", ["root"])})
+                media = kw.get("media_body")
+                if media is not None:           # opplastet innhold (konverteres til dokument hos Google)
+                    fil["innhold"] = media.getbytes(0, media.size()).decode("utf-8")
+                return {"id": fil["id"], "parents": fil["parents"]}
+            if navn == "files.update":
+                fil = self.filer.setdefault(kw["fileId"], {"id": kw["fileId"], "parents": ["root"]})
+                fil.update(kw.get("body") or {})
+                if kw.get("addParents"):
+                    fil["parents"] = [p for p in fil["parents"] if p != kw.get("removeParents")]
+                    fil["parents"].append(kw["addParents"])
+                return {"id": fil["id"], "parents": fil["parents"]}
+            if navn == "files.get":
+                return dict(self.filer.get(kw["fileId"], {"id": kw["fileId"]}))
+            if navn == "documents.create":
+                fil = self._ny_fil(name=kw.get("body", {}).get("title"),
+                                   mimeType="application/vnd.google-apps.document")
+                return {"documentId": fil["id"], "title": fil["name"]}
+            if navn == "documents.batchUpdate":
+                return {"documentId": kw["documentId"], "replies": [{} for _ in kw["body"]["requests"]]}
+            raise NotImplementedError(f"FalskGoogle støtter ikke {navn}")
+
+
+# ---------- kildesidene ---------- #
+class FalskRespons:
+    def __init__(self, status_code: int, text: str = "", headers: dict | None = None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} (simulert)", response=self)
+
+
+class FalskWeb:
+    """Erstatter HTTP-sesjonen (resilience.sesjon): alle URL-er gir den syntetiske listesiden."""
+
+    def __init__(self, forsinkelse: Forsinkelse):
+        self.forsinkelse = forsinkelse
+        self._html = (SYNTETISK / "liste.html").read_text(encoding="utf-8")
+
+    def get(self, url, headers=None, **_):
+        try:
+            self.forsinkelse.vent()
+        except FalskAPIFeil as e:
+            return FalskRespons(e.status_code)
+        return FalskRespons(200, self._html, {"Content-Type": "text/html; charset=utf-8"})
@@ -0,0 +1,182 @@
+# body_extraction.py
+"""
+Uthenting av brødteksten fra en artikkelside.
+
+1. Regel for domenet (ARTIKKEL_REGLER, samme domenenøkler som
+   SOURCE_CONFIG i run_daily_scrape): CSS-selektor for innholdet og
+   eventuelt hva som skal fjernes inni det.
+2. Ellers, eller når regelen ikke treffer: tekst-tetthet i
+   readability-stil – avsnitt gir poeng til forelder og besteforelder, og
+   blokken med mest tekst og minst lenketekst vinner.
+
+Regelen kjører på siden slik den er (bare script, stil o.l. fjernet);
+den generelle støyrensingen (meny, topp/bunn, klasser som "share" og
+"related-content") gjøres først når tetthetsmetoden trengs.
+
+Alt går på lxml (raskere enn BeautifulSoup med html.parser). Gir ingen av
+delene minst MIN_TEGN tegn, returneres None, og kalleren faller tilbake
+til hele siden (se generate_articles._chat_parametre).
+
+    python benchmarks/bench_body_extraction.py   # tid og treffrate på syntetiske sider
+"""
+import re
+from collections import defaultdict
+
+import lxml.html
+from lxml import etree
+
+from seen_index import domene_for
+
+MIN_TEGN = 250
+
+# Nøkkel er domenet uten "www.". "innhold" kan ha flere alternativer
+# (kommaseparert); alle treff tas med i dokumentrekkefølge.
+ARTIKKEL_REGLER = {
+    "ema.europa.eu": {"innhold": "div.ema-node-content-wrapper div.item"},
+    "legemiddelverket.no": {"innhold": "main article", "fjern": ".share, .related, aside"},
+    "dmp.no": {"innhold": "main#main-content article, main#main-content .article-body"},
+    "fda.gov": {"innhold": "article[role='article'] .col-md-8, div[role='main'] article",
+                "fjern": ".inset-column, .lcds-metadata-list"},
+    "nejm.org": {"innhold": "#article_body, .o-article-body"},
+    "bmj.com": {"innhold": ".article-body, #article-body", "fjern": ".article-tools"},
+    "thelancet.com": {"innhold": ".article__body, section.article-section__full"},
+    "jamanetwork.com": {"innhold": ".article-full-text"},
+    "dailyreporter.esmo.org": {"innhold": ".article-content, .article-body"},
+    "dailynews.ascopubs.org": {"innhold": ".article__body"},
+}
+
+_USYNLIG = ["script", "style", "noscript", "template", "svg", "iframe"]
+_STØY = ["form", "nav", "header", "footer", "aside", "button"]
+# Matches hele klassenavn ("share", "related-content", "cookie_bar"), ikke
+# innpakninger som "has-sidebar" eller "article-related-layout"
+_STØY_KLASSE = re.compile(
+    r"(cookie|consent|banner|breadcrumbs?|share|sharing|social|newsletter|related|sidebar|menu)([-_]\S*)?", re.I
+)
+_AVSNITT = {"p", "h1", "h2", "h3", "h4", "li", "blockquote", "pre", "td"}
+
+
+def _tekst(el) -> str:
+    return re.sub(r"\s+", " ", el.text_content()).strip()
+
+
+def _i_avsnitt(el, rot) -> bool:
+    forelder = el.getparent()
+    while forelder is not None and forelder is not rot:
+        if forelder.tag in _AVSNITT:
+            return True
+        forelder = forelder.getparent()
+    return False
+
+
+def _avsnitt(el) -> str:
+    """Teksten i `el` med ett avsnitt per blokk-element (eller hele teksten)."""
+    if el.tag in _AVSNITT:
+        return _tekst(el)
+    deler = [t for t in (_tekst(d) for d in el.iter(*_AVSNITT) if not _i_avsnitt(d, el)) if t]
+    return "\n\n".join(deler) if deler else _tekst(el)
+
+
+def har_støyklasse(klasser: list[str]) -> bool:
+    """Sant hvis ett av klassenavnene er en støyklasse (brukes også av input_reduction)."""
+    return any(_STØY_KLASSE.fullmatch(klasse) for klasse in klasser)
+
+
+def _er_støy(el) -> bool:
+    return el.tag not in ("html", "body", "main", "article") and har_støyklasse(el.get("class", "").split())
+
+
+def _rens(rot):
+    """Fjerner meny, topp/bunn og støyklasser før tetthetsanalysen (reglene har egen `fjern`)."""
+    etree.strip_elements(rot, *_STØY, with_tail=False)
+    for el in rot.xpath("//*[@class]"):
+        if _er_støy(el):
+            forelder = el.getparent()
+            if forelder is not None:
+                forelder.remove(el)
+
+
+# ---------- regler ---------- #
+def fra_regel(rot, regel: dict) -> str | None:
+    treff = rot.cssselect(regel["innhold"])
+    # Nøstede treff (f.eks. både article og .article-body inni) tas bare én gang
+    treff = [el for el in treff if not any(a in treff for a in el.iterancestors())]
+    if not treff:
+        return None
+    if regel.get("fjern"):
+        for el in treff:
+            for støy in el.cssselect(regel["fjern"]):
+                if støy.getparent() is not None:
+                    støy.getparent().remove(støy)
+    tekst = "\n\n".join(t for t in (_avsnitt(el) for el in treff) if t)
+    return tekst or None
+
+
+# ---------- tekst-tetthet ---------- #
+def _lenketetthet(el) -> float:
+    lengde = len(_tekst(el))
+    if not lengde:
+        return 1.0
+    return sum(len(_tekst(a)) for a in el.iter("a")) / lengde
+
+
+def fra_tetthet(rot) -> str | None:
+    poeng: dict = defaultdict(float)
+    for p in rot.iter("p", "pre", "td", "blockquote"):
+        t = _tekst(p)
+        if len(t) < 25:
+            continue
+        verdi = 1 + t.count(",") + min(len(t) // 100, 3)
+        forelder = p.getparent()
+        if forelder is None:
+            continue
+        poeng[forelder] += verdi
+        besteforelder = forelder.getparent()
+        if besteforelder is not None:
+            poeng[besteforelder] += verdi / 2
+    if not poeng:
+        return None
+    # Lenketettheten er dyr; regn den bare for de beste kandidatene
+    kandidater = sorted(poeng, key=poeng.get, reverse=True)[:5]
+    beste = max(kandidater, key=lambda el: poeng[el] * (1 - _lenketetthet(el)))
+
+    # Søsken med mye egen tekst hører som regel med (ingress i egen blokk o.l.)
+    forelder = beste.getparent()
+    if forelder is None:
+        return _avsnitt(beste) or None
+    deler = []
+    for søsken in forelder:
+        if søsken is beste:
+            deler.append(_avsnitt(beste))
+        elif isinstance(søsken.tag, str) and (
+            poeng.get(søsken, 0) >= poeng[beste] * 0.2
+            or (len(_tekst(søsken)) >= 80 and _lenketetthet(søsken) < 0.25)
+        ):
+            deler.append(_avsnitt(søsken))
+    return "\n\n".join(d for d in deler if d) or None
+
+
+# ---------- inngang ---------- #
+def uthent(html: str, url: str | None = None) -> tuple[str | None, str | None]:
+    """(brødtekst, metode) der metode er "regel", "tetthet" eller None."""
+    if not html or not html.strip():
+        return None, None
+    try:
+        rot = lxml.html.fromstring(html)
+    except (etree.ParserError, ValueError):
+        return None, None
+    etree.strip_elements(rot, *_USYNLIG, with_tail=False)
+
+    regel = ARTIKKEL_REGLER.get(domene_for(url)) if url else None
+    if regel:
+        tekst = fra_regel(rot, regel)
+        if tekst and len(tekst) >= MIN_TEGN:
+            return tekst, "regel"
+    _rens(rot)
+    tekst = fra_tetthet(rot)
+    if tekst and len(tekst) >= MIN_TEGN:
+        return tekst, "tetthet"
+    return None, None
+
+
+def hent_brødtekst(html: str, url: str | None = None) -> str | None:
+    return uthent(html, url)[0]
@@ -0,0 +1,227 @@
+# bulk_generation.py
+"""
+Bulk-generering via OpenAI Batch API, for nattkjøringer over mange
+arkivartikler der ingen sitter og venter på svaret.
+
+    1. råteksten hentes som i batch_generation (trinnet "hent")
+    2. én chat-forespørsel per artikkel skrives til en JSONL-fil
+       (custom_id "artikkel-<id>"), lastes opp og sendes til /v1/batches
+    3. jobben polles til den er ferdig (OpenAI lover svar innen 24 timer)
+    4. svarene lagres i genereringer og i svar-cachen, og generer_batch tar
+       resten (docx og Google Docs) – genereringstrinnet er da allerede gjort
+
+Batch-kall koster halvparten og har egne, langt høyere rate-grenser enn
+synkrone kall. Jobbene lagres i tabellen batchjobber: en ny kjøring leser
+først svarene fra jobber som ble sendt tidligere, og sender bare artikler
+som ikke allerede er i en jobb.
+
+    python batch_generation.py --bulk                  # send og vent
+    python batch_generation.py --bulk --ikke-vent      # send og avslutt; neste kjøring henter svarene
+"""
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import generate_articles
+import storage
+from batch_generation import DOCX_MAPPE, MAKS_HENT, STANDARD_KATEGORI, STANDARD_LENGDE, generer_batch
+from llm_cache import hent_cache, nøkkel
+
+JSONL_MAPPE   = DOCX_MAPPE / "bulk"
+POLL_SEK      = float(os.getenv("BULK_POLL_SEK", "60"))
+MAKS_PER_JOBB = int(os.getenv("BULK_MAKS_PER_JOBB", "50000"))    # OpenAI-grensen per batch
+ENDEPUNKT     = "/v1/chat/completions"
+SLUTTSTATUS   = {"completed", "failed", "expired", "cancelled"}
+
+
+def _custom_id(artikkel_id: int) -> str:
+    return f"artikkel-{artikkel_id}"
+
+
+def _artikkel_id(custom_id: str) -> int:
+    return int(custom_id.removeprefix("artikkel-"))
+
+
+def _les_jsonl(client, fil_id: str | None) -> list[dict]:
+    if not fil_id:
+        return []
+    return [json.loads(linje) for linje in client.files.content(fil_id).text.splitlines() if linje.strip()]
+
+
+def _prøv(fn, *args) -> tuple:
+    try:
+        return fn(*args), None
+    except Exception as e:
+        logging.error(f"Forberedelse feilet: {e}")
+        return (None, None), str(e)
+
+
+# ---------- sending ---------- #
+def skriv_jsonl(forespørsler: list[tuple[int, dict]], fil: Path) -> Path:
+    """Én linje per (artikkel-ID, chat-parametre) i Batch API-formatet."""
+    fil.parent.mkdir(parents=True, exist_ok=True)
+    with open(fil, "w", encoding="utf-8") as f:
+        for artikkel_id, params in forespørsler:
+            f.write(json.dumps({"custom_id": _custom_id(artikkel_id), "method": "POST",
+                                "url": ENDEPUNKT, "body": params}, ensure_ascii=False) + "\n")
+    return fil
+
+
+def send_jobb(client, fil: Path) -> str:
+    with open(fil, "rb") as f:
+        opplastet = client.files.create(file=f, purpose="batch")
+    jobb = client.batches.create(input_file_id=opplastet.id, endpoint=ENDEPUNKT,
+                                 completion_window="24h", metadata={"kilde": "healthtalk-bulk"})
+    logging.info(f"Batch {jobb.id} sendt ({fil.name}).")
+    return jobb.id
+
+
+# ---------- resultater ---------- #
+def les_resultat(client, jobb) -> dict[int, tuple[str | None, str | None]]:
+    """
+    {artikkel-ID: (tekst, feil)} for en ferdig jobb. Vellykkede svar legges
+    også i svar-cachen med nøkkelen fra forespørselen, så et senere
+    synkront kall med samme prompt ikke koster noe.
+    """
+    forespørsler = {linje["custom_id"]: linje["body"] for linje in _les_jsonl(client, jobb.input_file_id)}
+    resultat = {}
+    for linje in _les_jsonl(client, jobb.output_file_id) + _les_jsonl(client, jobb.error_file_id):
+        a_id = _artikkel_id(linje["custom_id"])
+        svar = linje.get("response") or {}
+        if linje.get("error") or svar.get("status_code") != 200:
+            feil = linje.get("error") or svar.get("body", {}).get("error") or {}
+            resultat[a_id] = (None, feil.get("message") or f"status {svar.get('status_code')}")
+            continue
+        tekst = svar["body"]["choices"][0]["message"]["content"]
+        resultat[a_id] = (tekst, None)
+        params = forespørsler.get(linje["custom_id"])
+        if params and tekst:
+            try:
+                hent_cache().lagre(nøkkel(params["model"], params["messages"], params.get("temperature"),
+                                          params.get("max_tokens")), tekst, params["model"])
+            except sqlite3.Error as e:
+                logging.warning(f"Kunne ikke lagre batch-svar i cachen: {e}")
+    return resultat
+
+
+def behandle_åpne_jobber(conn, client, vent: bool = False, poll_sek: float = POLL_SEK) -> int:
+    """
+    Leser svarene fra jobber i batchjobber som er ferdige (med `vent` til
+    alle er det) og lagrer dem i genereringer. Returnerer antall artikler
+    som fikk tekst.
+    """
+    generert = 0
+    åpne = storage.hent_åpne_batchjobber(conn)
+    while åpne:
+        for rad in åpne:
+            try:
+                jobb = client.batches.retrieve(rad["batch_id"])
+            except Exception as e:
+                logging.warning(f"Kunne ikke sjekke batch {rad['batch_id']}: {e}")
+                continue
+            if jobb.status not in SLUTTSTATUS:
+                if jobb.status != rad["status"]:
+                    with conn:
+                        storage.lagre_batchjobb(conn, rad["batch_id"], jobb.status)
+                tellere = getattr(jobb, "request_counts", None)
+                if tellere:
+                    logging.info(f"Batch {rad['batch_id']}: {jobb.status}, "
+                                 f"{tellere.completed + tellere.failed}/{tellere.total}")
+                continue
+
+            resultat = les_resultat(client, jobb)
+            with conn:
+                for a_id in rad["artikkel_ider"]:
+                    tekst, feil = resultat.get(a_id, (None, f"mangler i resultatet (batch {jobb.status})"))
+                    if tekst:
+                        storage.oppdater_generering(conn, a_id, status="generert", artikkel=tekst, feil=None)
+                        generert += 1
+                    else:
+                        storage.oppdater_generering(conn, a_id, status="feilet", feil=feil)
+                storage.lagre_batchjobb(conn, rad["batch_id"], "behandlet")
+            logging.info(f"Batch {rad['batch_id']} {jobb.status}: {len(resultat)} svar lest.")
+
+        åpne = storage.hent_åpne_batchjobber(conn)
+        if not vent or not åpne:
+            break
+        time.sleep(poll_sek)
+    return generert
+
+
+# ---------- hele kjøringen ---------- #
+def generer_bulk(
+    conn,
+    artikler: list[dict],
+    kategori: str = STANDARD_KATEGORI,
+    lengde: str = STANDARD_LENGDE,
+    mappe_id: str | None = None,
+    client=None,
+    vent: bool = True,
+    poll_sek: float = POLL_SEK,
+    ved_status: Callable[[dict, str], None] | None = None,
+) -> dict[str, int]:
+    """
+    Som generer_batch, men genereringen går via Batch API. Uten `vent`
+    sendes jobbene og funksjonen returnerer; svarene hentes og lagres/lastes
+    opp ved neste kall. Returnerer antall artikler per status.
+    """
+    client = client or generate_articles.client
+
+    behandle_åpne_jobber(conn, client)
+    statuser = storage.hent_genereringer(conn, [a["id"] for a in artikler])
+    nye = [a for a in artikler
+           if statuser.get(a["id"], {}).get("status") not in ("i_batch", "generert", "ferdig")]
+
+    def forbered(artikkel: dict) -> tuple[str, dict]:
+        råtekst = statuser.get(artikkel["id"], {}).get("raatekst")
+        if råtekst is None:
+            råtekst = generate_articles.hent_artikkeltekst(artikkel["url"]) or ""
+        params, *_ = generate_articles._chat_parametre(råtekst, artikkel["url"], kategori, lengde)
+        return råtekst, params
+
+    forespørsler = []
+    if nye:
+        logging.info(f"Forbereder {len(nye)} artikler for Batch API.")
+        with ThreadPoolExecutor(max_workers=MAKS_HENT) as pool:
+            ferdige = list(pool.map(lambda a: (a, *_prøv(forbered, a)), nye))
+        cache = hent_cache()
+        with conn:
+            for artikkel, (råtekst, params), feil in ferdige:
+                if feil:
+                    storage.oppdater_generering(conn, artikkel["id"], status="feilet", feil=feil)
+                    continue
+                svar = cache.hent(nøkkel(params["model"], params["messages"],
+                                         params.get("temperature"), params.get("max_tokens")))
+                if svar is not None:
+                    storage.oppdater_generering(conn, artikkel["id"], status="generert",
+                                                raatekst=råtekst, artikkel=svar)
+                else:
+                    storage.oppdater_generering(conn, artikkel["id"], status="hentet", raatekst=råtekst)
+                    forespørsler.append((artikkel["id"], params))
+
+    for start in range(0, len(forespørsler), MAKS_PER_JOBB):
+        del_ = forespørsler[start:start + MAKS_PER_JOBB]
+        fil = skriv_jsonl(del_, JSONL_MAPPE / f"{datetime.now():%Y%m%d-%H%M%S}-{start // MAKS_PER_JOBB}.jsonl")
+        batch_id = send_jobb(client, fil)
+        with conn:
+            storage.lagre_batchjobb(conn, batch_id, "validating", [a_id for a_id, _ in del_],
+                                    kategori=kategori, lengde=lengde)
+            for a_id, _ in del_:
+                storage.oppdater_generering(conn, a_id, status="i_batch")
+
+    if vent:
+        behandle_åpne_jobber(conn, client, vent=True, poll_sek=poll_sek)
+
+    statuser = storage.hent_genereringer(conn, [a["id"] for a in artikler])
+    klare = [a for a in artikler if statuser.get(a["id"], {}).get("status") in ("generert", "ferdig")]
+    telling = generer_batch(conn, klare, kategori, lengde, mappe_id, ved_status=ved_status) if klare else {}
+    statuser = storage.hent_genereringer(conn, [a["id"] for a in artikler])
+    for status in ("i_batch", "feilet"):
+        telling[status] = sum(1 for s in statuser.values() if s["status"] == status)
+    return telling
@@ -0,0 +1,73 @@
+# date_parsing.py
+"""
+Rask datotolkning for datoene Firecrawl returnerer.
+
+Schemaet ber om ISO-8601, så nesten alt er "YYYY-MM-DD". Det og de
+vanligste engelske/norske formatene tolkes med kompilerte regex; bare
+resten sendes til dateparser, som importeres først når det trengs.
+Svar huskes i en begrenset cache fordi samme datostreng går igjen på
+tvers av kilder.
+"""
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+_MÅNEDER = {
+    # engelsk
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3,
+    "apr": 4, "april": 4, "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7,
+    "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9,
+    "oct": 10, "october": 10, "nov": 11, "november": 11, "dec": 12, "december": 12,
+    # norsk
+    "januar": 1, "februar": 2, "mars": 3, "mai": 5, "juni": 6, "juli": 7,
+    "okt": 10, "oktober": 10, "des": 12, "desember": 12,
+}
+
+_ISO        = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})(?:[T ][\d:.]+(?:Z|[+-]\d{2}:?\d{2})?)?$")
+_PUNKTUM    = re.compile(r"^(\d{1,2})\.(\d{1,2})\.(\d{4})$")                      # 15.06.2025
+_DAG_MÅNED  = re.compile(r"^(\d{1,2})\.?\s+([a-zæøå]+)\.?,?\s+(\d{4})$")           # 15. juni 2025 / 15 June 2025
+_MÅNED_DAG  = re.compile(r"^([a-z]+)\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})$")  # June 15, 2025
+
+
+def _lag_dato(år: str, måned: int | str, dag: str) -> date | None:
+    try:
+        return date(int(år), int(måned), int(dag))
+    except ValueError:
+        return None
+
+
+def _rask_tolkning(s: str) -> date | None:
+    if m := _ISO.match(s):
+        return _lag_dato(m[1], m[2], m[3])
+    if m := _PUNKTUM.match(s):
+        return _lag_dato(m[3], m[2], m[1])
+    lav = s.lower()
+    if (m := _DAG_MÅNED.match(lav)) and m[2] in _MÅNEDER:
+        return _lag_dato(m[3], _MÅNEDER[m[2]], m[1])
+    if (m := _MÅNED_DAG.match(lav)) and m[1] in _MÅNEDER:
+        return _lag_dato(m[3], _MÅNEDER[m[1]], m[2])
+    return None
+
+
+def _dateparser_tolkning(s: str) -> date | None:
+    import dateparser   # treg å importere – bare når hurtigsporene bommer
+
+    try:
+        parsed: datetime | None = dateparser.parse(s, languages=["nb", "en"])
+    except ValueError:
+        return None
+    return parsed.date() if parsed else None
+
+
+@lru_cache(maxsize=4096)
+def _tolk_cachet(s: str, i_dag: date) -> date | None:
+    # i_dag er med i nøkkelen så relative datoer («i går», «2 days ago») ikke overlever midnatt
+    d = _rask_tolkning(s)
+    return d if d is not None else _dateparser_tolkning(s)
+
+
+def tolk_dato(dato_str: str | None) -> date | None:
+    """Tolker en datostreng til `date`, eller None hvis det ikke går."""
+    if not dato_str or not dato_str.strip():
+        return None
+    return _tolk_cachet(dato_str.strip(), date.today())
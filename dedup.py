@@ -0,0 +1,92 @@
+# dedup.py
+"""
+Finner nær-duplikater (samme sak fra EMA, Legemiddelverket og DMP, eller
+NEJM/JAMA-ledsagerartikler) før de havner i databasen.
+
+Titler (og brødtekst når vi har den) gjøres om til ord- og ordpar-shingles,
+får en MinHash-signatur, og legges i en LSH-indeks med bånd. Et oppslag ser
+bare på artikler som deler minst ett bånd, så kostnaden vokser ikke med
+størrelsen på arkivet.
+"""
+import hashlib
+import random
+import re
+import unicodedata
+
+_PRIMTALL = (1 << 61) - 1
+
+
+def _shingles(tekst: str) -> set[str]:
+    tekst = unicodedata.normalize("NFKC", tekst).lower()
+    ord_ = re.findall(r"\w+", tekst)
+    if not ord_:
+        return set()
+    return set(ord_) | {f"{a} {b}" for a, b in zip(ord_, ord_[1:])}
+
+
+def _h64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class NærDuplikatIndeks:
+    """
+    MinHash/LSH-indeks over artikler. `finn()` returnerer nøkkelen (URL) til
+    den mest like artikkelen med estimert Jaccard-likhet >= terskel, ellers None.
+
+    Med 64 permutasjoner i 16 bånd à 4 rader er sannsynligheten for at et
+    par blir kandidat 1 - (1 - s⁴)¹⁶: ~99 % ved likhet 0,7, ~64 % ved 0,5,
+    ~12 % ved 0,3 og ~3 % ved 0,2. Kandidatene sjekkes mot terskelen med
+    hele signaturen, så et par under terskelen koster bare en sammenligning.
+    """
+
+    def __init__(self, terskel: float = 0.7, antall_perm: int = 64, band: int = 16, seed: int = 1):
+        assert antall_perm % band == 0
+        self.terskel = terskel
+        self.band = band
+        self.rader = antall_perm // band
+        rng = random.Random(seed)
+        self._perm = [
+            (rng.randrange(1, _PRIMTALL), rng.randrange(0, _PRIMTALL))
+            for _ in range(antall_perm)
+        ]
+        self._bøtter: list[dict[tuple, list[str]]] = [{} for _ in range(band)]
+        self._signaturer: dict[str, tuple[int, ...]] = {}
+
+    def signatur(self, tittel: str, tekst: str | None = None) -> tuple[int, ...] | None:
+        shingles = _shingles(f"{tittel} {tekst or ''}")
+        if not shingles:
+            return None
+        hasher = [_h64(s) for s in shingles]
+        return tuple(
+            min((a * h + b) % _PRIMTALL for h in hasher)
+            for a, b in self._perm
+        )
+
+    def _band(self, sig: tuple[int, ...]):
+        for i in range(self.band):
+            yield i, sig[i * self.rader:(i + 1) * self.rader]
+
+    def legg_til(self, nøkkel: str, tittel: str, tekst: str | None = None):
+        sig = self.signatur(tittel, tekst)
+        if sig is None or nøkkel in self._signaturer:
+            return
+        self._signaturer[nøkkel] = sig
+        for i, b in self._band(sig):
+            self._bøtter[i].setdefault(b, []).append(nøkkel)
+
+    def finn(self, tittel: str, tekst: str | None = None) -> str | None:
+        sig = self.signatur(tittel, tekst)
+        if sig is None:
+            return None
+        kandidater = {n for i, b in self._band(sig) for n in self._bøtter[i].get(b, ())}
+
+        beste, beste_likhet = None, self.terskel
+        for nøkkel in kandidater:
+            annen = self._signaturer[nøkkel]
+            likhet = sum(x == y for x, y in zip(sig, annen)) / len(sig)
+            if likhet >= beste_likhet:
+                beste, beste_likhet = nøkkel, likhet
+        return beste
+
+    def __len__(self) -> int:
+        return len(self._signaturer)
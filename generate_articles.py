@@ -1,52 +1,81 @@
 
-import requests
-from bs4 import BeautifulSoup
 import openai
 from docx import Document
 from dotenv import load_dotenv
+import logging
 import os
-from generate_prompt import generate_prompt, generate_fallback_prompt
+import time
+from body_extraction import hent_brødtekst
 from config import OPENAI_API_KEY
+from llm_cache import cachet_chat, cachet_chat_strøm
+from metrics import registrer_generering
+from input_reduction import html_til_tekst, reduser
+from model_routing import kjør_med_reserve, start_strøm, velg_rute
+from prompt_templates import artikkel_prompt, tell_tokens
+from page_cache import hent_side
 
 load_dotenv()
 client = openai.OpenAI(api_key=OPENAI_API_KEY)
 
 def hent_artikkeltekst(url):
+    # regel for domenet (body_extraction.ARTIKKEL_REGLER), ellers tekst-tetthet
     try:
-        res = requests.get(url, timeout=15)
-        soup = BeautifulSoup(res.text, "html.parser")
-        # eks: EMA‑selector
-        content_div = soup.select("div.ema-node-content-wrapper div.item")
-        tekst = "\n\n".join(div.get_text(strip=True) for div in content_div)
-        return tekst if tekst.strip() else None
+        return hent_brødtekst(hent_side(url), url)
     except Exception:
         return None
 
-def generer_artikkel(råtekst, url, kategori="Legemidler", lengde="Middels"):
-    # hvis råtekst mangler → lag fallback‑prompt
+def _chat_parametre(råtekst, url, kategori, lengde):
+    # hvis råtekst mangler → hovedinnholdet fra HTML-en i stedet
     if not råtekst:
         try:
-            html = requests.get(url, timeout=15).text[:12000]  # maks 12 k tegn
+            html = hent_side(url)   # samme side som hent_artikkeltekst, fra sidecachen
         except Exception:
             html = ""
-        prompt = generate_fallback_prompt(html, url, kategori, lengde)
-    else:
-        prompt = generate_prompt(råtekst, url, kategori, lengde)
-
-    max_tok = 850
-    if "366" in lengde: max_tok = 450
-    elif "Lang" in lengde: max_tok = 1400
-
-    completion = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "Du er en erfaren helsejournalist for HealthTalk.no"},
-            {"role": "user", "content": prompt}
-        ],
+        råtekst = html_til_tekst(html)
+    # lange kilder (store PDF-er, hele nettsider) oppsummeres før artikkelkallet
+    prompt = artikkel_prompt(reduser(råtekst, client), url, kategori, lengde)
+
+    tokens = prompt.tokens
+    rute = velg_rute(lengde, tokens)
+    logging.info(f"Prompt til {rute.modell} (rute {rute.navn}): {tokens} tokens inn ({url or 'uten kilde'})")
+    params = dict(
+        model=rute.modell,
+        messages=prompt.meldinger,
         temperature=0.7,
-        max_tokens=max_tok,
+        max_tokens=rute.max_tokens,
     )
-    return completion.choices[0].message.content
+    return params, tokens, rute
+
+def generer_artikkel(råtekst, url, kategori="Legemidler", lengde="Middels", regenerer=False):
+    # regenerer=True hopper over svar-cachen (llm_cache.py) og lager en ny versjon
+    params, tokens_inn, rute = _chat_parametre(råtekst, url, kategori, lengde)
+    start = time.perf_counter()
+    tekst, modell = kjør_med_reserve(rute, params, lambda p: cachet_chat(client, regenerer=regenerer, **p))
+    registrer_generering(rute=rute.navn, modell=modell, reserve=modell != rute.modell, strøm=False,
+                         ttft=None, tokens_inn=tokens_inn, tokens_ut=tell_tokens(tekst or ""),
+                         total=round(time.perf_counter() - start, 3), tegn=len(tekst or ""))
+    return tekst
+
+def generer_artikkel_strøm(råtekst, url, kategori="Legemidler", lengde="Middels", regenerer=False):
+    """
+    Som generer_artikkel, men gir teksten bit for bit etter hvert som
+    modellen skriver den (passer til st.write_stream). Tid til første token
+    og total tid logges når strømmen er ferdig.
+    """
+    params, tokens_inn, rute = _chat_parametre(råtekst, url, kategori, lengde)
+    start = time.perf_counter()
+    modell, strøm = start_strøm(rute, params, lambda p: cachet_chat_strøm(client, regenerer=regenerer, **p))
+    ttft, biter = None, []
+    for bit in strøm:
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        biter.append(bit)
+        yield bit
+    tekst = "".join(biter)
+    registrer_generering(rute=rute.navn, modell=modell, reserve=modell != rute.modell, strøm=True,
+                         ttft=round(ttft, 3) if ttft is not None else None,
+                         tokens_inn=tokens_inn, tokens_ut=tell_tokens(tekst),
+                         total=round(time.perf_counter() - start, 3), tegn=len(tekst))
 
 def lagre_som_docx(tekst, filnavn):
     doc = Document()
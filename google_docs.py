@@ -1,19 +1,57 @@
 # google_docs.py
+"""
+Opplasting av artikler til Google Docs.
+
+Credentials og Drive-klienten holdes i prosessen (GoogleKlienter):
+token.json leses én gang, tokenet fornyes FORNY_FØR sekunder før det går
+ut og skrives atomisk tilbake, og tjenesten bygges fra den innebygde
+(statiske) discovery-beskrivelsen. httplib2 er ikke trådsikker, så hver
+tråd får sin egen transport og sitt eget tjenesteobjekt; de deler
+credentials og holder tilkoblingen åpen mellom opplastingene. Docs-API-et
+brukes ikke, så tokenet trenger bare drive.file.
+
+Månedsmappene (YYYY-MM under mappe_id) huskes i MAPPE_CACHE (sjekket mot
+papirkurven første gang per prosess), og dokumentet opprettes i én Drive-forespørsel: innholdet lastes opp som
+ren tekst og konverteres til Google-dokument direkte i riktig mappe, med
+nøkkelordene som beskrivelse.
+"""
+import json
+import logging
 import os
+import threading
 from pathlib import Path
-from datetime import date
+from datetime import date, datetime, timedelta
+from io import BytesIO
+import google_auth_httplib2
+import httplib2
+from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseUpload
 
 SCOPES = [
-    "https://www.googleapis.com/auth/documents",
     "https://www.googleapis.com/auth/drive.file",
 ]
 
 HERE = Path(__file__).parent
 TOKEN_FILE = HERE / "token.json"
 CLIENT_SECRET = HERE / "client_secret.json"
+MAPPE_CACHE = Path(os.getenv("GOOGLE_MAPPE_CACHE", HERE / "drive_mapper.json"))
+
+MAPPE_TYPE = "application/vnd.google-apps.folder"
+DOKUMENT_TYPE = "application/vnd.google-apps.document"
+
+FORNY_FØR = float(os.getenv("GOOGLE_FORNY_FOR_SEK", "300"))    # forny tokenet så lenge før utløp
+HTTP_FRIST = float(os.getenv("GOOGLE_HTTP_FRIST", "60"))
+
+
+def _lagre_token(creds: Credentials):
+    """Skriver token.json atomisk (ny fil + rename), så en avbrutt skriving ikke ødelegger den."""
+    tmp = TOKEN_FILE.with_suffix(".json.tmp")
+    tmp.write_text(creds.to_json(), encoding="utf-8")
+    os.replace(tmp, TOKEN_FILE)
 
 
 def _get_credentials() -> Credentials:
@@ -28,16 +66,124 @@ def _get_credentials() -> Credentials:
 
     flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET, SCOPES)
     creds = flow.run_local_server(port=0)
-    TOKEN_FILE.write_text(creds.to_json(), encoding="utf-8")
+    _lagre_token(creds)
     return creds
 
 
-def _get_or_create_month_folder(drive, parent_folder_id: str, dato: date) -> str:
-    """Returner undermappe-ID for YYYY-MM – opprett den hvis den ikke finnes."""
-    ym = dato.strftime("%Y-%m")  # f.eks. "2025-05"
+class GoogleKlienter:
+    """Felles credentials og en varm Drive-tjeneste per tråd."""
+
+    def __init__(self):
+        self._lås = threading.Lock()
+        self._creds = None
+        self._lokalt = threading.local()
+
+    def _må_fornyes(self, creds) -> bool:
+        expiry = getattr(creds, "expiry", None)         # naive UTC, som google-auth bruker
+        if expiry is None:
+            return not getattr(creds, "valid", True)
+        return expiry - timedelta(seconds=FORNY_FØR) <= datetime.utcnow()
+
+    def credentials(self) -> Credentials:
+        with self._lås:
+            if self._creds is None:
+                self._creds = _get_credentials()
+            if self._må_fornyes(self._creds) and getattr(self._creds, "refresh_token", None):
+                self._creds.refresh(Request())
+                try:
+                    _lagre_token(self._creds)
+                except OSError as e:
+                    logging.warning(f"Kunne ikke skrive fornyet token til {TOKEN_FILE.name}: {e}")
+                logging.info("Google-token fornyet.")
+            return self._creds
+
+    def drive(self):
+        """Drive v3-tjenesten for denne tråden."""
+        creds = self.credentials()
+        lokalt = self._lokalt
+        if getattr(lokalt, "creds", None) is not creds:
+            http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_FRIST))
+            lokalt.drive = build("drive", "v3", http=http, static_discovery=True, cache_discovery=False)
+            lokalt.creds = creds
+        return lokalt.drive
+
+
+_klienter = GoogleKlienter()
+
+
+# ---------- månedsmapper ---------- #
+class MappeCache:
+    """
+    Mappe-ID per (forelder, YYYY-MM), lagret i MAPPE_CACHE mellom kjøringer.
+    Oppslag og oppretting skjer under én lås, så samtidige opplastinger
+    ikke lager hver sin mappe for samme måned. En cachet mappe sjekkes mot
+    papirkurven første gang den brukes i prosessen; ligger den der (eller
+    er den borte), regnes det som en bom.
+    """
 
+    def __init__(self, fil: Path):
+        self.fil = fil
+        self._lås = threading.RLock()
+        self._mapper: dict[str, str] | None = None
+        self._sjekket: set[str] = set()
+
+    @staticmethod
+    def _nøkkel(forelder: str, ym: str) -> str:
+        return f"{forelder}/{ym}"
+
+    def _last(self) -> dict[str, str]:
+        if self._mapper is None:
+            try:
+                self._mapper = json.loads(self.fil.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                self._mapper = {}
+            except (OSError, ValueError) as e:
+                logging.warning(f"Kunne ikke lese {self.fil.name}, starter tom: {e}")
+                self._mapper = {}
+        return self._mapper
+
+    def _lagre(self):
+        try:
+            tmp = self.fil.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._mapper, indent=1), encoding="utf-8")
+            os.replace(tmp, self.fil)
+        except OSError as e:
+            logging.warning(f"Kunne ikke lagre mappecachen: {e}")
+
+    def hent(self, drive, forelder: str, ym: str) -> str:
+        with self._lås:
+            mapper = self._last()
+            nøkkel = self._nøkkel(forelder, ym)
+            if nøkkel in mapper and nøkkel not in self._sjekket and _i_papirkurven(drive, mapper[nøkkel]):
+                logging.info(f"Månedsmappen {ym} ligger i papirkurven – slår opp på nytt.")
+                del mapper[nøkkel]
+            if nøkkel not in mapper:
+                mapper[nøkkel] = _finn_eller_opprett_mappe(drive, forelder, ym)
+                self._lagre()
+            self._sjekket.add(nøkkel)
+            return mapper[nøkkel]
+
+    def glem(self, forelder: str, ym: str):
+        with self._lås:
+            nøkkel = self._nøkkel(forelder, ym)
+            self._sjekket.discard(nøkkel)
+            if self._last().pop(nøkkel, None) is not None:
+                self._lagre()
+
+
+def _i_papirkurven(drive, mappe_id: str) -> bool:
+    """Sant hvis mappen er lagt i papirkurven eller ikke finnes lenger."""
+    try:
+        return bool(drive.files().get(fileId=mappe_id, fields="trashed").execute().get("trashed"))
+    except HttpError as e:
+        if e.resp.status == 404:
+            return True
+        raise
+
+
+def _finn_eller_opprett_mappe(drive, parent_folder_id: str, ym: str) -> str:
     query = (
-        f"mimeType='application/vnd.google-apps.folder' "
+        f"mimeType='{MAPPE_TYPE}' "
         f"and name='{ym}' and '{parent_folder_id}' in parents and trashed=false"
     )
     resp = drive.files().list(q=query, fields="files(id, name)").execute()
@@ -46,11 +192,28 @@ def _get_or_create_month_folder(drive, parent_folder_id: str, dato: date) -> str
 
     meta = {
         "name": ym,
-        "mimeType": "application/vnd.google-apps.folder",
+        "mimeType": MAPPE_TYPE,
         "parents": [parent_folder_id],
     }
-    folder_id = drive.files().create(body=meta, fields="id").execute()["id"]
-    return folder_id
+    return drive.files().create(body=meta, fields="id").execute()["id"]
+
+
+_mapper = MappeCache(MAPPE_CACHE)
+
+
+def _get_or_create_month_folder(drive, parent_folder_id: str, dato: date) -> str:
+    """Returner undermappe-ID for YYYY-MM – opprett den hvis den ikke finnes."""
+    return _mapper.hent(drive, parent_folder_id, dato.strftime("%Y-%m"))  # f.eks. "2025-05"
+
+
+# ---------- opplasting ---------- #
+def _opprett_dokument(drive, tittel: str, innhold: str, mappe: str, nøkkelord: str) -> str:
+    """Ett kall: Drive konverterer teksten til et Google-dokument direkte i mappen."""
+    meta = {"name": tittel, "mimeType": DOKUMENT_TYPE, "parents": [mappe]}
+    if nøkkelord.strip():
+        meta["description"] = nøkkelord
+    media = MediaIoBaseUpload(BytesIO(innhold.encode("utf-8")), mimetype="text/plain", resumable=False)
+    return drive.files().create(body=meta, media_body=media, fields="id").execute()["id"]
 
 
 def last_opp_til_google_docs(
@@ -63,48 +226,23 @@ def last_opp_til_google_docs(
     """
     Opprett Google-dokument med innhold og legg det i undermappe YYYY-MM under mappe_id.
     Returnerer delbar lenke.
+
+    Med mappen i cachen (og allerede sjekket i denne prosessen) er dette
+    én rundtur, ellers to–tre. Blir mappen slettet underveis, slås den opp
+    på nytt og opplastingen prøves én gang til.
     """
-    creds = _get_credentials()
-
-    drive = build("drive", "v3", credentials=creds)
-    docs = build("docs", "v1", credentials=creds)
-
-    # 1) Sørg for korrekt månedsmappe
-    month_folder_id = _get_or_create_month_folder(drive, mappe_id, dato)
-
-    # 2) Lag dokumentet
-    doc_meta = {"title": tittel}
-    doc = docs.documents().create(body=doc_meta).execute()
-    doc_id = doc["documentId"]
-
-    # 3) Flytt dokumentet til månedsmappe
-    drive.files().update(
-        fileId=doc_id,
-        addParents=month_folder_id,
-        removeParents="root",
-        fields="id, parents",
-    ).execute()
-
-    # 4) Skriv innhold
-    docs.documents().batchUpdate(
-        documentId=doc_id,
-        body={
-            "requests": [
-                {
-                    "insertText": {
-                        "location": {"index": 1},
-                        "text": innhold,
-                    }
-                }
-            ]
-        },
-    ).execute()
-
-    # 5) Lagre nøkkelord som description (valgfritt)
-    if nøkkelord.strip():
-        drive.files().update(
-            fileId=doc_id,
-            body={"description": nøkkelord},
-        ).execute()
+    drive = _klienter.drive()
+    ym = dato.strftime("%Y-%m")
+
+    month_folder_id = _mapper.hent(drive, mappe_id, ym)
+    try:
+        doc_id = _opprett_dokument(drive, tittel, innhold, month_folder_id, nøkkelord)
+    except HttpError as e:
+        if e.resp.status != 404:
+            raise
+        logging.info(f"Månedsmappen {ym} finnes ikke lenger – slår opp på nytt.")
+        _mapper.glem(mappe_id, ym)
+        month_folder_id = _mapper.hent(drive, mappe_id, ym)
+        doc_id = _opprett_dokument(drive, tittel, innhold, month_folder_id, nøkkelord)
 
     return f"https://docs.google.com/document/d/{doc_id}/edit"
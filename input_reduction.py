@@ -0,0 +1,147 @@
+# input_reduction.py
+"""
+Krymper kildeteksten før den går inn i artikkelprompten.
+
+    html_til_tekst(html)     hovedinnholdet som ren tekst (uten script,
+                             stil, meny, topp- og bunntekst)
+    reduser(tekst, client)   teksten uendret hvis den er innenfor
+                             tokenbudsjettet; ellers deles den i biter som
+                             oppsummeres parallelt (map), og sammendragene
+                             slås sammen (reduce) – om nødvendig i flere runder
+
+Budsjettet måles med tiktoken (prompt_templates.tell_tokens). Sammendragene
+går via svar-cachen, så en ny generering av samme kilde koster ingenting.
+"""
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from bs4 import BeautifulSoup
+
+from body_extraction import har_støyklasse
+from llm_cache import cachet_chat
+from prompt_templates import kutt_til_tokens, tell_tokens
+
+MAKS_TOKENS       = int(os.getenv("INNDATA_MAKS_TOKENS", "6000"))
+BIT_TOKENS        = int(os.getenv("INNDATA_BIT_TOKENS", "3000"))
+SAMMENDRAG_MODELL = os.getenv("INNDATA_SAMMENDRAG_MODELL", "gpt-4o-mini")
+MAKS_SAMTIDIGE    = int(os.getenv("INNDATA_MAKS_SAMTIDIGE", "4"))
+MAKS_RUNDER       = 3
+
+_STØY = ["script", "style", "noscript", "template", "svg", "iframe", "form",
+         "nav", "header", "footer", "aside", "button"]
+
+SAMMENDRAG_INSTRUKS = (
+    "Du forkorter kildemateriale som en helsejournalist skal skrive en artikkel fra. "
+    "Behold alle fakta: legemiddel- og sykdomsnavn, tall, doser, datoer, institusjoner "
+    "og konklusjoner. Gjengi direkte sitater ordrett. Dropp gjentakelser, "
+    "referanselister og formalia. Svar på norsk, i korte avsnitt."
+)
+
+
+# ---------- HTML ---------- #
+def html_til_tekst(html: str) -> str:
+    """Synlig hovedinnhold fra en HTML-side, ett avsnitt per linje."""
+    if not html:
+        return ""
+    soup = BeautifulSoup(html, "lxml")
+    for tag in soup(_STØY):
+        tag.decompose()
+    rot = soup.find("main") or soup.find("article") or soup.find(attrs={"role": "main"}) or soup.body or soup
+    # Bare inne i roten: en støyklasse på roten eller en innpakning rundt den
+    # ("page has-sidebar") skal ikke ta med seg hele innholdet
+    for tag in rot.find_all(class_=True):
+        if not tag.decomposed and tag.name not in ("main", "article") and har_støyklasse(tag["class"]):
+            tag.decompose()
+    linjer = (re.sub(r"\s+", " ", l).strip() for l in rot.get_text("\n").splitlines())
+    return "\n".join(l for l in linjer if l)
+
+
+# ---------- oppdeling ---------- #
+def _pakk(deler: list[str], bit_tokens: int, skille: str) -> list[str]:
+    """Slår sammen påfølgende deler så lenge summen holder seg innenfor `bit_tokens`."""
+    biter, nå, nå_tokens = [], [], 0
+    for del_ in deler:
+        t = tell_tokens(del_) + 1
+        if nå and nå_tokens + t > bit_tokens:
+            biter.append(skille.join(nå))
+            nå, nå_tokens = [], 0
+        nå.append(del_)
+        nå_tokens += t
+    if nå:
+        biter.append(skille.join(nå))
+    return biter
+
+
+def _del_setning(setning: str, bit_tokens: int) -> list[str]:
+    """En setning som alene er for stor, deles mellom ord (et enkelt kjempeord på tegn)."""
+    ord_ = []
+    for o in setning.split():
+        if tell_tokens(o) > bit_tokens:
+            # Minst ett tegn per token, så `bit_tokens` tegn holder seg innenfor budsjettet
+            ord_.extend(o[i:i + bit_tokens] for i in range(0, len(o), bit_tokens))
+        else:
+            ord_.append(o)
+    return _pakk(ord_, bit_tokens, " ")
+
+
+def del_i_biter(tekst: str, bit_tokens: int = BIT_TOKENS) -> list[str]:
+    """
+    Deler på avsnitt og pakker dem i biter på høyst `bit_tokens`. Avsnitt
+    som alene er for store, deles på setninger, og setninger som alene er
+    for store, mellom ord. Bitene kuttes aldri midt i et token eller tegn.
+    """
+    enheter = []
+    for avsnitt in re.split(r"\n\s*\n|\n", tekst):
+        if not avsnitt.strip():
+            continue
+        if tell_tokens(avsnitt) <= bit_tokens:
+            enheter.append(avsnitt)
+            continue
+        for setning in re.split(r"(?<=[.!?])\s+", avsnitt):
+            if not setning.strip():
+                continue
+            if tell_tokens(setning) <= bit_tokens:
+                enheter.append(setning)
+            else:
+                enheter.extend(_del_setning(setning, bit_tokens))
+    return _pakk(enheter, bit_tokens, "\n")
+
+
+# ---------- map-reduce ---------- #
+def _oppsummer(client, bit: str, nr: int, antall: int, mål_tokens: int) -> str:
+    return cachet_chat(
+        client,
+        model=SAMMENDRAG_MODELL,
+        messages=[
+            {"role": "system", "content": SAMMENDRAG_INSTRUKS},
+            {"role": "user", "content": f"Del {nr} av {antall}. Høyst ca. {mål_tokens} tokens.\n\n{bit}"},
+        ],
+        temperature=0.2,
+        max_tokens=mål_tokens,
+    ) or ""
+
+
+def reduser(tekst: str, client, maks_tokens: int = MAKS_TOKENS) -> str:
+    """`tekst` hvis den får plass i `maks_tokens`, ellers et map-reduce-sammendrag."""
+    tokens = tell_tokens(tekst)
+    if tokens <= maks_tokens:
+        return tekst
+
+    for runde in range(1, MAKS_RUNDER + 1):
+        biter = del_i_biter(tekst)
+        # Fordel budsjettet på bitene, så sammendragene til sammen får plass
+        mål = max(150, min(1000, maks_tokens // len(biter)))
+        with ThreadPoolExecutor(max_workers=min(MAKS_SAMTIDIGE, len(biter))) as pool:
+            sammendrag = list(pool.map(
+                lambda nb: _oppsummer(client, nb[1], nb[0], len(biter), mål), enumerate(biter, 1)
+            ))
+        tekst = "\n\n".join(s.strip() for s in sammendrag if s.strip())
+        ny = tell_tokens(tekst)
+        logging.info(f"Inndata redusert (runde {runde}): {tokens} → {ny} tokens i {len(biter)} biter")
+        if ny <= maks_tokens:
+            return tekst
+        tokens = ny
+
+    return kutt_til_tokens(tekst, maks_tokens)
@@ -0,0 +1,207 @@
+# jobs.py
+"""
+Bakgrunnsjobber for skraping med strukturerte hendelser.
+
+- `Kjøringslås` sørger for at bare én skraping (cron, daemon eller fra
+  Streamlit) kjører om gangen – to samtidige kjøringer ville kappes om
+  lagre_data.
+- `Hendelseslogg` skriver én JSON-linje per hendelse til
+  jobber/<jobb-id>/hendelser.jsonl mens skrapingen pågår. Daemonen
+  roterer filen før hver runde, så den bare holder runden som pågår
+  (eller sist ble ferdig) og ikke vokser så lenge prosessen lever.
+- `start_jobb()` starter run_daily_scrape.py som egen prosess (overlever
+  Streamlit-reruns og lukkede faner), og `aktiv_jobb()`/`les_hendelser()`
+  lar siden koble seg på igjen og strømme fremdriften.
+
+Låsen bruker fcntl.flock og virker derfor på Linux/macOS.
+"""
+import fcntl
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+PROSJEKT_ROT = Path(__file__).parent
+JOBB_MAPPE   = PROSJEKT_ROT / "jobber"
+LÅS_FILE     = PROSJEKT_ROT / "skraping.lock"
+BEHOLD_JOBBER = 20
+
+
+class SkrapingKjørerAllerede(RuntimeError):
+    pass
+
+
+def ny_jobb_id() -> str:
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+
+def hendelsesfil(jobb_id: str) -> Path:
+    return JOBB_MAPPE / jobb_id / "hendelser.jsonl"
+
+
+def loggfil(jobb_id: str) -> Path:
+    return JOBB_MAPPE / jobb_id / "logg.txt"
+
+
+# ---------- lås ---------- #
+class Kjøringslås:
+    """
+    Eksklusiv lås for en skrapekjøring. Info om kjøringen skrives i låsfilen.
+
+    Med `fd` overtas en lås som foreldreprosessen allerede har tatt (se
+    start_jobb): flock-låsen hører til den åpne filen, ikke prosessen, så
+    den arves av barnet og holdes uten opphold.
+    """
+
+    def __init__(self, jobb_id: str, modus: str = "engang", fd: int | None = None):
+        self.info = {"jobb_id": jobb_id, "pid": os.getpid(), "modus": modus,
+                     "startet": datetime.now().isoformat(timespec="seconds")}
+        self._fd = fd
+        self._fil = None
+
+    def __enter__(self):
+        if self._fd is not None:
+            self._fil = os.fdopen(self._fd, "a+", encoding="utf-8")
+        else:
+            self._fil = open(LÅS_FILE, "a+", encoding="utf-8")
+        try:
+            fcntl.flock(self._fil, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._fil.close()
+            raise SkrapingKjørerAllerede(
+                f"En annen skraping kjører allerede ({(aktiv_jobb() or {}).get('jobb_id', 'ukjent jobb')})."
+            )
+        self._fil.seek(0)
+        self._fil.truncate()
+        self._fil.write(json.dumps(self.info))
+        self._fil.flush()
+        return self
+
+    def __exit__(self, *exc):
+        self._fil.seek(0)
+        self._fil.truncate()
+        fcntl.flock(self._fil, fcntl.LOCK_UN)
+        self._fil.close()
+
+    def overlat(self):
+        """Lukker vår kopi uten å låse opp – barneprosessen holder låsen videre."""
+        self._fil.close()
+
+
+def aktiv_jobb() -> dict | None:
+    """Info om kjøringen som holder låsen nå, eller None."""
+    if not LÅS_FILE.exists():
+        return None
+    with open(LÅS_FILE, "r", encoding="utf-8") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            try:
+                return json.loads(f.read() or "{}")
+            except json.JSONDecodeError:
+                return {}
+        fcntl.flock(f, fcntl.LOCK_UN)
+    return None
+
+
+# ---------- hendelser ---------- #
+class Hendelseslogg:
+    """Trådsikker JSONL-skriver; hver linje flushes så leseren ser den med en gang."""
+
+    def __init__(self, jobb_id: str):
+        self.jobb_id = jobb_id
+        self._fil = hendelsesfil(jobb_id)
+        self._fil.parent.mkdir(parents=True, exist_ok=True)
+        _rydd_gamle_jobber()
+        self._f = open(self._fil, "a", encoding="utf-8")
+        self._lås = threading.Lock()
+
+    def send(self, type_: str, **data):
+        linje = json.dumps({"tid": time.time(), "type": type_, **data}, ensure_ascii=False)
+        with self._lås:
+            self._f.write(linje + "\n")
+            self._f.flush()
+
+    def roter(self):
+        """Starter en ny fil; den forrige beholdes som hendelser.forrige.jsonl."""
+        with self._lås:
+            self._f.close()
+            os.replace(self._fil, self._fil.with_name("hendelser.forrige.jsonl"))
+            self._f = open(self._fil, "a", encoding="utf-8")
+
+    def lukk(self):
+        with self._lås:
+            self._f.close()
+
+
+def les_hendelser(jobb_id: str, fra: tuple[int, int] | None = None) -> tuple[list[dict], tuple[int, int]]:
+    """
+    Hendelser skrevet etter posisjonen `fra`, og posisjonen neste kall skal
+    lese fra. Posisjonen er (inode, byte): bare det nye leses, og en rotert
+    fil leses fra starten. En halvskrevet siste linje tas med neste gang.
+    """
+    try:
+        f = open(hendelsesfil(jobb_id), "rb")
+    except FileNotFoundError:
+        return [], fra or (0, 0)
+    with f:
+        inode = os.fstat(f.fileno()).st_ino
+        pos = fra[1] if fra and fra[0] == inode else 0
+        f.seek(pos)
+        data = f.read()
+    slutt = data.rfind(b"\n") + 1
+    hendelser = [json.loads(linje) for linje in data[:slutt].splitlines() if linje.strip()]
+    return hendelser, (inode, pos + slutt)
+
+
+def siste_jobb_id() -> str | None:
+    if not JOBB_MAPPE.exists():
+        return None
+    jobber = sorted(p.name for p in JOBB_MAPPE.iterdir() if p.is_dir())
+    return jobber[-1] if jobber else None
+
+
+def _rydd_gamle_jobber():
+    jobber = sorted(p for p in JOBB_MAPPE.iterdir() if p.is_dir())
+    for gammel in jobber[:-BEHOLD_JOBBER]:
+        shutil.rmtree(gammel, ignore_errors=True)
+
+
+# ---------- start ---------- #
+def start_jobb() -> str:
+    """
+    Starter run_daily_scrape.py i bakgrunnen og returnerer jobb-ID.
+    Kaster SkrapingKjørerAllerede hvis en kjøring allerede pågår.
+
+    Låsen tas her, før prosessen startes, og gis videre til barnet som en
+    arvet fil (--lås-fd). Da kan ikke to klikk eller faner som kommer
+    samtidig begge slippe gjennom sjekken.
+    """
+    jobb_id = ny_jobb_id()
+    lås = Kjøringslås(jobb_id, "engang")
+    lås.__enter__()                          # kaster SkrapingKjørerAllerede
+    try:
+        fd = lås._fil.fileno()
+        loggfil(jobb_id).parent.mkdir(parents=True, exist_ok=True)
+        with open(loggfil(jobb_id), "w", encoding="utf-8") as logg:
+            subprocess.Popen(
+                [sys.executable, str(PROSJEKT_ROT / "run_daily_scrape.py"),
+                 "--jobb-id", jobb_id, "--lås-fd", str(fd)],
+                cwd=PROSJEKT_ROT,
+                env=os.environ.copy(),
+                stdout=logg,
+                stderr=subprocess.STDOUT,
+                pass_fds=(fd,),
+                start_new_session=True,          # lever videre om Streamlit stopper scriptet
+            )
+    except BaseException:
+        lås.__exit__(None, None, None)
+        raise
+    lås.overlat()
+    return jobb_id
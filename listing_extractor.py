@@ -0,0 +1,91 @@
+# listing_extractor.py
+"""
+Lokal uthenting av artikkellister fra kildesider med deklarative regler.
+
+En regel (SOURCE_CONFIG[domene]["liste"]) beskriver hvor artiklene står:
+
+    element     CSS-selektor for hvert listeelement (påkrevd)
+    lenke       selektor for lenken inne i elementet (standard "a")
+    tittel      selektor for tittelen (standard: teksten i lenken)
+    dato        selektor for datoen (gir ingen rad dato, brukes Firecrawl likevel)
+    dato_attr   attributt som holder datoen, f.eks. "datetime" på <time>
+    datoformat  strptime-format; uten format brukes date_parsing.tolk_dato
+
+Resultatet har samme form som Firecrawl-extract (title/url/published), så
+resten av run_daily_scrape trenger ikke vite hvor artiklene kom fra.
+"""
+import re
+from datetime import datetime
+
+import lxml.html
+
+from date_parsing import tolk_dato
+from resilience import robust_get
+
+
+def hent_liste_html(url: str, ved_nytt_forsøk=None) -> str:
+    # User-Agent settes av den felles sesjonen (resilience.sesjon)
+    res = robust_get(url, timeout=15, ved_nytt_forsøk=ved_nytt_forsøk)
+    res.raise_for_status()
+    return res.text
+
+
+def _tekst(node) -> str:
+    return re.sub(r"\s+", " ", node.text_content()).strip()
+
+
+def _tolk_dato(rå: str, datoformat: str | None) -> str | None:
+    if datoformat:
+        try:
+            return datetime.strptime(rå, datoformat).date().isoformat()
+        except ValueError:
+            pass
+    d = tolk_dato(rå)
+    return d.isoformat() if d else None
+
+
+def trekk_ut_artikler(html: str, regel: dict, css_selector: str | None = None) -> list[dict]:
+    """
+    Plukker ut title/url/published fra listesiden etter `regel`. Er
+    `css_selector` gitt, letes det bare inne i det området.
+    """
+    tre = lxml.html.fromstring(html)
+    if css_selector:
+        områder = tre.cssselect(css_selector)
+        if not områder:
+            return []
+        tre = områder[0]
+    artikler, sett = [], set()
+
+    for element in tre.cssselect(regel["element"]):
+        if element.tag == "a":
+            lenke = element
+        else:
+            treff = element.cssselect(regel.get("lenke", "a"))
+            if not treff:
+                continue
+            lenke = treff[0]
+        href = (lenke.get("href") or "").strip()
+        if not href or href.startswith("#") or href in sett:
+            continue
+
+        tittel_node = lenke
+        if regel.get("tittel"):
+            treff = element.cssselect(regel["tittel"])
+            tittel_node = treff[0] if treff else lenke
+        tittel = _tekst(tittel_node)
+        if not tittel:
+            continue
+
+        published = None
+        if regel.get("dato"):
+            treff = element.cssselect(regel["dato"])
+            if treff:
+                node = treff[0]
+                rå = node.get(regel["dato_attr"]) if regel.get("dato_attr") else _tekst(node)
+                if rå:
+                    published = _tolk_dato(rå.strip(), regel.get("datoformat"))
+
+        sett.add(href)
+        artikler.append({"title": tittel, "url": href, "published": published})
+    return artikler
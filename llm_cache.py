@@ -0,0 +1,211 @@
+# llm_cache.py
+"""
+Disk-cache for chat-svar fra OpenAI.
+
+Nøkkelen er en hash av modell, meldinger, temperatur og max_tokens, så en
+Streamlit-rerun, et dobbeltklikk eller et nytt forsøk etter en feilet
+opplasting gir samme svar uten et nytt (betalt) kall. `regenerer=True`
+hopper over oppslaget og erstatter svaret.
+
+Svarene ligger i llm_cache.db (SQLite, WAL). Oppføringer eldre enn TTL
+slettes, og blir cachen større enn MAKS_BYTES fjernes de som er brukt minst
+nylig. Treff, bom og spart tid (sum av opprinnelig svartid for treffene)
+telles både per prosess og totalt i databasen.
+
+    python llm_cache.py            # statistikk
+    python llm_cache.py --tøm
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+CACHE_FILE = Path(__file__).parent / "llm_cache.db"
+AKTIV      = os.getenv("LLM_CACHE", "1") != "0"
+TTL        = float(os.getenv("LLM_CACHE_TTL_DAGER", "30")) * 86400
+MAKS_BYTES = int(float(os.getenv("LLM_CACHE_MAKS_MB", "200")) * 2**20)
+
+SKJEMA = """
+CREATE TABLE IF NOT EXISTS svar (
+    nokkel    TEXT PRIMARY KEY,
+    modell    TEXT,
+    svar      TEXT NOT NULL,
+    svartid   REAL,                 -- sekunder det ekte kallet tok
+    opprettet REAL NOT NULL,
+    brukt     REAL NOT NULL,
+    bytes     INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_svar_brukt ON svar(brukt);
+CREATE TABLE IF NOT EXISTS statistikk (
+    navn  TEXT PRIMARY KEY,
+    verdi REAL NOT NULL
+);
+"""
+
+
+def nøkkel(model: str, messages: list[dict], temperature=None, max_tokens=None) -> str:
+    data = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, fil: Path = CACHE_FILE, ttl: float = TTL, maks_bytes: int = MAKS_BYTES):
+        self.ttl = ttl
+        self.maks_bytes = maks_bytes
+        self._lås = threading.Lock()
+        self._conn = sqlite3.connect(fil, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SKJEMA)
+        self.treff = 0
+        self.bom = 0
+        self.spart = 0.0
+
+    def _tell(self, **økninger):
+        self._conn.executemany(
+            "INSERT INTO statistikk (navn, verdi) VALUES (?, ?) "
+            "ON CONFLICT(navn) DO UPDATE SET verdi = verdi + excluded.verdi",
+            list(økninger.items()),
+        )
+
+    def hent(self, nøkkel: str) -> str | None:
+        nå = time.time()
+        with self._lås, self._conn:
+            rad = self._conn.execute(
+                "SELECT svar, svartid, opprettet FROM svar WHERE nokkel = ?", (nøkkel,)
+            ).fetchone()
+            if rad is None or rad[2] < nå - self.ttl:
+                self.bom += 1
+                self._tell(bom=1)
+                return None
+            self._conn.execute("UPDATE svar SET brukt = ? WHERE nokkel = ?", (nå, nøkkel))
+            self.treff += 1
+            self.spart += rad[1] or 0.0
+            self._tell(treff=1, spart_sekunder=rad[1] or 0.0)
+            return rad[0]
+
+    def lagre(self, nøkkel: str, svar: str, modell: str | None = None, svartid: float | None = None):
+        nå = time.time()
+        with self._lås, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO svar (nokkel, modell, svar, svartid, opprettet, brukt, bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (nøkkel, modell, svar, svartid, nå, nå, len(svar.encode("utf-8"))),
+            )
+            self._rydd(nå)
+
+    def _rydd(self, nå: float):
+        self._conn.execute("DELETE FROM svar WHERE opprettet < ?", (nå - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM svar").fetchone()[0]
+        if total <= self.maks_bytes:
+            return
+        # Minst nylig brukt ut til vi er under grensen
+        for nøkkel, størrelse in self._conn.execute(
+            "SELECT nokkel, bytes FROM svar ORDER BY brukt"
+        ).fetchall():
+            self._conn.execute("DELETE FROM svar WHERE nokkel = ?", (nøkkel,))
+            total -= størrelse
+            if total <= self.maks_bytes:
+                break
+
+    def tøm(self):
+        with self._lås, self._conn:
+            self._conn.execute("DELETE FROM svar")
+            self._conn.execute("DELETE FROM statistikk")
+
+    def statistikk(self) -> dict:
+        with self._lås:
+            oppføringer, størrelse = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM svar"
+            ).fetchone()
+            totalt = dict(self._conn.execute("SELECT navn, verdi FROM statistikk").fetchall())
+        return {
+            "oppføringer": oppføringer,
+            "bytes": størrelse,
+            "prosess": {"treff": self.treff, "bom": self.bom, "spart_sekunder": round(self.spart, 1)},
+            "totalt": {"treff": int(totalt.get("treff", 0)), "bom": int(totalt.get("bom", 0)),
+                       "spart_sekunder": round(totalt.get("spart_sekunder", 0.0), 1)},
+        }
+
+
+_cache: LLMCache | None = None
+_cache_lås = threading.Lock()
+
+
+def hent_cache() -> LLMCache:
+    global _cache
+    with _cache_lås:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+def cachet_chat(client, *, regenerer: bool = False, **params) -> str:
+    """
+    client.chat.completions.create(**params) via cachen. Returnerer bare
+    tekstinnholdet i svaret – det er alt kallerne våre bruker.
+    """
+    if not AKTIV:
+        return client.chat.completions.create(**params).choices[0].message.content
+
+    k = nøkkel(params["model"], params["messages"], params.get("temperature"), params.get("max_tokens"))
+    cache = hent_cache()
+    if not regenerer:
+        svar = cache.hent(k)
+        if svar is not None:
+            return svar
+
+    start = time.perf_counter()
+    svar = client.chat.completions.create(**params).choices[0].message.content
+    svartid = time.perf_counter() - start
+    try:
+        if svar is not None:
+            cache.lagre(k, svar, params["model"], svartid)
+    except sqlite3.Error as e:
+        logging.warning(f"Kunne ikke lagre LLM-svar i cachen: {e}")
+    return svar
+
+
+def cachet_chat_strøm(client, *, regenerer: bool = False, **params) -> Iterator[str]:
+    """
+    Som cachet_chat, men gir tekstbitene etter hvert som de kommer
+    (stream=True). Et treff gis som én bit. Svaret lagres først når hele
+    strømmen er lest – en avbrutt strøm havner ikke i cachen.
+    """
+    k = nøkkel(params["model"], params["messages"], params.get("temperature"), params.get("max_tokens"))
+    if AKTIV and not regenerer:
+        svar = hent_cache().hent(k)
+        if svar is not None:
+            yield svar
+            return
+
+    start = time.perf_counter()
+    biter = []
+    for del_ in client.chat.completions.create(stream=True, **params):
+        if not del_.choices:
+            continue
+        tekst = del_.choices[0].delta.content
+        if tekst:
+            biter.append(tekst)
+            yield tekst
+    if AKTIV:
+        try:
+            hent_cache().lagre(k, "".join(biter), params["model"], time.perf_counter() - start)
+        except sqlite3.Error as e:
+            logging.warning(f"Kunne ikke lagre LLM-svar i cachen: {e}")
+
+
+if __name__ == "__main__":
+    cache = hent_cache()
+    if "--tøm" in sys.argv[1:]:
+        cache.tøm()
+    print(json.dumps(cache.statistikk(), ensure_ascii=False, indent=2))
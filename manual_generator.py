@@ -10,9 +10,10 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from generate_articles import (
     hent_artikkeltekst,
-    generer_artikkel,
+    generer_artikkel_strøm,
 )
 from google_docs import last_opp_til_google_docs
+from llm_cache import hent_cache
 from utils import les_fil_innhold  # håndterer PDF/DOCX
 
 load_dotenv()
@@ -50,8 +51,13 @@ elif input_type == "Lim inn URL":
 elif input_type == "Last opp fil":
     file = st.file_uploader("Last opp PDF eller DOCX", type=["pdf", "docx"])
     if file:
-        with st.spinner("Leser fil ..."):
-            råtekst = les_fil_innhold(file)
+        # Tidligere leste filer hentes fra cachen (utils.py) uten å vise fremdrift
+        fremdrift = st.empty()
+        råtekst = les_fil_innhold(
+            file,
+            ved_side=lambda nr, antall: fremdrift.progress(nr / antall, text=f"Leser side {nr} av {antall} ..."),
+        )
+        fremdrift.empty()
         st.success("✅ Fil lest.")
         st.text_area("Råtekst fra fil", value=råtekst, height=300)
 
@@ -79,16 +85,24 @@ lengdevalg = st.radio(
 # -----------------------------------------------------------------
 if råtekst:
     tittel = st.text_input("Tittel til Google-Docs (valgfritt)", value="AI-generert artikkel")
+    regenerer = st.checkbox(
+        "Lag ny versjon (ikke bruk lagret svar)", value=False,
+        help="Samme tekst og valg gir ellers samme artikkel som sist, uten nytt modellkall.",
+    )
 
     if st.button("🧠 Generer artikkel og last opp til Google Docs"):
-        with st.spinner("Genererer artikkel med AI ..."):
-            artikkel = generer_artikkel(
+        # Teksten vises mens den skrives; opplastingen starter når strømmen er ferdig
+        artikkel = st.write_stream(
+            generer_artikkel_strøm(
                 råtekst,
                 url=url or "",
                 kategori=kategori if kategori.strip() else "Ukjent",
                 lengde=lengdevalg,
+                regenerer=regenerer,
             )
+        )
 
+        with st.spinner("Laster opp til Google Docs ..."):
             try:
                 link = last_opp_til_google_docs(
                     tittel or "AI-generert artikkel",
@@ -101,3 +115,12 @@ if råtekst:
                 st.markdown(f"[📄 Åpne dokumentet]({link})")
             except Exception as e:
                 st.error(f"❌ Feil ved opplasting: {e}")
+
+# -----------------------------------------------------------------
+#  SVAR-CACHE
+# -----------------------------------------------------------------
+stat = hent_cache().statistikk()["totalt"]
+st.caption(
+    f"Svar-cache: {stat['treff']} treff, {stat['bom']} bom – "
+    f"spart ca. {stat['spart_sekunder']:.0f} s ventetid."
+)
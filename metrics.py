@@ -0,0 +1,185 @@
+# metrics.py
+"""
+Ytelsesmetrikker for skrapingen.
+
+`Kjøringsmetrikker` lytter på de samme hendelsene som skrives til
+jobb-loggen (se run_daily_scrape.hendelse) og bygger opp per kilde:
+varighet, metode, artikkeltall (nye / gamle / sett / mangler URL /
+duplikater), feil og nye forsøk – pluss varighet per fase (last, endrings-
+sjekk, extract, filtrering, datotolkning, lagring).
+
+Når en runde er ferdig skrives:
+    rapporter/<tidspunkt>.json   full rapport for runden
+    rapporter/historikk.jsonl    én linje per runde, for trender over tid
+    rapporter/siste.prom         Prometheus tekstformat (node_exporter textfile)
+
+`registrer_generering()` logger svartidene for artikkelgenereringen til
+rapporter/generering.jsonl.
+"""
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+RAPPORT_MAPPE = Path(__file__).parent / "rapporter"
+
+_TELLERE = ("artikler", "nye", "gamle", "sett", "mangler_url", "duplikater", "feil", "forsøk")
+
+
+_genereringslås = threading.Lock()
+
+
+def registrer_generering(**data):
+    """
+    Én linje per artikkelgenerering i rapporter/generering.jsonl: rute og
+    modell (model_routing.py), om reserven ble brukt, om svaret ble
+    strømmet, tokens inn og ut, tid til første token (ttft), total svartid
+    og antall tegn. Svar fra cachen (llm_cache.py) vises som nesten null tid.
+    """
+    linje = json.dumps({"tid": datetime.now().isoformat(timespec="seconds"), **data}, ensure_ascii=False)
+    with _genereringslås:
+        RAPPORT_MAPPE.mkdir(exist_ok=True)
+        with open(RAPPORT_MAPPE / "generering.jsonl", "a", encoding="utf-8") as f:
+            f.write(linje + "\n")
+
+
+def _ny_kilde() -> dict:
+    return {"varighet": 0.0, "metode": None, "hoppet_over": False, **{t: 0 for t in _TELLERE}}
+
+
+def _etikett(verdi: str) -> str:
+    return verdi.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Kjøringsmetrikker:
+    def __init__(self, jobb_id: str, mappe: Path = RAPPORT_MAPPE):
+        self.jobb_id = jobb_id
+        self.mappe = mappe
+        self._lås = threading.Lock()
+        self._nullstill()
+
+    def _nullstill(self):
+        self.startet = time.time()
+        self.kilder: dict[str, dict] = {}
+        self.faser: dict[str, float] = {}
+
+    def _kilde(self, url: str) -> dict:
+        return self.kilder.setdefault(url, _ny_kilde())
+
+    # ---------- innsamling ---------- #
+    def registrer(self, h: dict):
+        t = h["type"]
+        with self._lås:
+            if t == "kilde_startet":
+                self._kilde(h["kilde"])
+            elif t == "kilde_hoppet_over":
+                self._kilde(h["kilde"])["hoppet_over"] = True
+            elif t == "kilde_hentet":
+                k = self._kilde(h["kilde"])
+                k["varighet"] += h["varighet"]
+                k["metode"] = h["metode"]
+            elif t == "kilde_feilet":
+                k = self._kilde(h["kilde"])
+                k["varighet"] += h.get("varighet", 0.0)
+                k["feil"] += 1
+            elif t == "kilde_forsøk":
+                self._kilde(h["kilde"])["forsøk"] += 1
+            elif t == "kilde_ferdig":
+                k = self._kilde(h["kilde"])
+                for teller in _TELLERE:
+                    if teller in h:
+                        k[teller] = h[teller]
+            elif t == "fase_ferdig":
+                self.faser[h["fase"]] = self.faser.get(h["fase"], 0.0) + h["varighet"]
+        if t == "runde_ferdig":
+            self.skriv()
+
+    # ---------- rapporter ---------- #
+    def rapport(self) -> dict:
+        with self._lås:
+            kilder = {url: dict(k) for url, k in self.kilder.items()}
+            faser = dict(self.faser)
+        return {
+            "jobb_id": self.jobb_id,
+            "startet": datetime.fromtimestamp(self.startet).isoformat(timespec="seconds"),
+            "varighet": round(time.time() - self.startet, 3),
+            "faser": {f: round(v, 3) for f, v in faser.items()},
+            "totalt": {t: sum(k[t] for k in kilder.values()) for t in _TELLERE},
+            "kilder": kilder,
+        }
+
+    def prometheus(self, rapport: dict) -> str:
+        linjer = [
+            "# HELP healthtalk_scrape_run_duration_seconds Varighet for siste skrape-runde.",
+            "# TYPE healthtalk_scrape_run_duration_seconds gauge",
+            f"healthtalk_scrape_run_duration_seconds {rapport['varighet']}",
+            "# HELP healthtalk_scrape_run_timestamp_seconds Når siste runde startet.",
+            "# TYPE healthtalk_scrape_run_timestamp_seconds gauge",
+            f"healthtalk_scrape_run_timestamp_seconds {self.startet:.0f}",
+            "# HELP healthtalk_scrape_phase_duration_seconds Varighet per fase i siste runde.",
+            "# TYPE healthtalk_scrape_phase_duration_seconds gauge",
+        ]
+        for fase, v in rapport["faser"].items():
+            linjer.append(f'healthtalk_scrape_phase_duration_seconds{{phase="{_etikett(fase)}"}} {v}')
+
+        linjer += [
+            "# HELP healthtalk_scrape_source_duration_seconds Hentetid per kilde i siste runde.",
+            "# TYPE healthtalk_scrape_source_duration_seconds gauge",
+        ]
+        for url, k in rapport["kilder"].items():
+            linjer.append(
+                f'healthtalk_scrape_source_duration_seconds{{source="{_etikett(url)}",'
+                f'method="{_etikett(k["metode"] or ("skipped" if k["hoppet_over"] else "none"))}"}} '
+                f'{round(k["varighet"], 3)}'
+            )
+
+        linjer += [
+            "# HELP healthtalk_scrape_source_articles Artikler per kilde og status i siste runde.",
+            "# TYPE healthtalk_scrape_source_articles gauge",
+        ]
+        for url, k in rapport["kilder"].items():
+            for status in ("nye", "gamle", "sett", "mangler_url", "duplikater"):
+                linjer.append(
+                    f'healthtalk_scrape_source_articles{{source="{_etikett(url)}",status="{status}"}} {k[status]}'
+                )
+
+        for navn, felt, hjelp in (
+            ("errors", "feil", "Feil per kilde i siste runde."),
+            ("retries", "forsøk", "Nye forsøk per kilde i siste runde."),
+        ):
+            linjer += [f"# HELP healthtalk_scrape_source_{navn} {hjelp}",
+                       f"# TYPE healthtalk_scrape_source_{navn} gauge"]
+            for url, k in rapport["kilder"].items():
+                linjer.append(f'healthtalk_scrape_source_{navn}{{source="{_etikett(url)}"}} {k[felt]}')
+        return "\n".join(linjer) + "\n"
+
+    def skriv(self):
+        """Skriver rapportene for runden og starter en ny måling."""
+        rapport = self.rapport()
+        self.mappe.mkdir(exist_ok=True)
+        stempel = datetime.fromtimestamp(self.startet).strftime("%Y%m%d-%H%M%S")
+
+        (self.mappe / f"{stempel}.json").write_text(
+            json.dumps(rapport, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        historikk = {
+            "startet": rapport["startet"],
+            "jobb_id": self.jobb_id,
+            "varighet": rapport["varighet"],
+            "faser": rapport["faser"],
+            "totalt": rapport["totalt"],
+            "kilder": {url: {"varighet": round(k["varighet"], 3), "nye": k["nye"], "feil": k["feil"]}
+                       for url, k in rapport["kilder"].items()},
+        }
+        with open(self.mappe / "historikk.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(historikk, ensure_ascii=False) + "\n")
+
+        # Skriv til temp-fil først så en scraper aldri leser en halv fil
+        prom = self.mappe / "siste.prom"
+        tmp = prom.with_suffix(".prom.tmp")
+        tmp.write_text(self.prometheus(rapport), encoding="utf-8")
+        tmp.replace(prom)
+
+        with self._lås:
+            self._nullstill()
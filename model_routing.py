@@ -0,0 +1,153 @@
+# model_routing.py
+"""
+Valg av modell og parametre per artikkel.
+
+Ruten bestemmes av lengdevalget (prompt_templates.lengdeklasse), størrelsen
+på prompten og profilen i RUTING_PROFIL:
+
+    rask        alt går til den raske modellen
+    balansert   notiser og korte saker på den raske modellen, middels
+                saker også når prompten er liten, lange saker på den store
+    kvalitet    alt på den store modellen (som før rutingen)
+
+Hver rute har en reservemodell. Gir hovedmodellen tidsavbrudd, 429 eller
+5xx, prøves reserven én gang, med det som er igjen av rutens frist (men
+minst RUTING_MIN_RESERVEFRIST sekunder). Tidsbruk, tokens og om reserven
+ble brukt, logges per rute i rapporter/generering.jsonl (metrics.registrer_generering).
+
+    python model_routing.py        # p50/p95 og tokens per rute fra loggen
+"""
+import itertools
+import json
+import logging
+import os
+import statistics
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+
+import openai
+
+from prompt_templates import lengdeklasse
+from resilience import er_forbigående
+
+PROFIL           = os.getenv("RUTING_PROFIL", "balansert")
+MODELL_RASK      = os.getenv("RUTING_MODELL_RASK", "gpt-4o-mini")
+MODELL_STOR      = os.getenv("RUTING_MODELL_STOR", "gpt-4o")
+RASK_MAKS_TOKENS = int(os.getenv("RUTING_RASK_MAKS_TOKENS", "3000"))   # største prompt for middels på rask modell
+FRISTER = {                                                           # sekunder før vi bytter til reserven
+    "rask": float(os.getenv("RUTING_FRIST_RASK", "20")),
+    "stor": float(os.getenv("RUTING_FRIST_STOR", "60")),
+}
+MIN_RESERVEFRIST = float(os.getenv("RUTING_MIN_RESERVEFRIST", "10"))
+MAKS_TOKENS_UT = {"notis": 300, "kort": 450, "middels": 850, "lang": 1400}
+
+
+@dataclass(frozen=True)
+class Rute:
+    navn: str               # lengdeklassen
+    modell: str
+    reserve: str | None
+    max_tokens: int
+    frist: float
+
+
+def velg_rute(lengde: str, tokens_inn: int, profil: str = PROFIL) -> Rute:
+    klasse = lengdeklasse(lengde)
+    if profil == "rask":
+        rask = True
+    elif profil == "kvalitet":
+        rask = False
+    else:
+        rask = klasse in ("notis", "kort") or (klasse == "middels" and tokens_inn <= RASK_MAKS_TOKENS)
+    modell, reserve = (MODELL_RASK, MODELL_STOR) if rask else (MODELL_STOR, MODELL_RASK)
+    return Rute(klasse, modell, reserve if reserve != modell else None,
+                MAKS_TOKENS_UT[klasse], FRISTER["rask" if rask else "stor"])
+
+
+def bør_bytte(e: Exception) -> bool:
+    """Tidsavbrudd, rate-grense og serverfeil – ikke feil i selve forespørselen."""
+    return isinstance(e, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)) \
+        or er_forbigående(e)
+
+
+def _forsøk(rute: Rute, params: dict) -> list[tuple[str, dict]]:
+    forsøk = [(params["model"], params)]
+    if rute.reserve and rute.reserve != params["model"]:
+        forsøk.append((rute.reserve, {**params, "model": rute.reserve}))
+    return forsøk
+
+
+def _med_frist(rute: Rute, params: dict, start: float) -> dict:
+    """Tidsavbrudd for neste forsøk: det som er igjen av rutens frist, med et gulv for reserven."""
+    igjen = rute.frist - (time.monotonic() - start)
+    return {**params, "timeout": max(igjen, min(MIN_RESERVEFRIST, rute.frist))}
+
+
+def kjør_med_reserve(rute: Rute, params: dict, kall: Callable[[dict], str]) -> tuple[str, str]:
+    """(svar, modellen som svarte). `kall(params)` gjør selve chat-kallet."""
+    forsøk, start = _forsøk(rute, params), time.monotonic()
+    for nr, (modell, p) in enumerate(forsøk, 1):
+        try:
+            return kall(_med_frist(rute, p, start)), modell
+        except Exception as e:
+            if nr == len(forsøk) or not bør_bytte(e):
+                raise
+            logging.warning(f"{modell} feilet for rute {rute.navn} ({e}) – prøver {rute.reserve}.")
+
+
+def start_strøm(rute: Rute, params: dict, lag_strøm: Callable[[dict], Iterator[str]]) -> tuple[str, Iterator[str]]:
+    """
+    (modell, strøm) der første bit allerede er hentet. Feiler hovedmodellen
+    før første bit, byttes det til reserven; etter det kan vi ikke bytte
+    uten å gi leseren to halve artikler, så feil gis videre.
+    """
+    forsøk, start = _forsøk(rute, params), time.monotonic()
+    for nr, (modell, p) in enumerate(forsøk, 1):
+        strøm = lag_strøm(_med_frist(rute, p, start))
+        try:
+            første = next(strøm)
+        except StopIteration:
+            return modell, iter(())
+        except Exception as e:
+            if nr == len(forsøk) or not bør_bytte(e):
+                raise
+            logging.warning(f"{modell} feilet for rute {rute.navn} ({e}) – prøver {rute.reserve}.")
+            continue
+        return modell, itertools.chain([første], strøm)
+
+
+# ---------- statistikk ---------- #
+def rutestatistikk(linjer: list[dict]) -> dict[str, dict]:
+    """p50/p95 total tid og tid til første token, tokens og reservebruk per rute."""
+    per_rute = defaultdict(list)
+    for linje in linjer:
+        per_rute[f"{linje.get('rute', '-')}/{linje.get('modell')}"].append(linje)
+
+    def pers(verdier: list[float], p: int) -> float | None:
+        if not verdier:
+            return None
+        if len(verdier) == 1:
+            return verdier[0]
+        return round(statistics.quantiles(verdier, n=100, method="inclusive")[p - 1], 3)
+
+    return {
+        navn: {
+            "antall": len(rader),
+            "total_p50": pers([r["total"] for r in rader if r.get("total") is not None], 50),
+            "total_p95": pers([r["total"] for r in rader if r.get("total") is not None], 95),
+            "ttft_p50": pers([r["ttft"] for r in rader if r.get("ttft") is not None], 50),
+            "tokens_inn_snitt": round(statistics.fmean(r.get("tokens_inn") or 0 for r in rader)),
+            "tokens_ut_snitt": round(statistics.fmean(r.get("tokens_ut") or 0 for r in rader)),
+            "reserve": sum(1 for r in rader if r.get("reserve")),
+        }
+        for navn, rader in sorted(per_rute.items())
+    }
+
+
+if __name__ == "__main__":
+    from metrics import RAPPORT_MAPPE
+    fil = RAPPORT_MAPPE / "generering.jsonl"
+    linjer = [json.loads(l) for l in fil.read_text(encoding="utf-8").splitlines() if l.strip()] if fil.exists() else []
+    print(json.dumps(rutestatistikk(linjer), ensure_ascii=False, indent=2))
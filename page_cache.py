@@ -0,0 +1,121 @@
+# page_cache.py
+"""
+Kortlivet disk-cache for artikkelsider.
+
+`hent_side(url)` laster ned en side én gang og deler den mellom alle
+trinnene som trenger den – uthenting av brødtekst, fallback-prompten og
+senere trinn – også på tvers av Streamlit-reruns og en gjenopptatt batch.
+
+- Yngre enn TTL: svaret gis fra cachen uten nettverkskall.
+- Eldre: betinget GET med ETag/Last-Modified; 304 fornyer oppføringen.
+- Samtidige kall for samme URL venter på hverandre i stedet for å laste
+  ned samme side to ganger.
+
+Sidene ligger i side_cache.db (SQLite, WAL). Oppføringer som ikke er
+hentet på BEHOLD sekunder, slettes. SIDE_CACHE=0 slår cachen av.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from resilience import robust_get
+
+CACHE_FILE = Path(__file__).parent / "side_cache.db"
+AKTIV      = os.getenv("SIDE_CACHE", "1") != "0"
+TTL        = float(os.getenv("SIDE_CACHE_TTL_MIN", "30")) * 60
+BEHOLD     = float(os.getenv("SIDE_CACHE_BEHOLD_DAGER", "7")) * 86400
+
+SKJEMA = """
+CREATE TABLE IF NOT EXISTS sider (
+    url           TEXT PRIMARY KEY,
+    tekst         TEXT NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    hentet        REAL NOT NULL      -- sist lastet ned eller bekreftet med 304
+);
+"""
+
+
+class SideCache:
+    def __init__(self, fil: Path = CACHE_FILE, ttl: float = TTL):
+        self.ttl = ttl
+        self._lås = threading.Lock()
+        self._url_låser: defaultdict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._conn = sqlite3.connect(fil, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SKJEMA)
+        self.treff = 0
+        self.revalidert = 0
+        self.nedlastet = 0
+
+    def _rad(self, url: str):
+        with self._lås:
+            return self._conn.execute(
+                "SELECT tekst, etag, last_modified, hentet FROM sider WHERE url = ?", (url,)
+            ).fetchone()
+
+    def _lagre(self, url: str, tekst: str, etag: str | None, last_modified: str | None):
+        nå = time.time()
+        with self._lås, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sider (url, tekst, etag, last_modified, hentet) VALUES (?, ?, ?, ?, ?)",
+                (url, tekst, etag, last_modified, nå),
+            )
+            self._conn.execute("DELETE FROM sider WHERE hentet < ?", (nå - BEHOLD,))
+
+    def hent(self, url: str, **kwargs) -> str:
+        """Sidens tekst; kaster requests.HTTPError o.l. som robust_get."""
+        with self._lås:
+            url_lås = self._url_låser[url]
+        with url_lås:
+            rad = self._rad(url)
+            if rad and rad[3] >= time.time() - self.ttl:
+                self.treff += 1
+                return rad[0]
+
+            headers = dict(kwargs.pop("headers", None) or {})
+            if rad:
+                if rad[1]:
+                    headers["If-None-Match"] = rad[1]
+                if rad[2]:
+                    headers["If-Modified-Since"] = rad[2]
+            res = robust_get(url, headers=headers, **kwargs)
+
+            if res.status_code == 304 and rad:
+                self.revalidert += 1
+                self._lagre(url, rad[0], rad[1], rad[2])
+                return rad[0]
+            res.raise_for_status()
+            self.nedlastet += 1
+            try:
+                self._lagre(url, res.text, res.headers.get("ETag"), res.headers.get("Last-Modified"))
+            except sqlite3.Error as e:
+                logging.warning(f"Kunne ikke lagre {url} i sidecachen: {e}")
+            return res.text
+
+
+_cache: SideCache | None = None
+_cache_lås = threading.Lock()
+
+
+def hent_cache() -> SideCache:
+    global _cache
+    with _cache_lås:
+        if _cache is None:
+            _cache = SideCache()
+        return _cache
+
+
+def hent_side(url: str, **kwargs) -> str:
+    """HTML-en for `url`, fra cachen når den er fersk nok."""
+    kwargs.setdefault("timeout", 15)
+    if not AKTIV:
+        res = robust_get(url, **kwargs)
+        res.raise_for_status()
+        return res.text
+    return hent_cache().hent(url, **kwargs)
@@ -1,45 +1,100 @@
 # pages/03_Manuell_Oppdatering.py
+import os
+import sys
+import time
 import streamlit as st
-import subprocess, sys, os
-from pathlib import Path
+
+# slik at vi kan importere fra prosjektroten
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import jobs
 
 st.set_page_config(page_title="HealthTalk - Manuell Oppdatering")
 st.title("⚙️ Manuell oppdatering av artikkeldatabasen")
 
-st.warning(
-    "**Advarsel:** Denne prosessen kan ta flere minutter å fullføre. "
-    "Ikke lukk dette vinduet mens den kjører."
+st.info(
+    "Skrapingen kjører i bakgrunnen og kan ta flere minutter. "
+    "Du kan trygt laste siden på nytt eller lukke den – den kobler seg på igjen."
 )
 
-ROOT_DIR = Path(__file__).parent.parent          # 👉 peker på prosjektroten
 
-if st.button("🚀 Start manuell skraping nå!"):
-    with st.status("Starter skrapeprosessen …", expanded=True) as status:
+def beskriv(h: dict) -> str | None:
+    """Gjør en hendelse om til én linje i fremdriftsloggen."""
+    t = h["type"]
+    if t == "kilde_startet":
+        return f"⏳ {h['kilde']}"
+    if t == "kilde_hoppet_over":
+        return f"⏭️ {h['kilde']} – uendret siden sist"
+    if t == "kilde_hentet":
+        return f"📥 {h['kilde']}: {h['artikler']} artikler ({h['metode']}, {h['varighet']:.1f} s)"
+    if t == "kilde_forsøk":
+        return f"🔁 {h['kilde']}: forsøk {h['forsøk']} om {h['vent']} s ({h['feil']})"
+    if t == "kilde_feilet":
+        return f"❌ {h['kilde']}: {h['feil']}"
+    if t == "kilde_ferdig":
+        return f"✅ {h['kilde']}: {h['nye']} nye av {h['artikler']}"
+    if t == "runde_ferdig":
+        return f"**Runde ferdig:** {h['nye']} nye artikler, {h['hoppet_over']} av {h['kilder']} kilder uendret."
+    if t == "jobb_feilet":
+        return f"❌ **Jobben feilet:** {h['feil']}"
+    return None
+
+
+aktiv = jobs.aktiv_jobb()
+jobb_id = (aktiv or {}).get("jobb_id") or st.session_state.get("jobb_id") or jobs.siste_jobb_id()
+
+if aktiv is None:
+    if st.button("🚀 Start manuell skraping nå!"):
         try:
-            st.write("Kjører `run_daily_scrape.py` …")
-
-            process = subprocess.run(
-                [sys.executable, str(ROOT_DIR / "run_daily_scrape.py")],
-                cwd=ROOT_DIR,                       # kjør fra prosjektroten
-                env=os.environ.copy(),              # arver .env / API-key
-                capture_output=True,
-                text=True,
-                check=True,
-            )
+            st.session_state["jobb_id"] = jobs.start_jobb()
+            st.session_state["jobb_startet"] = time.time()
+            st.rerun()
+        except jobs.SkrapingKjørerAllerede as e:
+            st.warning(str(e))
+else:
+    st.button("🚀 Start manuell skraping nå!", disabled=True)
+    st.caption(f"En skraping kjører allerede: jobb `{aktiv.get('jobb_id')}` "
+               f"({aktiv.get('modus')}, startet {aktiv.get('startet')}).")
 
-            # 👉 Vis både stdout *og* stderr
-            st.write("Prosesslogg:")
-            st.code(process.stdout + process.stderr)   # <-- begge strømmer
+# -----------------------------------------------------------------
+#  STRØM HENDELSER FOR JOBBEN
+# -----------------------------------------------------------------
+if jobb_id:
+    status = st.status(f"Jobb {jobb_id}", expanded=True, state="running")
+    posisjon, så_den_kjøre, slutt = None, False, None
+    # Daemonen avslutter ikke jobben; der viser vi runden som pågår eller sist ble ferdig
+    daemon = aktiv is not None and aktiv.get("modus") == "daemon" and aktiv.get("jobb_id") == jobb_id
+    sluttyper = ("jobb_ferdig", "jobb_feilet", "runde_ferdig") if daemon else ("jobb_ferdig", "jobb_feilet")
 
-            status.update(label="✅ Skraping fullført!", state="complete", expanded=False)
-            st.success("Databasen er oppdatert! Gå til «Artikkelarkiv» for å se de siste funnene.")
-            st.balloons()
+    while slutt is None:
+        hendelser, posisjon = jobs.les_hendelser(jobb_id, posisjon)
+        for h in hendelser:
+            if (linje := beskriv(h)) is not None:
+                status.write(linje)
+            if h["type"] in sluttyper:
+                slutt = h["type"]
 
-        except subprocess.CalledProcessError as e:
-            status.update(label="❌ Skraping feilet!", state="error", expanded=True)
-            st.error("Det oppstod en feil under kjøringen av skriptet.")
-            st.code(e.stdout + e.stderr)
+        if slutt is None:
+            kjører = (jobs.aktiv_jobb() or {}).get("jobb_id") == jobb_id
+            nettopp_startet = (
+                jobb_id == st.session_state.get("jobb_id")
+                and time.time() - st.session_state.get("jobb_startet", 0) < 10
+            )
+            if not kjører and not nettopp_startet:
+                slutt = "avbrutt"           # prosessen døde uten å melde fra
+                break
+            så_den_kjøre = True
+            time.sleep(1)
 
-        except FileNotFoundError:
-            status.update(label="❌ Finner ikke skriptet!", state="error", expanded=True)
-            st.error("Kunne ikke finne `run_daily_scrape.py` i rotmappen.")
+    if slutt == "runde_ferdig":
+        status.update(label=f"✅ Daemon-runde fullført – jobb {jobb_id} venter på neste runde",
+                      state="complete", expanded=True)
+    elif slutt == "jobb_ferdig":
+        status.update(label=f"✅ Jobb {jobb_id} fullført", state="complete", expanded=så_den_kjøre)
+        if så_den_kjøre:
+            st.success("Databasen er oppdatert! Gå til «Artikkelarkiv» for å se de siste funnene.")
+            st.balloons()
+    else:
+        status.update(label=f"❌ Jobb {jobb_id} feilet", state="error", expanded=True)
+        if jobs.loggfil(jobb_id).exists():
+            st.code(jobs.loggfil(jobb_id).read_text(encoding="utf-8")[-5000:])
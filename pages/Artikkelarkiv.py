@@ -1,8 +1,13 @@
-import json
+import os
+import sys
 import streamlit as st
-from pathlib import Path
 from datetime import date, timedelta
 
+# slik at vi kan importere fra prosjektroten
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import storage
+
 # --- 1. Sidekonfigurasjon ---
 # Setter tittelen som vises i nettleserfanen og på selve siden.
 st.set_page_config(page_title="HealthTalk - Artikkelarkiv")
@@ -10,78 +15,104 @@ st.title("🔎 Artikkelarkiv fra automatiske søk")
 st.write("Her finner du de siste artiklene som er funnet av overvåkningsroboten.")
 
 # --- 2. Innlasting av data ---
-# Finner stien til databasen. Path(__file__).parent.parent er en robust måte
-# å finne rotmappen på, uansett hvor prosjektet ligger.
-PROSJEKT_ROT = Path(__file__).parent.parent
-DATABASE_FIL = PROSJEKT_ROT / "artikkel_database.json" 
+# Artiklene ligger i SQLite (storage.py). Vi teller bare her, og henter
+# kun radene for de valgte dagene lenger ned – ikke hele arkivet.
+# Én tilkobling per kjøring av siden; lukkes til slutt så WAL-filene ikke holdes åpne.
+conn = storage.koble_til()
+try:
+    antall_funn = storage.antall_artikler(conn)
 
-# Laster inn hele databasen og håndterer feil hvis filen er tom eller korrupt.
-alle_funn = []
-if DATABASE_FIL.exists():
-    try:
-        with open(DATABASE_FIL, 'r', encoding='utf-8') as f:
-            alle_funn = json.load(f)
-    except json.JSONDecodeError:
-        st.error(f"Kunne ikke lese datafilen ({DATABASE_FIL.name}). Den kan være korrupt.")
-else:
-    st.warning(f"Fant ingen datafil ({DATABASE_FIL.name}). Kjør en skraping for å opprette den.")
+    # --- 3. Brukergrensesnitt og filtrering ---
+    if not antall_funn:
+        st.info("Artikkeldatabasen er tom. Ingen artikler å vise ennå.")
+    else:
+        st.success(f"Databasen inneholder totalt {antall_funn} unike artikler.")
+        st.write("---")
 
-# --- 3. Brukergrensesnitt og filtrering ---
-if not alle_funn:
-    st.info("Artikkeldatabasen er tom. Ingen artikler å vise ennå.")
-else:
-    st.success(f"Databasen inneholder totalt {len(alle_funn)} unike artikler.")
-    st.write("---")
+        # Lager et interaktivt filter slik at journalisten kan velge dager.
+        today = date.today()
+        dato_valg = {
+            "I dag": today.isoformat(),
+            "I går": (today - timedelta(days=1)).isoformat(),
+            "For 2 dager siden": (today - timedelta(days=2)).isoformat(),
+            "For 3 dager siden": (today - timedelta(days=3)).isoformat(),
+        }
 
-    # Lager et interaktivt filter slik at journalisten kan velge dager.
-    today = date.today()
-    dato_valg = {
-        "I dag": today.isoformat(),
-        "I går": (today - timedelta(days=1)).isoformat(),
-        "For 2 dager siden": (today - timedelta(days=2)).isoformat(),
-        "For 3 dager siden": (today - timedelta(days=3)).isoformat(),
-    }
-    
-    # Multiselect-widget lar brukeren velge flere dager (perfekt for mandager).
-    valgte_dager_navn = st.multiselect(
-        "Vis artikler funnet på følgende dager:",
-        options=list(dato_valg.keys()),
-        default=["I dag", "I går"] # Standardvalg som er mest nyttig.
-    )
+        # Multiselect-widget lar brukeren velge flere dager (perfekt for mandager).
+        valgte_dager_navn = st.multiselect(
+            "Vis artikler funnet på følgende dager:",
+            options=list(dato_valg.keys()),
+            default=["I dag", "I går"] # Standardvalg som er mest nyttig.
+        )
 
-    # Filtrer listen basert på brukerens valg.
-    filtrerte_funn = []
-    if valgte_dager_navn:
-        valgte_dato_iso = [dato_valg[navn] for navn in valgte_dager_navn]
-        filtrerte_funn = [
-            artikkel for artikkel in alle_funn 
-            if artikkel.get("funnet_dato") in valgte_dato_iso
-        ]
-    
-    st.write("---")
+        # Filtrer listen basert på brukerens valg.
+        filtrerte_funn = []
+        if valgte_dager_navn:
+            valgte_dato_iso = [dato_valg[navn] for navn in valgte_dager_navn]
+            filtrerte_funn = storage.hent_artikler_funnet(conn, valgte_dato_iso)
 
-    # --- 4. Visning av resultater ---
-    if not filtrerte_funn:
-        st.write("Ingen artikler funnet for de valgte dagene.")
-    else:
-        st.subheader(f"Viser {len(filtrerte_funn)} artikler")
-        
-        # Sorterer listen slik at de nyeste funnene vises øverst.
-        filtrerte_funn.sort(key=lambda x: x.get("funnet_dato", ""), reverse=True)
+        st.write("---")
+
+        # --- 4. Visning av resultater ---
+        if not filtrerte_funn:
+            st.write("Ingen artikler funnet for de valgte dagene.")
+        else:
+            # Spørringen gir allerede de nyeste funnene øverst.
+            st.subheader(f"Viser {len(filtrerte_funn)} artikler")
+
+            # Samme sak fra andre kilder vises under hovedartikkelen.
+            klynger = storage.hent_duplikater(conn, [a["id"] for a in filtrerte_funn])
+
+            # Generer artikler for alle viste funn (se batch_generation.py).
+            # Ferdige artikler hoppes over, så knappen kan trygt trykkes på nytt.
+            if st.button(f"🧠 Generer artikler for alle {len(filtrerte_funn)} viste funn"):
+                from batch_generation import generer_batch
+
+                ikoner = {"hentet": "📥", "generert": "📝", "ferdig": "✅", "feilet": "❌"}
+                status = st.status("Genererer artikler ...", expanded=True)
+                telling = generer_batch(
+                    conn,
+                    filtrerte_funn,
+                    ved_status=lambda art, s: status.write(
+                        f"{ikoner.get(s, '⏳')} {art.get('tittel') or art['url']} – {s}"
+                    ),
+                )
+                status.update(
+                    label=f"{telling['ferdig']} ferdige, {telling['feilet']} feilet",
+                    state="error" if telling["feilet"] else "complete",
+                    expanded=bool(telling["feilet"]),
+                )
+            genereringer = storage.hent_genereringer(conn, [a["id"] for a in filtrerte_funn])
 
-        # Går gjennom og viser hver eneste filtrerte artikkel.
-        for artikkel in filtrerte_funn:
-            tittel = artikkel.get("tittel", "Mangler tittel")
-            url = artikkel.get("url", "#") # '#' som fallback hvis URL mangler.
-            kilde_dato = artikkel.get("dato", "ukjent") # Datoen fra selve artikkelen.
-            funnet_dato = artikkel.get("funnet_dato", "ukjent")
+            # Går gjennom og viser hver eneste filtrerte artikkel.
+            for artikkel in filtrerte_funn:
+                tittel = artikkel.get("tittel") or "Mangler tittel"
+                url = artikkel.get("url") or "#" # '#' som fallback hvis URL mangler.
+                kilde_dato = artikkel.get("dato") or "ukjent" # Datoen fra selve artikkelen.
+                funnet_dato = artikkel.get("funnet_dato") or "ukjent"
 
-            # Bruker st.markdown for å lage en pen, formatert og klikkbar visning.
-            st.markdown(
-                f"""
-                #### {tittel}
-                **Kilde-URL:** [Åpne originalartikkel]({url})  
-                *Funnet av roboten: {funnet_dato} (Original dato: {kilde_dato})*
-                """
-            )
-            st.write("---") # Skillelinje for lesbarhet.
\ No newline at end of file
+                # Bruker st.markdown for å lage en pen, formatert og klikkbar visning.
+                st.markdown(
+                    f"""
+                    #### {tittel}
+                    **Kilde-URL:** [Åpne originalartikkel]({url})  
+                    *Funnet av roboten: {funnet_dato} (Original dato: {kilde_dato})*
+                    """
+                )
+                generering = genereringer.get(artikkel["id"])
+                if generering and generering["status"] == "ferdig":
+                    if generering.get("lenke"):
+                        st.markdown(f"📄 **Generert:** [Åpne dokumentet]({generering['lenke']})")
+                    else:
+                        st.markdown(f"📄 **Generert:** `{generering.get('docx_fil')}`")
+                elif generering and generering["status"] == "feilet":
+                    st.markdown(f"⚠️ Generering feilet: {generering.get('feil')}")
+                andre = klynger.get(artikkel["id"], [])
+                if andre:
+                    st.markdown(
+                        "**Også omtalt hos:** "
+                        + " · ".join(f"[{d.get('tittel') or d['url']}]({d['url']})" for d in andre)
+                    )
+                st.write("---") # Skillelinje for lesbarhet.
+finally:
+    conn.close()
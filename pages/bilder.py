@@ -1,8 +1,14 @@
 import streamlit as st
 import openai
 import os
+import sys
 from dotenv import load_dotenv
 
+# slik at vi kan importere fra prosjektroten
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from llm_cache import cachet_chat
+
 # --- KONFIGURASJON OG OPPSETT ---
 
 st.set_page_config(page_title="Bildegenerator for Artikler", layout="wide")
@@ -17,9 +23,11 @@ else:
 
 # --- FUNKSJONER FOR AI-KALL ---
 
-def create_visual_prompt_from_text(article_text: str, style: str, adjustments: dict) -> str | None:
+def create_visual_prompt_from_text(article_text: str, style: str, adjustments: dict, regenerate: bool = False) -> str | None:
     """
     Bygger en dynamisk bildeprompt basert på input og valgte justeringer.
+    Samme tekst og valg gir svaret fra cachen (llm_cache.py) med mindre
+    regenerate er satt.
     """
     
     # **NYTT: Velger en helt annen system-prompt hvis minimalistisk modus er valgt.**
@@ -60,7 +68,9 @@ def create_visual_prompt_from_text(article_text: str, style: str, adjustments: d
     system_prompt += "\n\nYour final output must be ONLY the detailed prompt in ENGLISH, nothing else."
 
     try:
-        response = client.chat.completions.create(
+        response = cachet_chat(
+            client,
+            regenerer=regenerate,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -69,7 +79,7 @@ def create_visual_prompt_from_text(article_text: str, style: str, adjustments: d
             max_tokens=300,
             temperature=0.7
         )
-        return response.choices[0].message.content.strip()
+        return response.strip()
     except Exception as e:
         st.error(f"Feil under analyse av tekst: {e}")
         return None
@@ -139,6 +149,11 @@ with col_b:
 with col_c:
     adj_use_bokeh = st.checkbox("Bruk uskarp bakgrunn (bokeh)", value=False, help="Skaper en profesjonell, fotografisk effekt.")
 
+regenerate_prompt = st.checkbox(
+    "Lag ny bildeprompt (ikke bruk lagret)", value=False,
+    help="Samme tekst og valg gir ellers samme bildeprompt som sist, uten nytt kall til GPT-4o."
+)
+
 st.divider()
 
 generate_button = st.button("🚀 **Trinn 4: Generer Bilder**", type="primary", use_container_width=True)
@@ -154,7 +169,7 @@ if generate_button:
         }
         
         with st.spinner("🤖 Analyserer teksten og bygger en skreddersydd bildebeskrivelse..."):
-            visual_prompt = create_visual_prompt_from_text(article_text, image_style, adjustments)
+            visual_prompt = create_visual_prompt_from_text(article_text, image_style, adjustments, regenerate_prompt)
         
         if visual_prompt:
             st.info(f"**Bildeprompt sendt til DALL-E 3:**\n\n> *{visual_prompt}*")
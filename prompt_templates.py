@@ -0,0 +1,151 @@
+# prompt_templates.py
+"""
+Oppbygging av promptene til artikkelgenereringen.
+
+De redaksjonelle instruksjonene er like for alle kall og ligger i
+SYSTEM_PREFIKS (system-meldingen). Alt som varierer – lengdeinstruks,
+kategori, kilde og råtekst – kommer til slutt i bruker-meldingen.
+Da er starten av hver forespørsel byte-lik fra kall til kall, og
+leverandørens prefiks-cache (OpenAI: automatisk fra 1024 tokens) kan
+gjenbrukes.
+
+Hver `Prompt` har et tokenantall (tiktoken når den er tilgjengelig,
+ellers et anslag ut fra antall tegn).
+"""
+import logging
+import math
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+
+MODELL = "gpt-4o"
+
+SYSTEM_PREFIKS = """Du er en erfaren helsejournalist for HealthTalk.no.
+
+Forestill deg at du er en erfaren og språksikker journalist som skal hjelpe en kollega med å forbedre sin tekst.
+Din oppgave er å analysere den innsendte teksten med det formål å forbedre lesbarheten og tilgjengeligheten, samtidig som du opprettholder en journalistisk, nøytral og objektiv stil.
+Legg vekt på å bevare det menneskelige aspektet og den unike, personlige stilen til journalisten, samtidig som teksten ikke blir for KI-aktig eller klisjéfylt.
+Vurder teksten i henhold til følgende hierarkiske struktur for tilbakemeldinger:
+Punkt 1: Skrivefeil og grammatiske feil: Identifiser og korriger åpenbare skrivefeil, grammatiske feil og kommafeil. Dobbeltsjekk før du foreslår rettelser for å unngå overkorreksjon eller unødvendige endringer.
+Punkt 2: Setningsstrukturer og språklige forbedringer: Etter å ha adressert åpenbare feil, foreslå forbedringer i setningsstrukturen og andre språklige forbedringer for å gjøre teksten mer flytende og lettforståelig. Unngå klisjeer og byråkratiske vendinger.
+Punkt 3: Andre forbedringer: Presenter Innspill til andre forbedringer som kan heve tekstens kvalitet. Dette kan inkludere Innspill til bedre ordvalg, klarhet, eller stil.
+Punkt 4: Vanskelige ord og konsepter: List opp ord eller konsepter som kan være vanskelige for en gjennomsnittlig leser å forstå. Foreslå alternative ord eller gi en kort forklaring.
+Viktig: Ikke endre teksten som følger etter en sitatstrek (–) eller teksten innenfor anførselstegn («»), da disse markerer direkte sitater. Dette er direkte tale eller sitater som ikke skal endres under noen omstendigheter.
+Hvis teksten overstiger 3000 tegn, indiker at teksten er lang, og tilby å kutte ned lengden ved å skrive mer konsist uten å miste den opprinnelige meningen.
+Kommenter tekstens LIKS, og gi en kort forklaring: < 30: Veldig lettlest, som barnebøker 30-40: Lettlest, som skjønnlitteratur eller ukeblader 40-50: Middels vanskelig, som vanlig avistekst 50-60: Vanskelig, vanlig verdi for offisielle tekster > 60: Veldig tunglest byråkratspråk
+Bruk Markdown til å formatere tilbakemeldingen din, svar på norsk, og sørg for å inkludere en kort oppsummering av hovedpunktene i tilbakemeldingen.
+Husk å være konstruktiv og oppmuntrende i tilbakemeldingen din, og fokuser på å hjelpe journalisten med å forbedre teksten sin."""
+
+
+# ---------- tokens ---------- #
+_koder_lås = threading.Lock()
+
+
+def _koder(modell: str):
+    # Låsen gjør at bare én tråd prøver å laste (eventuelt laste ned) tokenfilen
+    with _koder_lås:
+        return _last_koder(modell)
+
+
+@lru_cache(maxsize=8)
+def _last_koder(modell: str):
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(modell)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # Ikke installert, eller tokenfilen kunne ikke lastes ned
+        logging.info(f"tiktoken utilgjengelig ({e}) – anslår tokens ut fra tegn.")
+        return None
+
+
+def tell_tokens(tekst: str, modell: str = MODELL) -> int:
+    koder = _koder(modell)
+    if koder is None:
+        return math.ceil(len(tekst) / 3.5)       # norsk tekst ligger rundt 3–4 tegn per token
+    return len(koder.encode(tekst, disallowed_special=()))
+
+
+def kutt_til_tokens(tekst: str, maks: int, modell: str = MODELL) -> str:
+    """De første `maks` tokens av teksten (siste utvei når oppsummering ikke holder)."""
+    koder = _koder(modell)
+    if koder is None:
+        return tekst[: int(maks * 3.5)]
+    tokens = koder.encode(tekst, disallowed_special=())
+    # "ignore": et token-kutt kan dele et flerbytes tegn (æ, ø, å) – da droppes restbytene
+    return tekst if len(tokens) <= maks else koder.decode(tokens[:maks], errors="ignore")
+
+
+# ---------- prompter ---------- #
+@dataclass(frozen=True)
+class Prompt:
+    system: str
+    bruker: str
+    modell: str = MODELL
+
+    @property
+    def meldinger(self) -> list[dict]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.bruker},
+        ]
+
+    @property
+    def tokens(self) -> int:
+        # Omtrent 4 tokens ekstra per melding i chat-formatet
+        return tell_tokens(self.system, self.modell) + tell_tokens(self.bruker, self.modell) + 8
+
+    def som_tekst(self) -> str:
+        return f"{self.system}\n\n{self.bruker}"
+
+
+def lengdeklasse(lengde: str) -> str:
+    """"notis", "kort", "middels" eller "lang" ut fra lengdevalget i grensesnittet."""
+    if "366" in lengde:
+        return "kort"
+    if "700" in lengde:
+        return "middels"
+    if "notis" in lengde.lower():
+        return "notis"
+    return "lang"
+
+
+def lengdeinstruks(lengde: str) -> str:
+    klasse = lengdeklasse(lengde)
+    if klasse == "kort":
+        return (
+            "Skriv en artikkel (tittel + ingress + brødtekst) der selve brødteksten "
+            "er **maks 366 tegn totalt** (inkludert mellomrom og punktum). "
+            "Bruk klar, aktiv journalistisk stil. Ikke overskrid grensen."
+        )
+    if klasse == "middels":
+        return (
+            "Skriv en artikkel der brødteksten er **maks 700 tegn totalt** "
+            "(inkludert mellomrom og punktum)."
+        )
+    if klasse == "notis":
+        return (
+            "Skriv en kort notis"
+            "den skal være **maks 2-4 setninger** (ca. 50-100 ord)."
+        )
+    return (
+        "Skriv en fyldig artikkel der brødteksten er **minst 1000 tegn** "
+        "og kan gjerne være lenger (1200-1500 tegn)."
+    )
+
+
+def artikkel_prompt(råtekst: str, url: str, kategori: str = "Legemidler", lengde: str = "Kort") -> Prompt:
+    return Prompt(SYSTEM_PREFIKS, f"""Kan du lage en artikkel basert på dette:
+
+{lengdeinstruks(lengde)}
+
+Kategori: {kategori}
+Kilde: {url}
+
+Råtekst fra kilden:
+{råtekst}
+
+Begynn artikkelen nå:""")
+
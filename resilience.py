@@ -0,0 +1,331 @@
+# resilience.py
+"""
+Felles beskyttelse rundt utgående kall (Firecrawl, kildesidene, artikkelsider).
+
+`kall(fn, ..., api=, domene=)` gjør følgende for hvert kall:
+
+- venter på token-bøtta for API-et og for domenet (rate-grense),
+- avviser kallet med en gang hvis kretsbryteren for kilden er åpen,
+- kjører hvert forsøk innenfor det som er igjen av fristen,
+- prøver igjen ved forbigående feil (nettverk, tidsavbrudd, 429, 5xx) med
+  eksponentiell backoff og full jitter, og respekterer Retry-After.
+
+Kretsbryteren nøkles på API og domene (bare API når domenet ikke er kjent),
+slik at én kilde som feiler ikke stenger de andre, og en kilde som gir 503
+på direkte GET fortsatt kan hentes via Firecrawl. Et kall telles som én
+feil først når forsøkene er brukt opp. Etter FEILGRENSE mislykkede kall på
+rad stenges kilden i PAUSE sekunder; deretter slippes ett prøvekall gjennom.
+
+Alle HTTP-kall går gjennom én felles requests.Session (`sesjon()`) med
+tilkoblingspool, keep-alive, gzip/deflate og User-Agent fra HTTP_USER_AGENT,
+så gjentatte kall mot samme vert slipper nytt DNS-oppslag og TLS-håndtrykk.
+
+Alt er per prosess og trådsikkert (run_daily_scrape henter i tråder).
+"""
+import logging
+import os
+import random
+import threading
+import time
+from collections.abc import Callable
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from seen_index import domene_for
+
+MAKS_FORSØK = int(os.getenv("RESILIENS_MAKS_FORSOK", "4"))
+BASIS_VENT  = float(os.getenv("RESILIENS_BASIS_VENT", "1.0"))     # sekunder før 2. forsøk
+MAKS_VENT   = float(os.getenv("RESILIENS_MAKS_VENT", "30"))
+FEILGRENSE  = int(os.getenv("RESILIENS_FEILGRENSE", "3"))         # feil på rad før bryteren åpner
+PAUSE       = float(os.getenv("RESILIENS_PAUSE", "300"))          # sekunder bryteren holdes åpen
+
+# Frist for hele kallet inkludert nye forsøk
+FRISTER = {
+    "firecrawl": float(os.getenv("RESILIENS_FRIST_FIRECRAWL", "180")),
+    "http":      float(os.getenv("RESILIENS_FRIST_HTTP", "45")),
+}
+# (kall per sekund, største støt) per API, og for hvert domene
+API_RATER = {
+    "firecrawl": (float(os.getenv("RESILIENS_FIRECRAWL_PER_MIN", "20")) / 60, 5),
+    "http":      (50.0, 20),
+}
+DOMENE_RATE = (float(os.getenv("RESILIENS_DOMENE_PER_SEK", "1")), 3)
+
+FORBIGÅENDE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+USER_AGENT   = os.getenv("HTTP_USER_AGENT", "Mozilla/5.0 (compatible; HealthTalk-overvaker/1.0)")
+POOL_PER_VERT = int(os.getenv("HTTP_POOL_PER_VERT", "10"))     # åpne tilkoblinger per vert
+
+
+class KretsÅpen(RuntimeError):
+    """Kilden har feilet for mange ganger på rad og er midlertidig stengt."""
+
+
+class FristUtløpt(TimeoutError):
+    pass
+
+
+class ForbigåendeHTTPFeil(requests.HTTPError):
+    """429/5xx fra robust_get – gis videre til kalleren hvis alle forsøk feiler."""
+
+
+# ---------- rate-grense ---------- #
+class TokenBøtte:
+    def __init__(self, rate: float, kapasitet: float):
+        self.rate = rate
+        self.kapasitet = kapasitet
+        self._tokens = kapasitet
+        self._sist = time.monotonic()
+        self._lås = threading.Lock()
+
+    def ta(self, frist: float | None = None):
+        """Venter til et token er ledig. Kaster FristUtløpt hvis det ikke rekkes før `frist`."""
+        while True:
+            with self._lås:
+                nå = time.monotonic()
+                self._tokens = min(self.kapasitet, self._tokens + (nå - self._sist) * self.rate)
+                self._sist = nå
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                vent = (1 - self._tokens) / self.rate
+            if frist is not None and nå + vent > frist:
+                raise FristUtløpt("Rate-grensen slipper ikke gjennom kallet før fristen.")
+            time.sleep(vent)
+
+
+# ---------- kretsbryter ---------- #
+class Kretsbryter:
+    def __init__(self, navn: str, feilgrense: int = FEILGRENSE, pause: float = PAUSE):
+        self.navn = navn
+        self.feilgrense = feilgrense
+        self.pause = pause
+        self._feil_på_rad = 0
+        self._åpnet: float | None = None
+        self._prøver = False
+        self._lås = threading.Lock()
+
+    def slipp_gjennom(self):
+        """Kaster KretsÅpen hvis kilden er stengt; ellers får kallet gå."""
+        with self._lås:
+            if self._åpnet is None:
+                return
+            igjen = self._åpnet + self.pause - time.monotonic()
+            if igjen > 0 or self._prøver:
+                raise KretsÅpen(f"{self.navn} er stengt etter {self._feil_på_rad} feil på rad "
+                                f"(prøver igjen om {max(igjen, 0):.0f} s).")
+            self._prøver = True             # halvåpen: ett prøvekall
+
+    def frigi(self):
+        """Kallet ble aldri sendt (rate-grensen) eller ble avbrutt; et eventuelt prøvekall gis tilbake."""
+        with self._lås:
+            self._prøver = False
+
+    def lykkes(self):
+        with self._lås:
+            if self._åpnet is not None:
+                logging.info(f"Kretsbryter for {self.navn} lukket igjen.")
+            self._feil_på_rad, self._åpnet, self._prøver = 0, None, False
+
+    def feilet(self):
+        with self._lås:
+            self._feil_på_rad += 1
+            if self._prøver or self._feil_på_rad >= self.feilgrense:
+                if self._åpnet is None or self._prøver:
+                    logging.warning(f"Kretsbryter for {self.navn} åpnet i {self.pause:.0f} s.")
+                self._åpnet, self._prøver = time.monotonic(), False
+
+    @property
+    def åpen(self) -> bool:
+        with self._lås:
+            return self._åpnet is not None and time.monotonic() < self._åpnet + self.pause
+
+
+_bøtter: dict[str, TokenBøtte] = {}
+_brytere: dict[str, Kretsbryter] = {}
+_register_lås = threading.Lock()
+
+
+def bøtte_for(nøkkel: str) -> TokenBøtte:
+    with _register_lås:
+        if nøkkel not in _bøtter:
+            if nøkkel.startswith("api:"):
+                rate, kapasitet = API_RATER.get(nøkkel.removeprefix("api:"), DOMENE_RATE)
+            else:
+                rate, kapasitet = DOMENE_RATE
+            _bøtter[nøkkel] = TokenBøtte(rate, kapasitet)
+        return _bøtter[nøkkel]
+
+
+def bryter_for(nøkkel: str) -> Kretsbryter:
+    with _register_lås:
+        if nøkkel not in _brytere:
+            _brytere[nøkkel] = Kretsbryter(nøkkel)
+        return _brytere[nøkkel]
+
+
+# ---------- feilklassifisering ---------- #
+def _statuskode(e: Exception) -> int | None:
+    # requests/httpx: e.response.status_code; Firecrawl/OpenAI: e.status_code;
+    # googleapiclient.HttpError: e.resp.status
+    for kode in (
+        getattr(e, "status_code", None),
+        getattr(getattr(e, "response", None), "status_code", None),
+        getattr(getattr(e, "resp", None), "status", None),
+    ):
+        if kode is not None:
+            try:
+                return int(kode)
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+def er_forbigående(e: Exception) -> bool:
+    if isinstance(e, KretsÅpen):
+        return False
+    if isinstance(e, (FristUtløpt, TimeoutError, ConnectionError,
+                      requests.ConnectionError, requests.Timeout)):
+        return True
+    return _statuskode(e) in FORBIGÅENDE_STATUS
+
+
+def _retry_after(e: Exception) -> float | None:
+    verdi = getattr(getattr(e, "response", None), "headers", {}).get("Retry-After")
+    if not verdi:
+        return None
+    try:
+        return max(0.0, float(verdi))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(verdi).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def backoff(forsøk: int) -> float:
+    """Full jitter: tilfeldig mellom 0 og BASIS_VENT·2^(forsøk-1), maks MAKS_VENT."""
+    return random.uniform(0, min(MAKS_VENT, BASIS_VENT * 2 ** (forsøk - 1)))
+
+
+# ---------- selve kallet ---------- #
+def _med_frist(fn: Callable, args, kwargs, sekunder: float):
+    """
+    Kjører fn i en egen tråd og gir opp etter `sekunder`. Tråden kan ikke
+    avbrytes, men den henger ikke lenger igjen i skrapingen.
+    """
+    utfall: dict = {}
+
+    def kjør():
+        try:
+            utfall["verdi"] = fn(*args, **kwargs)
+        except BaseException as e:            # noqa: BLE001 – sendes videre under
+            utfall["feil"] = e
+
+    tråd = threading.Thread(target=kjør, daemon=True)
+    tråd.start()
+    tråd.join(max(sekunder, 0))
+    if tråd.is_alive():
+        raise FristUtløpt(f"Kallet tok mer enn {sekunder:.1f} s.")
+    if "feil" in utfall:
+        raise utfall["feil"]
+    return utfall["verdi"]
+
+
+def kall(
+    fn: Callable,
+    *args,
+    api: str,
+    domene: str | None = None,
+    frist: float | None = None,
+    forsøk: int = MAKS_FORSØK,
+    ved_nytt_forsøk: Callable[[int, Exception, float], None] | None = None,
+    **kwargs,
+):
+    """
+    Kaller fn(*args, **kwargs) med rate-grense, frist, nye forsøk og
+    kretsbryter. `ved_nytt_forsøk(nr, feil, ventetid)` kalles før hvert nytt
+    forsøk (brukes til kilde_forsøk-hendelsene i run_daily_scrape).
+    """
+    slutt = time.monotonic() + (frist or FRISTER.get(api, FRISTER["http"]))
+    bryter = bryter_for(f"{api}:{domene}" if domene else f"api:{api}")
+    bøtter = [bøtte_for(f"api:{api}")] + ([bøtte_for(domene)] if domene else [])
+
+    bryter.slipp_gjennom()                    # kaster KretsÅpen uten å bruke et token
+    sendt = False
+    try:
+        for nr in range(1, forsøk + 1):
+            for bøtte in bøtter:
+                bøtte.ta(slutt)
+            sendt = True
+            try:
+                verdi = _med_frist(fn, args, kwargs, slutt - time.monotonic())
+            except Exception as e:
+                if not er_forbigående(e) or nr == forsøk:
+                    raise
+                vent = _retry_after(e)
+                vent = min(vent, MAKS_VENT) if vent is not None else backoff(nr)
+                if time.monotonic() + vent >= slutt:
+                    raise
+                logging.info(f"{domene or api}: {e} – forsøk {nr + 1}/{forsøk} om {vent:.1f} s.")
+                if ved_nytt_forsøk:
+                    ved_nytt_forsøk(nr + 1, e, vent)
+                time.sleep(vent)
+                continue
+            bryter.lykkes()
+            return verdi
+    except Exception:
+        # Én feil per kall, når forsøkene er brukt opp – ikke én per forsøk
+        if sendt:
+            bryter.feilet()
+        else:
+            bryter.frigi()
+        raise
+    except BaseException:
+        # KeyboardInterrupt/SystemExit sier ingenting om tjenesten – slipp bare
+        # en eventuell halvåpen prøve, ellers står bryteren fast
+        bryter.frigi()
+        raise
+
+
+# ---------- HTTP-sesjon ---------- #
+_sesjon: requests.Session | None = None
+_sesjon_lås = threading.Lock()
+
+
+def sesjon() -> requests.Session:
+    """
+    Den felles sesjonen. Nye forsøk håndteres av kall(), så adapteren har
+    max_retries=0. requests sender Accept-Encoding: gzip, deflate (og br når
+    brotli er installert) og pakker ut selv. HTTP/2 støttes ikke av requests.
+    """
+    global _sesjon
+    with _sesjon_lås:
+        if _sesjon is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=POOL_PER_VERT, max_retries=0)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers["User-Agent"] = USER_AGENT
+            _sesjon = s
+        return _sesjon
+
+
+def robust_get(url: str, *, domene: str | None = None, frist: float | None = None,
+               ved_nytt_forsøk=None, **kwargs) -> requests.Response:
+    """
+    GET via den felles sesjonen og kall(). 429/5xx regnes som feil og prøves igjen; andre
+    statuskoder (også 304 og 404) gis tilbake som vanlig.
+    """
+    domene = domene or domene_for(url)
+    kwargs.setdefault("timeout", 15)
+
+    def get():
+        res = sesjon().get(url, **kwargs)
+        if res.status_code in FORBIGÅENDE_STATUS:
+            raise ForbigåendeHTTPFeil(f"{res.status_code} fra {url}", response=res)
+        return res
+
+    return kall(get, api="http", domene=domene, frist=frist, ved_nytt_forsøk=ved_nytt_forsøk)
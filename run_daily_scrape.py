@@ -1,17 +1,33 @@
 # fetch_articles_extract.py
 import os
-import json
+import argparse
 import logging
+import signal
+import struct
 from pathlib import Path
 from datetime import date, timedelta
 from urllib.parse import urljoin
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager
+import threading
+import time
 import traceback
 
 from dotenv import load_dotenv
-import dateparser
 from pydantic import BaseModel, Field
 from firecrawl import FirecrawlApp
 
+import storage
+from metrics import Kjøringsmetrikker
+from jobs import Hendelseslogg, Kjøringslås, SkrapingKjørerAllerede, ny_jobb_id
+from scheduler import Planlegger
+from date_parsing import tolk_dato
+from dedup import NærDuplikatIndeks
+from seen_index import INDEX_FILE, SettIndeks, domene_for, kanonisk_url
+from listing_extractor import hent_liste_html, trekk_ut_artikler
+from resilience import KretsÅpen, kall
+from source_fingerprints import last_inn_fingeravtrykk, lagre_fingeravtrykk, sjekk_kilde
+
 # ---------- konfig ---------- #
 logging.basicConfig(
     level=logging.INFO,
@@ -23,14 +39,61 @@ FIRECRAWL_API_KEY = os.getenv("FIRECRAWL_API_KEY")
 
 PROSJEKT_ROT   = Path(__file__).parent
 SOURCES_FILE   = PROSJEKT_ROT / "sources.txt"
-SEEN_URLS_FILE = PROSJEKT_ROT / "seen_urls.json"
-DATABASE_FILE  = PROSJEKT_ROT / "artikkel_database.json"
 
+# Hvor mange kilder som hentes samtidig, totalt og per domene
+MAKS_PARALLELLE = int(os.getenv("SCRAPE_MAKS_PARALLELLE", "8"))
+MAKS_PER_DOMENE = int(os.getenv("SCRAPE_MAKS_PER_DOMENE", "2"))
+# Antall kilder som sendes i samme extract-jobb (1 = én og én som før)
+BATCH_STORRELSE = int(os.getenv("SCRAPE_BATCH_STORRELSE", "5"))
+# Titler med estimert likhet over terskelen mot en artikkel fra de siste
+# DEDUP_DAGER dagene lagres som duplikat av den i stedet for som ny rad
+DEDUP_TERSKEL = float(os.getenv("SCRAPE_DEDUP_TERSKEL", "0.7"))
+DEDUP_DAGER   = int(os.getenv("SCRAPE_DEDUP_DAGER", "14"))
+# Sett til 1 for å kjøre extract på alle kilder selv om listesiden er uendret
+TVING_EXTRACT = os.getenv("SCRAPE_TVING_EXTRACT", "0") == "1"
+
+# Nøkkel er domenet uten "www.". "liste" er en regel for lokal uthenting
+# (se listing_extractor.py); gir den ingen artikler, eller ingen av dem har
+# dato, brukes Firecrawl.
+# Reglene for brødteksten på artikkelsidene ligger i body_extraction.py.
 SOURCE_CONFIG = {
-    "legemiddelverket.no": {"css_selector": ".PageContent_pageContent__3313R"},
-    "dmp.no":              {"css_selector": "main#main-content"}
+    "legemiddelverket.no": {
+        "css_selector": ".PageContent_pageContent__3313R",
+        "liste": {"element": "article", "lenke": "a[href]", "tittel": "h2, h3",
+                  "dato": "time", "dato_attr": "datetime"},
+    },
+    "dmp.no": {
+        "css_selector": "main#main-content",
+        "liste": {"element": "article", "lenke": "a[href]", "tittel": "h2, h3",
+                  "dato": "time", "dato_attr": "datetime"},
+    },
+    "ema.europa.eu": {
+        "liste": {"element": "main article", "lenke": "a[href]", "tittel": "h3, h2",
+                  "dato": "time", "dato_attr": "datetime"},
+    },
 }
 
+# ---------- hendelser ---------- #
+# Settes av main()/kjør_daemon(); Streamlit-siden strømmer filen (se jobs.py),
+# og metrikkene (metrics.py) bygges av de samme hendelsene.
+_hendelser: Hendelseslogg | None = None
+_metrikker: Kjøringsmetrikker | None = None
+
+def hendelse(type_: str, **data):
+    if _hendelser is not None:
+        _hendelser.send(type_, **data)
+    if _metrikker is not None:
+        _metrikker.registrer({"type": type_, **data})
+
+@contextmanager
+def fase(navn: str):
+    """Tar tiden på en fase av kjøringen (last, extract, lagring …)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        hendelse("fase_ferdig", fase=navn, varighet=round(time.perf_counter() - start, 3))
+
 # ---------- schema for extract ---------- #
 class Article(BaseModel):
     title: str
@@ -45,9 +108,33 @@ class ArticleList(BaseModel):
 
 SCHEMA = ArticleList.model_json_schema()
 
+# Ved batch-extract må hver artikkel fortelle hvilken kilde den kom fra
+class BatchArticle(Article):
+    source: str = Field(
+        description="The listing page URL this article was found on, exactly as given in the input"
+    )
+
+class BatchArticleList(BaseModel):
+    articles: list[BatchArticle]
+
+BATCH_SCHEMA = BatchArticleList.model_json_schema()
+
 # ---------- Firecrawl-oppsett ---------- #
 fc = FirecrawlApp(api_key=FIRECRAWL_API_KEY)
 
+def _artikler_fra_respons(resp) -> list[dict]:
+    # v2.7+: ExtractResponse har .data; eldre SDK gir dict – håndter begge
+    raw = resp.data if hasattr(resp, "data") else resp.get("data", {})
+    sider = raw if isinstance(raw, list) else [raw]
+    return [art for side in sider if side for art in side.get("articles", [])]
+
+def _meld_forsøk(urls: list[str]):
+    """Callback til resilience.kall – teller nye forsøk per kilde i metrikkene."""
+    def meld(nr: int, feil: Exception, vent: float):
+        for url in urls:
+            hendelse("kilde_forsøk", kilde=url, forsøk=nr, feil=str(feil), vent=round(vent, 1))
+    return meld
+
 def extract_with_firecrawl(url: str, css_selector: str | None = None) -> list[dict]:
     """
     Kjører /extract på én URL og returnerer listen av artikler (dicts).
@@ -64,16 +151,255 @@ def extract_with_firecrawl(url: str, css_selector: str | None = None) -> list[di
         )
     prompt = " ".join(prompt_parts)
 
-    resp = fc.extract(
+    resp = kall(
+        fc.extract,
+        api="firecrawl",
+        domene=domene_for(url),
+        ved_nytt_forsøk=_meld_forsøk([url]),
         urls=[url],
         prompt=prompt,
         schema=SCHEMA,
     )
+    return _artikler_fra_respons(resp)
 
-    # v2.7+: ExtractResponse har .data; eldre SDK gir dict – håndter begge
-    raw = resp.data if hasattr(resp, "data") else resp.get("data", {})
+def extract_batch_with_firecrawl(urls: list[str]) -> dict[str, list[dict]] | None:
+    """
+    Kjører /extract på flere kilder i én jobb og fordeler artiklene tilbake
+    på kilden de kom fra. Returnerer None hvis noen artikler ikke kan knyttes
+    til en kilde – da må kallet gjøres én og én.
+    """
+    prompt_parts = [
+        "Return an object with key 'articles'.",
+        "The input consists of several news listing pages.",
+        "For every news article on each page include:",
+        "title, canonical URL (url), published date in ISO format if you can find it,",
+        "and source: the listing page URL the article was found on, copied exactly from the input.",
+    ]
+    for url in urls:
+        css = _css_for(url)
+        if css:
+            prompt_parts.append(
+                f"On {url}, only look inside the HTML element that matches the CSS selector '{css}'."
+            )
+
+    resp = kall(
+        fc.extract,
+        api="firecrawl",
+        forsøk=2,                   # faller uansett tilbake til én og én
+        ved_nytt_forsøk=_meld_forsøk(urls),
+        urls=urls,
+        prompt=" ".join(prompt_parts),
+        schema=BATCH_SCHEMA,
+    )
+    return fordel_på_kilder(urls, _artikler_fra_respons(resp))
 
-    return raw.get("articles", [])
+def _normaliser_kilde(url: str) -> str:
+    return url.strip().lower().rstrip("/")
+
+def fordel_på_kilder(urls: list[str], artikler: list[dict]) -> dict[str, list[dict]] | None:
+    """
+    Knytter hver artikkel til kilden i `urls`: først via feltet 'source',
+    deretter via domenet til artikkel-URL-en hvis bare én kilde i gruppen
+    har det domenet. Relative artikkel-URL-er uten gyldig 'source' kan ikke
+    plasseres, og da gis det opp (None).
+    """
+    per_kilde: dict[str, list[dict]] = {url: [] for url in urls}
+    etter_navn = {_normaliser_kilde(url): url for url in urls}
+    etter_domene: dict[str, list[str]] = {}
+    for url in urls:
+        etter_domene.setdefault(domene_for(url), []).append(url)
+
+    for art in artikler:
+        kilde = etter_navn.get(_normaliser_kilde(art.pop("source", None) or ""))
+        art_url = art.get("url") or ""
+        if kilde is None and art_url.startswith("http"):
+            kandidater = etter_domene.get(domene_for(art_url), [])
+            if len(kandidater) == 1:
+                kilde = kandidater[0]
+        if kilde is None:
+            if not art_url:
+                continue            # hoppes uansett over i main()
+            return None
+        per_kilde[kilde].append(art)
+    return per_kilde
+
+# ---------- parallell henting ---------- #
+_domene_semaforer: dict[str, threading.BoundedSemaphore] = {}
+_domene_lås = threading.Lock()
+
+def _semafor_for(domene: str) -> threading.BoundedSemaphore:
+    with _domene_lås:
+        if domene not in _domene_semaforer:
+            _domene_semaforer[domene] = threading.BoundedSemaphore(MAKS_PER_DOMENE)
+        return _domene_semaforer[domene]
+
+def _kilde_config(url: str) -> dict:
+    return SOURCE_CONFIG.get(domene_for(url), {})
+
+def _css_for(url: str) -> str | None:
+    return _kilde_config(url).get("css_selector")
+
+def hent_lokalt(url: str, html: str | None = None) -> list[dict] | None:
+    """
+    Kjører den lokale listeregelen for kilden. None betyr at kilden ikke
+    har regel, eller at regelen ikke ga noe – da må Firecrawl brukes.
+    """
+    regel = _kilde_config(url).get("liste")
+    if not regel:
+        return None
+    start = time.perf_counter()
+    try:
+        if html is None:
+            with _semafor_for(domene_for(url)):
+                html = hent_liste_html(url, ved_nytt_forsøk=_meld_forsøk([url]))
+        artikler = trekk_ut_artikler(html, regel, _css_for(url))
+    except Exception as e:
+        logging.warning(f"Lokal uthenting feilet for {url}: {e} – bruker Firecrawl.")
+        return None
+    if not artikler:
+        logging.info(f"Lokal regel ga ingen artikler for {url} – bruker Firecrawl.")
+        return None
+    if not any(a.get("published") for a in artikler):
+        # Uten dato regnes alle som gamle og merkes som sett – da ville nye saker gått tapt
+        logging.info(f"Lokal regel fant ingen datoer for {url} – bruker Firecrawl.")
+        return None
+    hendelse("kilde_hentet", kilde=url, metode="lokal", artikler=len(artikler),
+             varighet=round(time.perf_counter() - start, 3))
+    return artikler
+
+def hent_batch(urls: list[str]) -> dict[str, list[dict] | None]:
+    """
+    Henter en gruppe kilder i én extract-jobb, innenfor per-domene-grensen.
+    Feiler jobben, eller kan ikke artiklene knyttes til kilde, hentes kildene
+    én og én. None betyr at kilden feilet.
+    """
+    with ExitStack() as stack:
+        # Fast rekkefølge på låsene så to batcher ikke kan vente på hverandre
+        for domene in sorted({domene_for(url) for url in urls}):
+            stack.enter_context(_semafor_for(domene))
+
+        if len(urls) > 1:
+            start = time.perf_counter()
+            try:
+                fordelt = extract_batch_with_firecrawl(urls)
+                if fordelt is not None:
+                    varighet = round(time.perf_counter() - start, 3)
+                    for url, artikler in fordelt.items():
+                        hendelse("kilde_hentet", kilde=url, metode="batch",
+                                 artikler=len(artikler), varighet=varighet)
+                    return fordelt
+                logging.warning(f"Klarte ikke knytte artikler til kilde i batch {urls} – henter én og én.")
+            except Exception as e:
+                logging.warning(f"Batch-extract feilet for {urls}: {e} – henter én og én.")
+
+        resultat: dict[str, list[dict] | None] = {}
+        for url in urls:
+            start = time.perf_counter()
+            try:
+                resultat[url] = extract_with_firecrawl(url, _css_for(url))
+                hendelse("kilde_hentet", kilde=url, metode="firecrawl", artikler=len(resultat[url]),
+                         varighet=round(time.perf_counter() - start, 3))
+            except KretsÅpen as e:
+                logging.warning(f"Hopper over {url}: {e}")
+                hendelse("kilde_feilet", kilde=url, feil=str(e), varighet=0.0)
+                resultat[url] = None
+            except Exception as e:
+                logging.error(f"Feil på {url}: {e}")
+                logging.error(traceback.format_exc())
+                hendelse("kilde_feilet", kilde=url, feil=str(e),
+                         varighet=round(time.perf_counter() - start, 3))
+                resultat[url] = None
+        return resultat
+
+def hent_alle_kilder(
+    kilder: list[str], html_per_kilde: dict[str, str] | None = None
+) -> list[tuple[str, list[dict] | None]]:
+    """
+    Henter alle kilder parallelt. Kilder uten lokal listeregel sendes til
+    Firecrawl i grupper på BATCH_STORRELSE med en gang; kilder med regel
+    tolkes lokalt samtidig (med HTML fra endringssjekken når vi har den), og
+    de der regelen ikke treffer, sendes til Firecrawl etter hvert (maks
+    MAKS_PARALLELLE jobber samtidig). Resultatet har samme rekkefølge som
+    `kilder`, uansett hvilken jobb som blir ferdig først; None betyr at
+    kilden feilet.
+    """
+    html_per_kilde = html_per_kilde or {}
+    fordelt: dict[str, list[dict] | None] = {}
+    for url in kilder:
+        hendelse("kilde_startet", kilde=url)
+    n = max(1, BATCH_STORRELSE)
+    with ThreadPoolExecutor(max_workers=max(1, MAKS_PARALLELLE)) as pool:
+        ventende: dict = {
+            pool.submit(hent_lokalt, url, html_per_kilde.get(url)): url
+            for url in kilder if _kilde_config(url).get("liste")
+        }
+        lokale_igjen, lokalt_hentet = len(ventende), 0
+        uten_regel = [url for url in kilder if not _kilde_config(url).get("liste")]
+        for i in range(0, len(uten_regel), n):
+            ventende[pool.submit(hent_batch, uten_regel[i:i + n])] = None
+
+        # wait() i stedet for as_completed(): bom fra de lokale reglene legges til underveis
+        bom: list[str] = []
+        while ventende:
+            ferdige, _ = wait(ventende, return_when=FIRST_COMPLETED)
+            for fut in ferdige:
+                url = ventende.pop(fut)
+                if url is None:
+                    fordelt.update(fut.result())
+                    continue
+                lokale_igjen -= 1
+                artikler = fut.result()
+                if artikler is not None:
+                    fordelt[url] = artikler
+                    lokalt_hentet += 1
+                else:
+                    bom.append(url)
+            while len(bom) >= n or (bom and not lokale_igjen):
+                ventende[pool.submit(hent_batch, bom[:n])] = None
+                bom = bom[n:]
+    if lokalt_hentet:
+        logging.info(f"{lokalt_hentet} kilder hentet lokalt uten Firecrawl.")
+    return [(url, fordelt.get(url)) for url in kilder]
+
+# ---------- endringssjekk ---------- #
+def sjekk_endringer(
+    kilder: list[str], fingeravtrykk: dict[str, dict]
+) -> tuple[list[str], dict[str, dict], dict[str, str]]:
+    """
+    Kjører betinget GET/innholds-hash på alle kilder parallelt.
+    Returnerer (kilder som må hentes, nye fingeravtrykk per endret kilde,
+    HTML per endret kilde – gjenbrukes av de lokale listereglene).
+    Kilder som ikke kan sjekkes regnes som endret.
+    """
+    if TVING_EXTRACT:
+        return list(kilder), {}, {}
+
+    def sjekk(url: str):
+        with _semafor_for(domene_for(url)):
+            return sjekk_kilde(url, _css_for(url), fingeravtrykk.get(url),
+                               ved_nytt_forsøk=_meld_forsøk([url]))
+
+    endrede: list[str] = []
+    nye: dict[str, dict] = {}
+    html_per_kilde: dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, MAKS_PARALLELLE)) as pool:
+        futures = [pool.submit(sjekk, url) for url in kilder]
+        for url, fut in zip(kilder, futures):
+            try:
+                endret, avtrykk, html = fut.result()
+            except Exception as e:
+                logging.info(f"Endringssjekk feilet for {url} ({e}) – kjører extract.")
+                endrede.append(url)
+                continue
+            if endret:
+                endrede.append(url)
+                nye[url] = avtrykk
+                if html is not None:
+                    html_per_kilde[url] = html
+            else:
+                logging.info(f"Uendret siden sist: {url}")
+                hendelse("kilde_hoppet_over", kilde=url, grunn="uendret")
+    return endrede, nye, html_per_kilde
 
 # ---------- hjelpe-funksjoner ---------- #
 def last_inn_kilder() -> list[str]:
@@ -82,98 +408,256 @@ def last_inn_kilder() -> list[str]:
         return []
     return [l.strip() for l in SOURCES_FILE.read_text().splitlines() if l.strip()]
 
-def last_inn_database() -> list[dict]:
-    if DATABASE_FILE.exists():
-        try:
-            return json.loads(DATABASE_FILE.read_text())
-        except json.JSONDecodeError:
-            logging.warning("Kunne ikke lese artikkel-JSON – starter tom.")
-    return []
-
-def last_inn_sette_urls() -> set[str]:
-    if SEEN_URLS_FILE.exists():
+def åpne_sett_indeks(conn) -> SettIndeks:
+    """Åpner sett-URL-indeksen; mangler eller er den ødelagt, bygges den fra SQLite."""
+    if INDEX_FILE.exists():
         try:
-            return set(json.loads(SEEN_URLS_FILE.read_text()))
-        except json.JSONDecodeError:
-            logging.warning("Kunne ikke lese seen_urls – starter tom.")
-    return set()
-
-def lagre_data(db: list[dict], seen: set[str]):
-    DATABASE_FILE.write_text(json.dumps(db, ensure_ascii=False, indent=2))
-    SEEN_URLS_FILE.write_text(json.dumps(list(seen), indent=2))
-    logging.info(f"Lagret {len(db)} artikler og {len(seen)} sett-URL-er.")
+            return SettIndeks()
+        except (ValueError, struct.error) as e:
+            logging.warning(f"{INDEX_FILE.name} er ødelagt ({e}) – bygger den på nytt.")
+            INDEX_FILE.unlink()
+    indeks = SettIndeks()
+    indeks.legg_til(storage.alle_sette_urls(conn))
+    indeks.komprimer()
+    logging.info(f"Bygde {INDEX_FILE.name} med {len(indeks)} URL-er.")
+    return indeks
+
+def bygg_duplikatindeks(conn) -> NærDuplikatIndeks:
+    """LSH-indeks over titlene i det nyeste arkivet."""
+    indeks = NærDuplikatIndeks(terskel=DEDUP_TERSKEL)
+    fra = (date.today() - timedelta(days=DEDUP_DAGER)).isoformat()
+    for art in storage.hent_artikler_siden(conn, fra):
+        indeks.legg_til(art["url"], art.get("tittel") or "")
+    return indeks
+
+def lagre_data(
+    conn,
+    indeks: SettIndeks,
+    nye_artikler: list[dict],
+    nye_urls: set[str],
+    duplikater: list[tuple[dict, str]] = (),
+):
+    """Skriver bare det som er nytt denne kjøringen."""
+    with conn:
+        n_art = storage.legg_til_artikler(conn, nye_artikler)
+        n_dup = storage.legg_til_duplikater(conn, list(duplikater))
+        storage.legg_til_sette_urls(conn, nye_urls)
+    n_url = indeks.legg_til(nye_urls)
+    logging.info(f"Lagret {n_art} nye artikler, {n_dup} nær-duplikater og {n_url} nye sett-URL-er "
+                 f"(totalt {storage.antall_artikler(conn)} artikler).")
 
 def er_nylig_artikkel(dato_str: str | None) -> bool:
-    if not dato_str:
-        return False
-    try:
-        parsed = dateparser.parse(dato_str, languages=["nb", "en"])
-    except ValueError:
-        return False
+    parsed = tolk_dato(dato_str)
     if not parsed:
         return False
-    return parsed.date() >= (date.today() - timedelta(days=3))
+    return parsed >= (date.today() - timedelta(days=3))
 
 # ---------- hoved-løp ---------- #
-def main():
-    if not FIRECRAWL_API_KEY:
-        logging.error("FIRECRAWL_API_KEY mangler i .env – avslutter.")
-        return
-
-    kilder       = last_inn_kilder()
-    database     = last_inn_database()
-    sette_urls   = last_inn_sette_urls()
+def kjør_runde(
+    kilder: list[str],
+    conn,
+    sette_urls: SettIndeks,
+    dup_indeks: NærDuplikatIndeks,
+    avtrykk: dict[str, dict],
+) -> dict[str, dict]:
+    """
+    Én skrape-runde over `kilder`. Tilstanden (database, indekser,
+    fingeravtrykk) sendes inn slik at daemon-modus kan holde den varm.
+    Returnerer per kilde: {"endret": bool, "nye": int, "feilet": bool}.
+    """
+    nye_artikler: list[dict] = []
+    nye_urls:     set[str]   = set()
+    duplikater:   list[tuple[dict, str]] = []
     funn_total   = 0
     i_dag_iso    = date.today().isoformat()
-
-    logging.info(f"Starter. DB={len(database)} artikler, "
-                 f"{len(sette_urls)} tidligere URL-er.")
-
-    for url in kilder:
-        logging.info(f"--- Kilde: {url}")
-        domain = url.split("//")[-1].split("/")[0]
-        css    = SOURCE_CONFIG.get(domain, {}).get("css_selector")
-
-        try:
-            artikler = extract_with_firecrawl(url, css)
+    resultat     = {url: {"endret": False, "nye": 0, "feilet": False} for url in kilder}
+    hendelse("runde_startet", kilder=len(kilder))
+
+    # Hopp over kilder der listesiden ikke har endret seg siden forrige kjøring
+    with fase("endringssjekk"):
+        endrede, nye_avtrykk, html_per_kilde = sjekk_endringer(kilder, avtrykk)
+    hoppet_over = len(kilder) - len(endrede)
+
+    with fase("extract"):
+        hentet = hent_alle_kilder(endrede, html_per_kilde)
+
+    # Slå sammen i fast rekkefølge (samme som sources.txt)
+    dato_tid = 0.0
+    with fase("filtrering"):
+        for url, artikler in hentet:
+            logging.info(f"--- Kilde: {url}")
+            resultat[url]["endret"] = True
+            if artikler is None:
+                resultat[url]["feilet"] = True
+                continue
+            # Fingeravtrykket lagres først når extract faktisk har gått bra
+            if url in nye_avtrykk:
+                avtrykk[url] = nye_avtrykk[url]
             if not artikler:
                 logging.info("  (Ingen artikler funnet)")
+                hendelse("kilde_ferdig", kilde=url, artikler=0, nye=0)
                 continue
 
+            tellere = {"gamle": 0, "sett": 0, "mangler_url": 0, "duplikater": 0}
             for art in artikler:
                 art_url = art.get("url")
                 if not art_url:
+                    tellere["mangler_url"] += 1
                     continue
                 if not art_url.startswith("http"):
                     art_url = urljoin(url, art_url)
                     art["url"] = art_url
 
-                if art_url in sette_urls:
+                # Sammenlign normaliserte URL-er (uten sporingsparametre, fragment osv.)
+                kanonisk = kanonisk_url(art_url)
+                if kanonisk in nye_urls or art_url in sette_urls:
+                    tellere["sett"] += 1
                     continue
 
-                if er_nylig_artikkel(art.get("published")):
+                t0 = time.perf_counter()
+                nylig = er_nylig_artikkel(art.get("published"))
+                dato_tid += time.perf_counter() - t0
+
+                if nylig:
                     # 🔄   Endrer feltnavn til de norsk-språklige som Streamlit-appen forventer
                     art["tittel"]       = art.pop("title", "Mangler tittel")
                     art["dato"]         = art.pop("published", None)
                     art["funnet_dato"]  = i_dag_iso          # beholder det gamle navnet
 
-                    database.append(art)
-                    funn_total += 1
-                    logging.info(f"  ✅ Ny artikkel: {art['tittel']}")
+                    # Samme sak fra en annen kilde → legg i klyngen til den første
+                    hoved_url = dup_indeks.finn(art["tittel"])
+                    if hoved_url:
+                        duplikater.append((art, hoved_url))
+                        tellere["duplikater"] += 1
+                        logging.info(f"  ≈ Nær-duplikat av {hoved_url}: {art['tittel']}")
+                    else:
+                        dup_indeks.legg_til(art_url, art["tittel"])
+                        nye_artikler.append(art)
+                        funn_total += 1
+                        resultat[url]["nye"] += 1
+                        logging.info(f"  ✅ Ny artikkel: {art['tittel']}")
 
                 else:
+                    tellere["gamle"] += 1
                     logging.info(f"  -> Gammel artikkel ({art.get('published')})")
 
-                sette_urls.add(art_url)
+                nye_urls.add(kanonisk)
 
-        except Exception as e:
-            logging.error(f"Feil på {url}: {e}")
-            logging.error(traceback.format_exc())
+            hendelse("kilde_ferdig", kilde=url, artikler=len(artikler), nye=resultat[url]["nye"], **tellere)
+    hendelse("fase_ferdig", fase="datotolkning", varighet=round(dato_tid, 3))
 
     logging.info("--- Ferdig ---")
-    database.sort(key=lambda x: x.get("found_date", ""), reverse=True)
-    lagre_data(database, sette_urls)
+    with fase("lagring"):
+        lagre_data(conn, sette_urls, nye_artikler, nye_urls, duplikater)
+        lagre_fingeravtrykk(avtrykk)
+    logging.info(f"Hoppet over {hoppet_over} av {len(kilder)} extract-kall (uendrede kilder).")
     logging.info(f"Totalt nye artikler denne kjøringen: {funn_total}")
+    hendelse("runde_ferdig", nye=funn_total, hoppet_over=hoppet_over, kilder=len(kilder))
+    return resultat
+
+@contextmanager
+def _skrapejobb(jobb_id: str, modus: str, lås_fd: int | None = None):
+    """
+    Tar kjøringslåsen (eller overtar den fra jobs.start_jobb via `lås_fd`)
+    og skriver hendelser og metrikker for jobben så lenge den varer.
+    Metrikkrapportene skrives etter hver runde (se metrics.py).
+    """
+    global _hendelser, _metrikker
+    with Kjøringslås(jobb_id, modus, fd=lås_fd):
+        _hendelser = Hendelseslogg(jobb_id)
+        _metrikker = Kjøringsmetrikker(jobb_id)
+        hendelse("jobb_startet", jobb_id=jobb_id, modus=modus)
+        try:
+            yield
+            hendelse("jobb_ferdig")
+        except Exception as e:
+            hendelse("jobb_feilet", feil=str(e))
+            raise
+        finally:
+            _hendelser.lukk()
+            _hendelser = _metrikker = None
+
+def main(jobb_id: str | None = None, lås_fd: int | None = None):
+    if not FIRECRAWL_API_KEY:
+        logging.error("FIRECRAWL_API_KEY mangler i .env – avslutter.")
+        return
+
+    try:
+        with _skrapejobb(jobb_id or ny_jobb_id(), "engang", lås_fd):
+            with fase("last"):
+                kilder     = last_inn_kilder()
+                conn       = storage.koble_til()
+                sette_urls = åpne_sett_indeks(conn)
+                dup_indeks = bygg_duplikatindeks(conn)
+                avtrykk    = last_inn_fingeravtrykk()
+
+            try:
+                logging.info(f"Starter. DB={storage.antall_artikler(conn)} artikler, "
+                             f"{len(sette_urls)} tidligere URL-er.")
+
+                kjør_runde(kilder, conn, sette_urls, dup_indeks, avtrykk)
+            finally:
+                sette_urls.lukk()
+                conn.close()
+    except SkrapingKjørerAllerede as e:
+        logging.error(f"{e} Avslutter.")
+
+def kjør_daemon(jobb_id: str | None = None):
+    """
+    Langlivet modus: database, sett-URL-indeks, duplikatindeks og
+    Firecrawl-klient holdes varme, og hver kilde sjekkes etter sin egen
+    adaptive plan (se scheduler.py). Stoppes med Ctrl+C / SIGTERM.
+    Daemonen holder kjøringslåsen, så manuelle kjøringer avvises mens den går.
+    """
+    if not FIRECRAWL_API_KEY:
+        logging.error("FIRECRAWL_API_KEY mangler i .env – avslutter.")
+        return
+
+    stopp = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopp.set())
+
+    try:
+        with _skrapejobb(jobb_id or ny_jobb_id(), "daemon"):
+            with fase("last"):
+                conn       = storage.koble_til()
+                sette_urls = åpne_sett_indeks(conn)
+                avtrykk    = last_inn_fingeravtrykk()
+                planlegger = Planlegger.last_inn()
+                dup_dag, dup_indeks = date.today(), bygg_duplikatindeks(conn)
+
+            logging.info(f"Daemon startet. DB={storage.antall_artikler(conn)} artikler, "
+                         f"{len(sette_urls)} tidligere URL-er.")
+            try:
+                while not stopp.is_set():
+                    # sources.txt leses på nytt hver gang, så endringer fra «Lenker»-siden tas med
+                    kilder = last_inn_kilder()
+                    if date.today() != dup_dag:
+                        dup_dag, dup_indeks = date.today(), bygg_duplikatindeks(conn)
+
+                    forfalte = planlegger.forfalte(kilder)
+                    if forfalte:
+                        logging.info(f"Sjekker {len(forfalte)} av {len(kilder)} kilder.")
+                        _hendelser.roter()          # hendelsesfilen holder bare denne runden
+                        for url, r in kjør_runde(forfalte, conn, sette_urls, dup_indeks, avtrykk).items():
+                            planlegger.oppdater(url, r["nye"], r["endret"], r["feilet"])
+                        planlegger.lagre()
+
+                    stopp.wait(min(planlegger.sekunder_til_neste(kilder), 300))
+            except KeyboardInterrupt:
+                pass
+            finally:
+                planlegger.lagre()
+                sette_urls.lukk()
+                conn.close()
+                logging.info("Daemon stoppet.")
+    except SkrapingKjørerAllerede as e:
+        logging.error(f"{e} Avslutter.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Skrap nyhetskildene i sources.txt.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="kjør kontinuerlig med adaptiv polling per kilde")
+    parser.add_argument("--jobb-id", help="ID for hendelsesloggen (settes av jobs.start_jobb)")
+    parser.add_argument("--lås-fd", type=int, help="arvet, allerede tatt kjøringslås (settes av jobs.start_jobb)")
+    args = parser.parse_args()
+    kjør_daemon(args.jobb_id) if args.daemon else main(args.jobb_id, args.lås_fd)
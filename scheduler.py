@@ -0,0 +1,115 @@
+# scheduler.py
+"""
+Adaptiv polling-plan for daemon-modus (`python run_daily_scrape.py --daemon`).
+
+For hver kilde følges observert publiseringsrate (nye artikler per time,
+glattet med EWMA) og når den sist endret seg. Intervallet settes slik at en
+kilde sjekkes omtrent to ganger per forventet ny artikkel, innenfor
+[MIN_INTERVALL, MAKS_INTERVALL], med litt jitter så kildene ikke klumper seg.
+Et globalt budsjett begrenser antall kildesjekker per time.
+"""
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from pathlib import Path
+
+TILSTAND_FILE = Path(__file__).parent / "planlegger_tilstand.json"
+
+MIN_INTERVALL   = int(os.getenv("DAEMON_MIN_INTERVALL", str(15 * 60)))       # sekunder
+MAKS_INTERVALL  = int(os.getenv("DAEMON_MAKS_INTERVALL", str(24 * 3600)))
+START_INTERVALL = int(os.getenv("DAEMON_START_INTERVALL", str(2 * 3600)))
+BUDSJETT_PER_TIME = int(os.getenv("DAEMON_BUDSJETT_PER_TIME", "30"))          # kildesjekker
+JITTER = 0.1
+ALFA   = 0.3        # vekt på siste observasjon i publiseringsraten
+
+
+class Planlegger:
+    def __init__(self, tilstand: dict[str, dict] | None = None, fil: Path = TILSTAND_FILE):
+        self.fil = fil
+        self.tilstand: dict[str, dict] = tilstand or {}
+        self._sjekker: deque[float] = deque()       # tidspunkter for sjekker siste time
+
+    @classmethod
+    def last_inn(cls, fil: Path = TILSTAND_FILE) -> "Planlegger":
+        if fil.exists():
+            try:
+                return cls(json.loads(fil.read_text(encoding="utf-8")), fil)
+            except json.JSONDecodeError:
+                logging.warning("Kunne ikke lese planleggertilstand – starter tom.")
+        return cls(fil=fil)
+
+    def lagre(self):
+        # Skrives hver runde; ny fil + rename så et avbrudd ikke etterlater halv JSON
+        tmp = self.fil.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.tilstand, indent=2), encoding="utf-8")
+        tmp.replace(self.fil)
+
+    def _kilde(self, url: str, nå: float) -> dict:
+        if url not in self.tilstand:
+            # Nye kilder sjekkes med en gang, spredt litt utover
+            self.tilstand[url] = {
+                "intervall": START_INTERVALL,
+                "neste": nå + random.uniform(0, 60),
+                "rate": 0.0,
+                "sist_sjekket": None,
+                "siste_endring": None,
+            }
+        return self.tilstand[url]
+
+    def _gjenstående_budsjett(self, nå: float) -> int:
+        while self._sjekker and self._sjekker[0] < nå - 3600:
+            self._sjekker.popleft()
+        return max(0, BUDSJETT_PER_TIME - len(self._sjekker))
+
+    def forfalte(self, kilder: list[str], nå: float | None = None) -> list[str]:
+        """Kilder som skal sjekkes nå – mest forsinket først, innenfor budsjettet."""
+        nå = nå or time.time()
+        klare = sorted(
+            (k for k in kilder if self._kilde(k, nå)["neste"] <= nå),
+            key=lambda k: self.tilstand[k]["neste"],
+        )
+        valgt = klare[:self._gjenstående_budsjett(nå)]
+        if len(valgt) < len(klare):
+            logging.info(f"Budsjett nådd – {len(klare) - len(valgt)} kilder venter.")
+        self._sjekker.extend(nå for _ in valgt)
+        return valgt
+
+    def sekunder_til_neste(self, kilder: list[str], nå: float | None = None) -> float:
+        nå = nå or time.time()
+        neste = min((self._kilde(k, nå)["neste"] for k in kilder), default=nå + 60)
+        if not self._gjenstående_budsjett(nå) and self._sjekker:
+            neste = max(neste, self._sjekker[0] + 3600)
+        return max(0.0, neste - nå)
+
+    def oppdater(self, url: str, nye: int, endret: bool, feilet: bool, nå: float | None = None):
+        """Justerer intervallet etter hva sjekken fant."""
+        nå = nå or time.time()
+        s = self._kilde(url, nå)
+
+        if feilet:
+            # Ikke lær noe av en feil – prøv igjen etter vanlig intervall
+            s["neste"] = nå + s["intervall"] * random.uniform(1 - JITTER, 1 + JITTER)
+            return
+
+        if s["sist_sjekket"]:
+            timer = max((nå - s["sist_sjekket"]) / 3600, 1 / 60)
+            s["rate"] = ALFA * (nye / timer) + (1 - ALFA) * s["rate"]
+        elif nye:
+            s["rate"] = nye / (START_INTERVALL / 3600)
+        s["sist_sjekket"] = nå
+        if endret:
+            s["siste_endring"] = nå
+
+        # To sjekker per forventet ny artikkel; rolige kilder glir sakte mot maks,
+        # men ikke mens listesiden nylig har endret seg (halve tiden siden endringen)
+        if s["rate"] > 1e-3:
+            mål = 3600 / (2 * s["rate"])
+        elif s["siste_endring"]:
+            mål = min(s["intervall"] * 1.5, max(s["intervall"], (nå - s["siste_endring"]) / 2))
+        else:
+            mål = s["intervall"] * 1.5
+        s["intervall"] = min(MAKS_INTERVALL, max(MIN_INTERVALL, mål))
+        s["neste"] = nå + s["intervall"] * random.uniform(1 - JITTER, 1 + JITTER)
@@ -0,0 +1,187 @@
+# seen_index.py
+"""
+Kompakt indeks over sette URL-er.
+
+Hver URL normaliseres (https, uten www., fragment, sporingsparametre og
+avsluttende skråstrek) og lagres som en 64-bits hash. Filen består av et
+header, en sortert del som memory-mappes (binærsøk, ingen innlesing ved
+oppstart) og en usortert hale med nye nøkler som bare legges til på slutten.
+Når halen blir stor skrives filen om sortert (komprimering).
+
+8 byte per URL: én million URL-er tar 8 MB, mot ~100 MB som Python-set.
+"""
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+INDEX_FILE = Path(__file__).parent / "seen_urls.idx"
+
+_MAGI   = b"HTSEEN1\0"
+_HEADER = struct.Struct("<8sQ")       # magi + antall sorterte nøkler
+_NØKKEL = struct.Struct("<Q")
+
+# Halen komprimeres når den passerer dette, eller 10 % av den sorterte delen
+_MAKS_HALE = 4096
+
+_SPORINGS_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "_ga", "_hsenc", "_hsmi", "ref"}
+
+
+def kanonisk_url(url: str) -> str:
+    """Normaliserer en URL slik at varianter av samme side blir like."""
+    deler = urlsplit(url.strip())
+    vert = (deler.hostname or "").lower()
+    if vert.startswith("www."):
+        vert = vert[4:]
+    if deler.port and deler.port not in (80, 443):
+        vert = f"{vert}:{deler.port}"
+
+    sti = deler.path or "/"
+    if len(sti) > 1:
+        sti = sti.rstrip("/")
+
+    params = sorted(
+        (k, v) for k, v in parse_qsl(deler.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _SPORINGS_PARAMS
+    )
+    return urlunsplit(("https", vert, sti, urlencode(params), ""))
+
+
+def domene_for(url: str) -> str:
+    """Vertsnavn uten 'www.' – nøkkelen for kildeconfig, regler og per-domene-grenser."""
+    vert = url.split("//")[-1].split("/")[0].lower()
+    return vert[4:] if vert.startswith("www.") else vert
+
+
+def url_nøkkel(url: str) -> int:
+    """64-bits nøkkel for den kanoniske URL-en."""
+    digest = hashlib.blake2b(kanonisk_url(url).encode("utf-8"), digest_size=8).digest()
+    return _NØKKEL.unpack(digest)[0]
+
+
+class _Bloom:
+    """Enkelt Bloom-filter; bitposisjonene hentes rett fra den 64-bits nøkkelen."""
+
+    def __init__(self, antall: int, bits_per_nøkkel: int = 10):
+        self.m = max(1024, antall * bits_per_nøkkel)
+        self.bits = bytearray(self.m // 8 + 1)
+
+    def _posisjoner(self, nøkkel: int):
+        h1, h2 = nøkkel & 0xFFFFFFFF, (nøkkel >> 32) | 1
+        return ((h1 + i * h2) % self.m for i in range(7))
+
+    def legg_til(self, nøkkel: int):
+        for p in self._posisjoner(nøkkel):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def kanskje(self, nøkkel: int) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._posisjoner(nøkkel))
+
+
+class SettIndeks:
+    """
+    Sett-URL-indeks lagret i `fil`. `url in indeks` slår opp den normaliserte
+    URL-en; `legg_til()` skriver nye nøkler rett til slutten av filen.
+    Med bloom=True bygges et Bloom-filter i minnet ved åpning – nyttig for
+    langlivede prosesser med mange oppslag, ikke for korte kjøringer.
+    """
+
+    def __init__(self, fil: Path = INDEX_FILE, bloom: bool = False):
+        self.fil = Path(fil)
+        self._bruk_bloom = bloom
+        self._mm = None
+        self._sortert = memoryview(b"").cast("Q")
+        self._hale: set[int] = set()
+        self._bloom = None
+        if not self.fil.exists():
+            self._skriv_fil([])
+        self._åpne()
+
+    # ---------- fil ---------- #
+    def _skriv_fil(self, sorterte: list[int] | array):
+        tmp = self.fil.with_suffix(".idx.tmp")
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_MAGI, len(sorterte)))
+            array("Q", sorterte).tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.fil)
+
+    def _åpne(self):
+        self._lukk_mmap()
+        størrelse = self.fil.stat().st_size
+        with open(self.fil, "rb") as f:
+            magi, n_sortert = _HEADER.unpack(f.read(_HEADER.size))
+            if magi != _MAGI:
+                raise ValueError(f"{self.fil} er ikke en sett-URL-indeks")
+            # Halen: alt etter den sorterte delen (en avkuttet siste nøkkel ignoreres)
+            start = _HEADER.size + 8 * n_sortert
+            f.seek(start)
+            hale = f.read(((størrelse - start) // 8) * 8)
+            self._hale = set(array("Q", hale))
+            if n_sortert:
+                self._mm = mmap.mmap(f.fileno(), start, access=mmap.ACCESS_READ)
+                self._sortert = memoryview(self._mm)[_HEADER.size:start].cast("Q")
+
+        if self._bruk_bloom:
+            self._bloom = _Bloom(len(self))
+            for nøkkel in self._sortert:
+                self._bloom.legg_til(nøkkel)
+            for nøkkel in self._hale:
+                self._bloom.legg_til(nøkkel)
+
+    def _lukk_mmap(self):
+        self._sortert.release()
+        self._sortert = memoryview(b"").cast("Q")
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def lukk(self):
+        self._lukk_mmap()
+
+    # ---------- oppslag ---------- #
+    def _har_nøkkel(self, nøkkel: int) -> bool:
+        if self._bloom is not None and not self._bloom.kanskje(nøkkel):
+            return False
+        if nøkkel in self._hale:
+            return True
+        i = bisect_left(self._sortert, nøkkel)
+        return i < len(self._sortert) and self._sortert[i] == nøkkel
+
+    def __contains__(self, url: str) -> bool:
+        return self._har_nøkkel(url_nøkkel(url))
+
+    def __len__(self) -> int:
+        return len(self._sortert) + len(self._hale)
+
+    # ---------- oppdatering ---------- #
+    def legg_til(self, urls) -> int:
+        """Legger til URL-er som ikke finnes fra før. Returnerer antall nye."""
+        nye = []
+        for url in urls:
+            nøkkel = url_nøkkel(url)
+            if not self._har_nøkkel(nøkkel):
+                self._hale.add(nøkkel)
+                nye.append(nøkkel)
+                if self._bloom is not None:
+                    self._bloom.legg_til(nøkkel)
+        if nye:
+            with open(self.fil, "ab") as f:
+                array("Q", nye).tofile(f)
+            if len(self._hale) > max(_MAKS_HALE, len(self._sortert) // 10):
+                self.komprimer()
+        return len(nye)
+
+    def komprimer(self):
+        """Fletter halen inn i den sorterte delen og skriver filen på nytt."""
+        alle = array("Q", self._sortert)
+        alle.extend(self._hale)
+        sorterte = sorted(set(alle))
+        self._lukk_mmap()
+        self._skriv_fil(sorterte)
+        self._åpne()
@@ -0,0 +1,82 @@
+# source_fingerprints.py
+"""
+Billig endringssjekk for kildesidene før vi betaler for en LLM-extract.
+
+For hver kilde lagres ETag/Last-Modified og en hash av det normaliserte
+innholdet i listeområdet (SOURCE_CONFIG sin css_selector, ellers <body>).
+Neste kjøring sender en betinget GET; 304 eller lik hash betyr at kilden
+er uendret og kan hoppes over.
+"""
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from resilience import USER_AGENT, robust_get
+
+FINGERPRINT_FILE = Path(__file__).parent / "kilde_fingerprints.json"
+
+
+def last_inn_fingeravtrykk() -> dict[str, dict]:
+    if FINGERPRINT_FILE.exists():
+        try:
+            return json.loads(FINGERPRINT_FILE.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            logging.warning("Kunne ikke lese kilde-fingeravtrykk – starter tom.")
+    return {}
+
+
+def lagre_fingeravtrykk(avtrykk: dict[str, dict]):
+    # Ny fil + rename, så et avbrudd midt i skrivingen ikke etterlater ødelagt JSON
+    tmp = FINGERPRINT_FILE.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(avtrykk, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(FINGERPRINT_FILE)
+
+
+def innholds_hash(html: str, css_selector: str | None = None) -> str:
+    """Hash av synlig tekst + lenker i listeområdet, uavhengig av whitespace og scripts."""
+    soup = BeautifulSoup(html, "html.parser")
+    område = (soup.select_one(css_selector) if css_selector else None) or soup.body or soup
+    for tag in område.find_all(["script", "style", "noscript", "template"]):
+        tag.decompose()
+
+    tekst = re.sub(r"\s+", " ", område.get_text(" ", strip=True))
+    lenker = "\n".join(a.get("href", "") for a in område.find_all("a"))
+    return hashlib.sha256(f"{tekst}\n{lenker}".encode("utf-8")).hexdigest()
+
+
+def sjekk_kilde(
+    url: str,
+    css_selector: str | None,
+    forrige: dict | None,
+    ved_nytt_forsøk=None,
+) -> tuple[bool, dict, str | None]:
+    """
+    Returnerer (endret, nytt fingeravtrykk, html). html er None ved 304.
+    Forbigående feil prøves igjen (se resilience.py); kaster unntak når de
+    ikke går over – kalleren bør da behandle kilden som endret.
+    """
+    headers = {"User-Agent": USER_AGENT}
+    if forrige:
+        if forrige.get("etag"):
+            headers["If-None-Match"] = forrige["etag"]
+        if forrige.get("last_modified"):
+            headers["If-Modified-Since"] = forrige["last_modified"]
+
+    res = robust_get(url, headers=headers, timeout=15, ved_nytt_forsøk=ved_nytt_forsøk)
+    if res.status_code == 304 and forrige:
+        return False, forrige, None
+    res.raise_for_status()
+
+    avtrykk = {
+        "etag": res.headers.get("ETag"),
+        "last_modified": res.headers.get("Last-Modified"),
+        "hash": innholds_hash(res.text, css_selector),
+        "sjekket": datetime.now().isoformat(timespec="seconds"),
+    }
+    endret = not forrige or forrige.get("hash") != avtrykk["hash"]
+    return endret, avtrykk, res.text
@@ -0,0 +1,261 @@
+# storage.py
+"""
+SQLite-lager for artikler og sette URL-er (erstatter full omskriving av
+artikkel_database.json / seen_urls.json på hver kjøring).
+
+Databasen kjører i WAL-modus slik at Streamlit-sidene kan lese mens
+skraperen skriver. Første gang databasen opprettes importeres de gamle
+JSON-filene automatisk; `python storage.py --importer` gjør det manuelt.
+"""
+import json
+import logging
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+PROSJEKT_ROT   = Path(__file__).parent
+DB_FILE        = PROSJEKT_ROT / "artikler.db"
+DATABASE_FILE  = PROSJEKT_ROT / "artikkel_database.json"   # kun for import
+SEEN_URLS_FILE = PROSJEKT_ROT / "seen_urls.json"           # kun for import
+
+SKJEMA = """
+CREATE TABLE IF NOT EXISTS artikler (
+    id          INTEGER PRIMARY KEY,
+    url         TEXT NOT NULL UNIQUE,
+    tittel      TEXT,
+    dato        TEXT,
+    funnet_dato TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_artikler_funnet_dato ON artikler(funnet_dato);
+
+-- Nær-duplikater av en artikkel (samme sak fra en annen kilde)
+CREATE TABLE IF NOT EXISTS duplikater (
+    url         TEXT PRIMARY KEY,
+    artikkel_id INTEGER NOT NULL REFERENCES artikler(id),
+    tittel      TEXT,
+    dato        TEXT,
+    funnet_dato TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_duplikater_artikkel ON duplikater(artikkel_id);
+
+-- Status for batch-generering (batch_generation.py), én rad per artikkel.
+-- Feltene fylles etter hvert som trinnene blir ferdige, så en avbrutt
+-- kjøring kan fortsette der den slapp.
+CREATE TABLE IF NOT EXISTS genereringer (
+    artikkel_id INTEGER PRIMARY KEY REFERENCES artikler(id),
+    status      TEXT NOT NULL,          -- venter/hentet/i_batch/generert/ferdig/feilet
+    raatekst    TEXT,
+    artikkel    TEXT,
+    docx_fil    TEXT,
+    lenke       TEXT,
+    feil        TEXT,
+    oppdatert   TEXT
+);
+
+-- Jobber sendt til OpenAI Batch API (bulk_generation.py). Ligger her så en
+-- kjøring som avbrytes eller ikke venter, kan hente resultatet senere.
+CREATE TABLE IF NOT EXISTS batchjobber (
+    batch_id      TEXT PRIMARY KEY,
+    status        TEXT NOT NULL,        -- OpenAI-status, eller "behandlet" når resultatet er lest
+    artikkel_ider TEXT NOT NULL,        -- JSON-liste
+    kategori      TEXT,
+    lengde        TEXT,
+    opprettet     TEXT,
+    oppdatert     TEXT
+);
+
+-- Oppslag mot sette URL-er går via seen_index; tabellen er kopien indeksen bygges fra på nytt
+CREATE TABLE IF NOT EXISTS sette_urler (
+    url TEXT PRIMARY KEY
+) WITHOUT ROWID;
+"""
+
+
+def koble_til(db_fil: Path = DB_FILE) -> sqlite3.Connection:
+    """Åpner (og oppretter ved behov) databasen. Ny database fylles fra JSON-filene."""
+    ny = not db_fil.exists()
+    conn = sqlite3.connect(db_fil)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SKJEMA)
+    if ny:
+        importer_json(conn)
+    return conn
+
+
+def importer_json(
+    conn: sqlite3.Connection,
+    database_fil: Path = DATABASE_FILE,
+    seen_fil: Path = SEEN_URLS_FILE,
+) -> tuple[int, int]:
+    """Engangsimport av de gamle JSON-filene. Eksisterende rader røres ikke."""
+    artikler, urls = [], []
+    try:
+        if database_fil.exists():
+            artikler = json.loads(database_fil.read_text(encoding="utf-8"))
+        if seen_fil.exists():
+            urls = json.loads(seen_fil.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as e:
+        logging.warning(f"Kunne ikke lese JSON for import: {e}")
+
+    # Noen eldre rader har engelske feltnavn
+    for art in artikler:
+        if "tittel" not in art and "title" in art:
+            art["tittel"] = art["title"]
+
+    with conn:
+        n_art = legg_til_artikler(conn, artikler)
+        n_url = legg_til_sette_urls(conn, urls)
+    logging.info(f"Importerte {n_art} artikler og {n_url} sett-URL-er fra JSON.")
+    return n_art, n_url
+
+
+# ---------- skriving ---------- #
+def legg_til_artikler(conn: sqlite3.Connection, artikler: list[dict]) -> int:
+    """Setter inn nye artikler; URL-er som allerede finnes hoppes over."""
+    før = conn.total_changes
+    conn.executemany(
+        "INSERT OR IGNORE INTO artikler (url, tittel, dato, funnet_dato) VALUES (?, ?, ?, ?)",
+        [
+            (a["url"], a.get("tittel"), a.get("dato"), a.get("funnet_dato"))
+            for a in artikler if a.get("url")
+        ],
+    )
+    return conn.total_changes - før
+
+
+def legg_til_duplikater(conn: sqlite3.Connection, duplikater: list[tuple[dict, str]]) -> int:
+    """Knytter (artikkel, hoved-URL)-par til hovedartikkelen i stedet for å lage nye rader."""
+    før = conn.total_changes
+    conn.executemany(
+        "INSERT OR IGNORE INTO duplikater (url, artikkel_id, tittel, dato, funnet_dato) "
+        "SELECT ?, id, ?, ?, ? FROM artikler WHERE url = ?",
+        [
+            (a["url"], a.get("tittel"), a.get("dato"), a.get("funnet_dato"), hoved_url)
+            for a, hoved_url in duplikater
+        ],
+    )
+    return conn.total_changes - før
+
+
+def oppdater_generering(conn: sqlite3.Connection, artikkel_id: int, **felter) -> None:
+    """Oppretter eller oppdaterer genereringsstatusen for én artikkel."""
+    felter["oppdatert"] = datetime.now().isoformat(timespec="seconds")
+    kolonner = ", ".join(felter)
+    oppdater = ", ".join(f"{k} = excluded.{k}" for k in felter)
+    conn.execute(
+        f"INSERT INTO genereringer (artikkel_id, {kolonner}) VALUES (?, {', '.join('?' for _ in felter)}) "
+        f"ON CONFLICT(artikkel_id) DO UPDATE SET {oppdater}",
+        [artikkel_id, *felter.values()],
+    )
+
+
+def lagre_batchjobb(conn: sqlite3.Connection, batch_id: str, status: str,
+                    artikkel_ider: list[int] | None = None, **felter) -> None:
+    """Oppretter eller oppdaterer en jobb i batchjobber."""
+    nå = datetime.now().isoformat(timespec="seconds")
+    if artikkel_ider is not None:
+        conn.execute(
+            "INSERT INTO batchjobber (batch_id, status, artikkel_ider, kategori, lengde, opprettet, oppdatert) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(batch_id) DO UPDATE SET status = excluded.status, "
+            "oppdatert = excluded.oppdatert",
+            (batch_id, status, json.dumps(artikkel_ider), felter.get("kategori"), felter.get("lengde"), nå, nå),
+        )
+    else:
+        conn.execute("UPDATE batchjobber SET status = ?, oppdatert = ? WHERE batch_id = ?", (status, nå, batch_id))
+
+
+def hent_åpne_batchjobber(conn: sqlite3.Connection) -> list[dict]:
+    """Jobber der resultatet ikke er lest ennå."""
+    return [
+        {**dict(r), "artikkel_ider": json.loads(r["artikkel_ider"])}
+        for r in conn.execute("SELECT * FROM batchjobber WHERE status != 'behandlet' ORDER BY opprettet")
+    ]
+
+
+def legg_til_sette_urls(conn: sqlite3.Connection, urls) -> int:
+    før = conn.total_changes
+    conn.executemany(
+        "INSERT OR IGNORE INTO sette_urler (url) VALUES (?)",
+        [(u,) for u in urls],
+    )
+    return conn.total_changes - før
+
+
+# ---------- spørringer ---------- #
+def alle_sette_urls(conn: sqlite3.Connection):
+    """
+    Alle URL-er vi har sett: sette_urler pluss artikler og duplikater, så
+    også URL-er fra perioden da tabellen ikke ble oppdatert kommer med når
+    seen_index bygges på nytt.
+    """
+    for (url,) in conn.execute(
+        "SELECT url FROM sette_urler UNION SELECT url FROM artikler UNION SELECT url FROM duplikater"
+    ):
+        yield url
+
+
+def antall_artikler(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COUNT(*) FROM artikler").fetchone()[0]
+
+
+def antall_sette_urls(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COUNT(*) FROM sette_urler").fetchone()[0]
+
+
+def hent_artikler_siden(conn: sqlite3.Connection, fra_dato: str) -> list[dict]:
+    """Artikler funnet fra og med `fra_dato` (brukes til duplikatindeksen)."""
+    rader = conn.execute(
+        "SELECT url, tittel FROM artikler WHERE funnet_dato >= ?", (fra_dato,)
+    ).fetchall()
+    return [dict(r) for r in rader]
+
+
+def hent_duplikater(conn: sqlite3.Connection, artikkel_ider: list[int]) -> dict[int, list[dict]]:
+    """Nær-duplikater gruppert per hovedartikkel."""
+    if not artikkel_ider:
+        return {}
+    plass = ", ".join("?" for _ in artikkel_ider)
+    klynger: dict[int, list[dict]] = {}
+    for r in conn.execute(
+        f"SELECT * FROM duplikater WHERE artikkel_id IN ({plass}) ORDER BY url",
+        list(artikkel_ider),
+    ):
+        klynger.setdefault(r["artikkel_id"], []).append(dict(r))
+    return klynger
+
+
+def hent_artikler_funnet(conn: sqlite3.Connection, datoer: list[str]) -> list[dict]:
+    """Artikler med funnet_dato i `datoer`, nyeste funn først."""
+    if not datoer:
+        return []
+    plass = ", ".join("?" for _ in datoer)
+    rader = conn.execute(
+        f"SELECT * FROM artikler WHERE funnet_dato IN ({plass}) "
+        f"ORDER BY funnet_dato DESC, id DESC",
+        list(datoer),
+    ).fetchall()
+    return [dict(r) for r in rader]
+
+
+def hent_genereringer(conn: sqlite3.Connection, artikkel_ider: list[int]) -> dict[int, dict]:
+    """Genereringsstatus per artikkel-ID (bare de som har en)."""
+    if not artikkel_ider:
+        return {}
+    plass = ", ".join("?" for _ in artikkel_ider)
+    return {
+        r["artikkel_id"]: dict(r)
+        for r in conn.execute(
+            f"SELECT * FROM genereringer WHERE artikkel_id IN ({plass})", list(artikkel_ider)
+        )
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    conn = koble_til()
+    if "--importer" in sys.argv[1:]:
+        importer_json(conn)
+    print(f"{DB_FILE.name}: {antall_artikler(conn)} artikler, {antall_sette_urls(conn)} sett-URL-er.")
@@ -1,17 +1,139 @@
+"""
+Uthenting av tekst fra opplastede filer (PDF og DOCX).
+
+PDF-sidene leses i en prosesspool (PyPDF2 er ren Python og holder GIL-en)
+og gis videre side for side, så grensesnittet kan vise fremdrift. Teksten
+caches på disk etter SHA-256 av filinnholdet, så en Streamlit-rerun eller
+samme fil lastet opp på nytt ikke leses en gang til. Svære rapporter
+kuttes etter FIL_MAKS_SIDER sider eller FIL_MAKS_TEGN tegn.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
 
 from PyPDF2 import PdfReader
 import docx
 
-def les_fil_innhold(uploaded_file):
-    if uploaded_file.name.endswith(".pdf"):
-        reader = PdfReader(uploaded_file)
-        tekst = ""
-        for page in reader.pages:
-            tekst += page.extract_text() + "\n"
-        return tekst
-    elif uploaded_file.name.endswith(".docx"):
-        doc = docx.Document(uploaded_file)
-        tekst = "\n".join([para.text for para in doc.paragraphs])
-        return tekst
-    else:
+CACHE_MAPPE = Path(__file__).parent / "fil_cache"
+CACHE_AKTIV = os.getenv("FIL_CACHE", "1") != "0"
+MAKS_SIDER  = int(os.getenv("FIL_MAKS_SIDER", "400"))
+MAKS_TEGN   = int(os.getenv("FIL_MAKS_TEGN", "1500000"))
+PROSESSER   = int(os.getenv("FIL_PROSESSER", str(min(4, os.cpu_count() or 1))))
+SIDER_PER_OPPGAVE = 8
+MIN_SIDER_FOR_POOL = 16     # under dette koster oppstarten av prosessene mer enn den sparer
+
+# ---------- PDF i prosesspool ---------- #
+_pool: ProcessPoolExecutor | None = None
+_åpen: tuple[str, PdfReader] | None = None      # per arbeidsprosess
+
+
+def _hent_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, ikke fork: Streamlit kjører tråder, og fork av en prosess med tråder kan henge
+        _pool = ProcessPoolExecutor(max_workers=PROSESSER, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _les_sider(sti: str, fra: int, til: int) -> list[str]:
+    """Kjøres i arbeidsprosessen; PDF-en åpnes én gang per prosess og fil."""
+    global _åpen
+    if _åpen is None or _åpen[0] != sti:
+        _åpen = (sti, PdfReader(sti))
+    return [_side_tekst(_åpen[1].pages[i]) for i in range(fra, til)]
+
+
+def _side_tekst(side) -> str:
+    try:
+        return side.extract_text() or ""
+    except Exception as e:          # én ødelagt side skal ikke stoppe resten
+        logging.warning(f"Kunne ikke lese PDF-side: {e}")
         return ""
+
+
+def les_pdf_sider(data: bytes, maks_sider: int = MAKS_SIDER,
+                  reader: PdfReader | None = None) -> Iterator[tuple[int, int, str]]:
+    """(sidenummer, antall sider som leses, tekst) i rekkefølge."""
+    reader = reader or PdfReader(BytesIO(data))
+    antall = min(len(reader.pages), maks_sider)
+    if antall < MIN_SIDER_FOR_POOL or PROSESSER < 2:
+        for i in range(antall):
+            yield i + 1, antall, _side_tekst(reader.pages[i])
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(data)
+    pool = _hent_pool()
+    oppgaver = [pool.submit(_les_sider, f.name, fra, min(fra + SIDER_PER_OPPGAVE, antall))
+                for fra in range(0, antall, SIDER_PER_OPPGAVE)]
+    try:
+        nr = 0
+        # Resultatene gis i rekkefølge mens prosessene jobber videre på de neste
+        for oppgave in oppgaver:
+            for tekst in oppgave.result():
+                nr += 1
+                yield nr, antall, tekst
+    finally:
+        for oppgave in oppgaver:            # kalleren kan stoppe tidlig (tegngrensen)
+            oppgave.cancel()
+        os.unlink(f.name)
+
+
+# ---------- cache ---------- #
+def _cache_fil(data: bytes) -> Path:
+    return CACHE_MAPPE / f"{hashlib.sha256(data).hexdigest()}-{MAKS_SIDER}-{MAKS_TEGN}.txt"
+
+
+def _les_pdf(data: bytes, ved_side: Callable[[int, int], None] | None) -> str:
+    reader = PdfReader(BytesIO(data))
+    totalt = len(reader.pages)
+    deler, tegn = [], 0
+    for nr, antall, tekst in les_pdf_sider(data, reader=reader):
+        deler.append(tekst)
+        tegn += len(tekst) + 1
+        if ved_side:
+            ved_side(nr, antall)
+        if tegn >= MAKS_TEGN:
+            break
+    tekst = "\n".join(deler)[:MAKS_TEGN]
+    if len(deler) < totalt or tegn >= MAKS_TEGN:
+        logging.info(f"PDF avkortet: {len(deler)} av {totalt} sider, {len(tekst)} tegn")
+        tekst += f"\n\n[Avkortet: {len(deler)} av {totalt} sider lest]"
+    return tekst
+
+
+def les_fil_innhold(uploaded_file, ved_side: Callable[[int, int], None] | None = None):
+    """
+    Teksten i en opplastet PDF eller DOCX (Streamlit UploadedFile eller
+    annen fil med .name). `ved_side(nr, antall)` kalles for hver PDF-side.
+    """
+    navn = uploaded_file.name.lower()
+    if not navn.endswith((".pdf", ".docx")):
+        return ""
+    data = uploaded_file.getvalue() if hasattr(uploaded_file, "getvalue") else uploaded_file.read()
+
+    cache_fil = _cache_fil(data)
+    if CACHE_AKTIV and cache_fil.exists():
+        return cache_fil.read_text(encoding="utf-8")
+
+    if navn.endswith(".pdf"):
+        tekst = _les_pdf(data, ved_side)
+    else:
+        doc = docx.Document(BytesIO(data))
+        tekst = "\n".join(para.text for para in doc.paragraphs)[:MAKS_TEGN]
+
+    if CACHE_AKTIV:
+        try:
+            CACHE_MAPPE.mkdir(exist_ok=True)
+            tmp = cache_fil.with_suffix(".tmp")
+            tmp.write_text(tekst, encoding="utf-8")
+            tmp.replace(cache_fil)
+        except OSError as e:
+            logging.warning(f"Kunne ikke cache filteksten: {e}")
+    return tekst